@@ -0,0 +1,145 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+"""A local HTTP server batching concurrent requests for a detector.
+
+POST an encoded image to ``/predict`` to get its detections, and GET
+``/stats`` to get the counters of the batching scheduler and the result
+cache, e.g.::
+
+    python demo/batch_server_demo.py ${CONFIG} ${CHECKPOINT} --device cpu
+    curl --data-binary @demo/demo.jpg http://127.0.0.1:8080/predict
+    curl http://127.0.0.1:8080/stats
+"""
+import asyncio
+import json
+from argparse import ArgumentParser
+
+import mmcv
+
+from mmdet.apis import (MicroBatchScheduler, Predictor, ResultCache,
+                        init_detector)
+
+
+def parse_args():
+    parser = ArgumentParser()
+    parser.add_argument('config', help='Config file')
+    parser.add_argument('checkpoint', help='Checkpoint file')
+    parser.add_argument(
+        '--device', default='cuda:0', help='Device used for inference')
+    parser.add_argument(
+        '--host', default='127.0.0.1', help='Host the server listens on')
+    parser.add_argument(
+        '--port', type=int, default=8080, help='Port the server listens on')
+    parser.add_argument(
+        '--max-batch-size',
+        type=int,
+        default=8,
+        help='Maximum number of requests forwarded in a batch')
+    parser.add_argument(
+        '--max-wait-time',
+        type=float,
+        default=0.005,
+        help='Maximum time in seconds to wait for more requests of a batch')
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=0,
+        help='Number of threads to preprocess the images of a batch')
+    parser.add_argument(
+        '--cache-size',
+        type=int,
+        default=0,
+        help='Number of results cached by the content of the images, '
+        '0 disables the cache')
+    parser.add_argument(
+        '--cache-ttl',
+        type=float,
+        default=None,
+        help='Time in seconds a cached result stays valid')
+    parser.add_argument(
+        '--score-thr', type=float, default=0.3, help='bbox score threshold')
+    args = parser.parse_args()
+    return args
+
+
+def format_result(result, class_names, score_thr):
+    if isinstance(result, tuple):
+        result = result[0]
+    output = []
+    for class_name, class_result in zip(class_names, result):
+        for bbox in class_result:
+            score = float(bbox[-1])
+            if score >= score_thr:
+                output.append({
+                    'class_name': class_name,
+                    'bbox': bbox[:-1].tolist(),
+                    'score': score
+                })
+    return output
+
+
+async def write_response(writer, status, body):
+    body = json.dumps(body).encode()
+    writer.write(f'HTTP/1.1 {status}\r\n'
+                 'Content-Type: application/json\r\n'
+                 f'Content-Length: {len(body)}\r\n'
+                 'Connection: close\r\n\r\n'.encode() + body)
+    await writer.drain()
+    writer.close()
+
+
+async def handle(reader, writer, scheduler, class_names, score_thr):
+    try:
+        method, path, _ = (await reader.readline()).decode().split(' ', 2)
+        length = 0
+        while True:
+            line = (await reader.readline()).decode().strip()
+            if not line:
+                break
+            key, value = line.split(':', 1)
+            if key.lower() == 'content-length':
+                length = int(value)
+        body = await reader.readexactly(length)
+    except (ValueError, asyncio.IncompleteReadError):
+        await write_response(writer, '400 Bad Request', {})
+        return
+
+    if method == 'GET' and path == '/stats':
+        stats = scheduler.stats()
+        if scheduler.predictor.cache is not None:
+            stats['cache'] = scheduler.predictor.cache.stats()
+        await write_response(writer, '200 OK', stats)
+    elif method == 'POST' and path == '/predict':
+        img = mmcv.imfrombytes(body)
+        if img is None:
+            await write_response(writer, '400 Bad Request', {})
+            return
+        result = await scheduler.submit(img)
+        await write_response(writer, '200 OK',
+                             format_result(result, class_names, score_thr))
+    else:
+        await write_response(writer, '404 Not Found', {})
+
+
+async def main(args):
+    model = init_detector(args.config, args.checkpoint, device=args.device)
+    cache = None
+    if args.cache_size > 0:
+        cache = ResultCache(max_size=args.cache_size, ttl=args.cache_ttl)
+    predictor = Predictor(model, num_workers=args.workers, cache=cache)
+    async with MicroBatchScheduler(
+            predictor,
+            max_batch_size=args.max_batch_size,
+            max_wait_time=args.max_wait_time) as scheduler:
+        server = await asyncio.start_server(
+            lambda reader, writer: handle(reader, writer, scheduler, model.
+                                          CLASSES, args.score_thr), args.host,
+            args.port)
+        print(f'Serving on http://{args.host}:{args.port}')
+        async with server:
+            await server.serve_forever()
+    predictor.close()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    asyncio.run(main(args))
@@ -4,7 +4,7 @@ import argparse
 import cv2
 import mmcv
 
-from mmdet.apis import inference_detector, init_detector
+from mmdet.apis import Predictor, VideoInference, init_detector
 
 
 def parse_args():
@@ -23,10 +23,32 @@ def parse_args():
         type=float,
         default=1,
         help='The interval of show (s), 0 is block')
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=4,
+        help='Number of frames forwarded in a batch')
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=0,
+        help='Number of threads to preprocess the frames of a batch')
     args = parser.parse_args()
     return args
 
 
+def batch_frames(frames, batch_size):
+    """Group the frames into lists of ``batch_size`` frames."""
+    batch = []
+    for frame in frames:
+        batch.append(frame)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
 def main():
     args = parse_args()
     assert args.out or args.show, \
@@ -43,14 +65,36 @@ def main():
             args.out, fourcc, video_reader.fps,
             (video_reader.width, video_reader.height))
 
-    for frame in mmcv.track_iter_progress(video_reader):
-        result = inference_detector(model, frame)
+    prog_bar = mmcv.ProgressBar(len(video_reader))
+
+    # draw, show and write the frames
+    def sink(frame, result):
         frame = model.show_result(frame, result, score_thr=args.score_thr)
         if args.show:
             cv2.namedWindow('video', 0)
             mmcv.imshow(frame, 'video', args.wait_time)
         if args.out:
             video_writer.write(frame)
+        prog_bar.update()
+
+    predictor = Predictor(model, num_workers=args.workers)
+    try:
+        if args.show:
+            # windows can only be shown in the main thread, so the frames
+            # are not pipelined and the sink runs in the main thread
+            for frames in batch_frames(video_reader, args.batch_size):
+                for frame, result in zip(frames, predictor.predict(frames)):
+                    sink(frame, result)
+        else:
+            # the frames are drawn and written in the writing thread
+            stats = VideoInference(
+                predictor, batch_size=args.batch_size).run(video_reader, sink)
+            print(f'\nfps: {stats["fps"]:.1f}, '
+                  f'decode fps: {stats["decode_fps"]:.1f}, '
+                  f'inference fps: {stats["inference_fps"]:.1f}, '
+                  f'write fps: {stats["write_fps"]:.1f}')
+    finally:
+        predictor.close()
 
     if video_writer:
         video_writer.release()
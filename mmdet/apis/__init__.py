@@ -1,12 +1,21 @@
 # Copyright (c) OpenMMLab. All rights reserved.
-from .inference import (async_inference_detector, inference_detector,
-                        init_detector, show_result_pyplot)
+from .batching import MicroBatchScheduler
+from .cache import ResultCache
+from .cpu_pool import CPUInferencePool
+from .ensemble import EnsembleInference
+from .inference import (Predictor, async_inference_detector,
+                        inference_detector, init_detector, optimize_for_cpu,
+                        show_result_pyplot)
+from .sliced import SlicedInference
 from .test import multi_gpu_test, single_gpu_test
 from .train import (get_root_logger, init_random_seed, set_random_seed,
                     train_detector)
+from .video import VideoInference
 
 __all__ = [
     'get_root_logger', 'set_random_seed', 'train_detector', 'init_detector',
     'async_inference_detector', 'inference_detector', 'show_result_pyplot',
-    'multi_gpu_test', 'single_gpu_test', 'init_random_seed'
+    'multi_gpu_test', 'single_gpu_test', 'init_random_seed', 'Predictor',
+    'MicroBatchScheduler', 'optimize_for_cpu', 'VideoInference',
+    'SlicedInference', 'ResultCache', 'CPUInferencePool', 'EnsembleInference'
 ]
@@ -0,0 +1,189 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+class MicroBatchScheduler:
+    """Group concurrent inference requests into batches.
+
+    Requests submitted with :meth:`submit` are queued. A batch is formed as
+    soon as ``max_batch_size`` requests are queued or ``max_wait_time`` has
+    passed since the first request of the batch arrived, then the batch is
+    forwarded at once in a worker thread, so that the event loop keeps
+    accepting requests while the model runs. This works with any detector
+    on both CPU and GPU, unlike ``aforward_test`` which only some detectors
+    implement.
+
+    Args:
+        predictor (:obj:`Predictor`): The predictor to run the batches. Any
+            object whose ``predict`` takes a list of images and returns a
+            list of results can be used.
+        max_batch_size (int): Maximum number of requests in a batch.
+            Default: 8.
+        max_wait_time (float): Maximum time in seconds to wait for more
+            requests after the first request of a batch. Default: 0.005.
+        latency_window (int): Number of recent requests used to compute
+            the latency percentiles in :meth:`stats`. Default: 1000.
+
+    Example:
+        >>> predictor = Predictor(init_detector(config_file, checkpoint_file))
+        >>> async with MicroBatchScheduler(predictor) as scheduler:
+        >>>     result = await scheduler.submit(img)
+    """
+
+    def __init__(self,
+                 predictor,
+                 max_batch_size=8,
+                 max_wait_time=0.005,
+                 latency_window=1000):
+        assert max_batch_size >= 1
+        assert max_wait_time >= 0
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size
+        self.max_wait_time = max_wait_time
+        self._latencies = deque(maxlen=latency_window)
+        self._queue = None
+        self._task = None
+        self._executor = None
+        self.reset_stats()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.stop()
+
+    async def start(self):
+        """Start forming and running batches in the running event loop."""
+        assert self._task is None, 'the scheduler is already started'
+        self._queue = asyncio.Queue()
+        # a single thread forwards the batches one after another
+        self._executor = ThreadPoolExecutor(1)
+        self._task = asyncio.get_running_loop().create_task(self._batch_loop())
+
+    async def stop(self):
+        """Run the queued requests and stop the scheduler."""
+        if self._task is None:
+            return
+        # requests queued before the sentinel are still run
+        self._queue.put_nowait(None)
+        await self._task
+        self._task = None
+        self._executor.shutdown()
+        self._executor = None
+
+    async def submit(self, img):
+        """Queue an image and wait for its result.
+
+        Args:
+            img (str | ndarray): Either an image file or a loaded image.
+
+        Returns:
+            The detection results of the image.
+        """
+        assert self._task is not None, 'the scheduler is not started'
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((img, future, time.perf_counter()))
+        self._max_queue_depth = max(self._max_queue_depth, self._queue.qsize())
+        return await future
+
+    async def _next_batch(self):
+        """Collect a batch of requests.
+
+        Returns:
+            tuple[list, bool]: The requests of the batch and whether the
+            scheduler is asked to stop.
+        """
+        loop = asyncio.get_running_loop()
+        item = await self._queue.get()
+        if item is None:
+            return [], True
+        batch = [item]
+        deadline = loop.time() + self.max_wait_time
+        while len(batch) < self.max_batch_size:
+            if self._queue.empty():
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                item = self._queue.get_nowait()
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        stop = False
+        while not stop:
+            batch, stop = await self._next_batch()
+            # skip the requests whose callers have given up
+            batch = [item for item in batch if not item[1].done()]
+            if not batch:
+                continue
+            imgs = [img for img, _, _ in batch]
+            try:
+                results = await loop.run_in_executor(self._executor,
+                                                     self.predictor.predict,
+                                                     imgs)
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                self._num_failed += len(batch)
+                continue
+
+            end = time.perf_counter()
+            for (_, future, enqueue_time), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+                self._latencies.append(end - enqueue_time)
+            self._num_requests += len(batch)
+            self._num_batches += 1
+
+    def reset_stats(self):
+        """Reset the counters reported by :meth:`stats`."""
+        self._num_requests = 0
+        self._num_failed = 0
+        self._num_batches = 0
+        self._max_queue_depth = 0
+        self._latencies.clear()
+        self._start_time = time.perf_counter()
+
+    def stats(self):
+        """Get the counters of the scheduler.
+
+        Returns:
+            dict: The counters since the last :meth:`reset_stats`,
+            including the number of completed requests and batches, the
+            mean batch size, the throughput in requests per second, the
+            current and maximum queue depth, and the mean, 50th and 95th
+            percentile latency in seconds of the recent requests.
+        """
+        elapsed = time.perf_counter() - self._start_time
+        stats = dict(
+            num_requests=self._num_requests,
+            num_failed=self._num_failed,
+            num_batches=self._num_batches,
+            mean_batch_size=self._num_requests / max(self._num_batches, 1),
+            throughput=self._num_requests / elapsed if elapsed > 0 else 0.,
+            queue_depth=self._queue.qsize() if self._queue else 0,
+            max_queue_depth=self._max_queue_depth)
+        if self._latencies:
+            latencies = np.array(self._latencies)
+            stats.update(
+                latency_mean=float(latencies.mean()),
+                latency_p50=float(np.percentile(latencies, 50)),
+                latency_p95=float(np.percentile(latencies, 95)))
+        else:
+            stats.update(latency_mean=0., latency_p50=0., latency_p95=0.)
+        return stats
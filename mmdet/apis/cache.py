@@ -0,0 +1,163 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+
+def _new_hasher():
+    # xxhash is several times faster than the hashes of hashlib, of which
+    # sha256 is usually the fastest thanks to the SHA CPU extensions
+    if xxhash is not None:
+        return xxhash.xxh3_128()
+    return hashlib.sha256()
+
+
+def hash_image(img):
+    """Hash the content of an image.
+
+    ``xxhash`` is used if it is installed, otherwise ``hashlib.sha256``.
+
+    Args:
+        img (str | ndarray): Either an image file, whose bytes are hashed
+            without decoding it, or a loaded image.
+
+    Returns:
+        str: The hex digest of the image.
+    """
+    hasher = _new_hasher()
+    if isinstance(img, np.ndarray):
+        # the same pixels in another shape or dtype are another image
+        hasher.update(f'{img.shape}{img.dtype}'.encode())
+        hasher.update(memoryview(np.ascontiguousarray(img)).cast('B'))
+    else:
+        with open(img, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def model_fingerprint(model):
+    """Hash the config and the weights of a detector.
+
+    Args:
+        model (nn.Module): The loaded detector.
+
+    Returns:
+        str: The hex digest of the detector.
+    """
+    hasher = _new_hasher()
+    cfg = getattr(model, 'cfg', None)
+    if cfg is not None:
+        hasher.update(cfg.pretty_text.encode())
+    for name, tensor in model.state_dict().items():
+        hasher.update(name.encode())
+        hasher.update(memoryview(tensor.detach().cpu().contiguous().numpy()))
+    return hasher.hexdigest()
+
+
+class ResultCache:
+    """A bounded cache of detection results keyed by the image content.
+
+    The least recently used result is evicted when the cache is full, and
+    the results older than ``ttl`` seconds are treated as missing. The
+    cache is thread-safe, so that it can be shared by the predictors of
+    several threads or models, as the keys include the fingerprint of the
+    model.
+
+    Args:
+        max_size (int): Maximum number of cached results. Default: 1024.
+        ttl (float, optional): Time in seconds a result stays valid, None
+            means forever. Default: None.
+
+    Example:
+        >>> cache = ResultCache(max_size=4096, ttl=60)
+        >>> predictor = Predictor(model, cache=cache)
+        >>> results = predictor.predict(frames)
+        >>> cache.stats()
+    """
+
+    def __init__(self, max_size=1024, ttl=None):
+        assert max_size >= 1
+        assert ttl is None or ttl > 0
+        self.max_size = max_size
+        self.ttl = ttl
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def __len__(self):
+        return len(self._results)
+
+    def get(self, key):
+        """Get a cached result.
+
+        Args:
+            key (Hashable): The key of the result.
+
+        Returns:
+            The cached result, or None if it is missing or expired.
+        """
+        with self._lock:
+            item = self._results.get(key)
+            if item is not None and self.ttl is not None \
+                    and time.monotonic() - item[1] > self.ttl:
+                del self._results[key]
+                self._num_expired += 1
+                item = None
+            if item is None:
+                self._num_misses += 1
+                return None
+            self._results.move_to_end(key)
+            self._num_hits += 1
+            return item[0]
+
+    def put(self, key, result):
+        """Cache a result, evicting the least recently used one if full.
+
+        Args:
+            key (Hashable): The key of the result.
+            result: The result to cache.
+        """
+        with self._lock:
+            self._results[key] = (result, time.monotonic())
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_size:
+                self._results.popitem(last=False)
+                self._num_evicted += 1
+
+    def clear(self):
+        """Remove all the cached results."""
+        with self._lock:
+            self._results.clear()
+
+    def reset_stats(self):
+        """Reset the counters of the cache."""
+        self._num_hits = 0
+        self._num_misses = 0
+        self._num_evicted = 0
+        self._num_expired = 0
+
+    def stats(self):
+        """Get the counters of the cache.
+
+        Returns:
+            dict: The number of hits, misses, evicted and expired results
+            since the last :meth:`reset_stats`, the hit rate and the
+            current size of the cache.
+        """
+        num_lookups = self._num_hits + self._num_misses
+        return dict(
+            num_hits=self._num_hits,
+            num_misses=self._num_misses,
+            hit_rate=self._num_hits / num_lookups if num_lookups else 0.,
+            num_evicted=self._num_evicted,
+            num_expired=self._num_expired,
+            size=len(self._results))
@@ -0,0 +1,334 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+import torch
+
+from .inference import Predictor, init_detector
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # python 3.7, the images are pickled instead
+    shared_memory = None
+
+
+def _partition_cores(num_replicas, threads_per_replica):
+    """Split the available cores into disjoint sets, one per replica."""
+    if not hasattr(os, 'sched_getaffinity'):
+        return [None] * num_replicas
+    cores = sorted(os.sched_getaffinity(0))
+    if num_replicas * threads_per_replica > len(cores):
+        # oversubscribed, leave the scheduling to the os
+        return [None] * num_replicas
+    return [
+        cores[i * threads_per_replica:(i + 1) * threads_per_replica]
+        for i in range(num_replicas)
+    ]
+
+
+def _share_image(img):
+    """Copy an image to shared memory if possible.
+
+    Returns:
+        tuple: The image to send to a worker, and the shared memory to
+        release when the request is done, or None.
+    """
+    if shared_memory is None or not isinstance(img, np.ndarray) \
+            or img.nbytes == 0:
+        return img, None
+    shm = shared_memory.SharedMemory(create=True, size=img.nbytes)
+    np.ndarray(img.shape, img.dtype, buffer=shm.buf)[...] = img
+    return (shm.name, img.shape, img.dtype.str), shm
+
+
+def _load_shared_image(img):
+    """Copy an image sent by :func:`_share_image` out of shared memory."""
+    if not isinstance(img, tuple):
+        return img
+    name, shape, dtype = img
+    # the spawned workers share the resource tracker of the pool, which
+    # unlinks the memory when the request is done
+    shm = shared_memory.SharedMemory(name=name)
+    img = np.ndarray(shape, dtype, buffer=shm.buf).copy()
+    shm.close()
+    return img
+
+
+def _worker_loop(worker_id, config, checkpoint, cpu_optimize, cores,
+                 num_threads, max_batch_size, request_queue, result_queue):
+    """Serve the requests of a replica in a worker process."""
+    try:
+        if cores is not None:
+            os.sched_setaffinity(0, cores)
+        torch.set_num_threads(num_threads)
+        model = init_detector(
+            config, checkpoint, device='cpu', cpu_optimize=cpu_optimize)
+        predictor = Predictor(model)
+    except Exception as e:
+        result_queue.put((worker_id, None, False, e))
+        return
+    # ready
+    result_queue.put((worker_id, None, True, None))
+
+    stopped = False
+    while not stopped:
+        requests = [request_queue.get()]
+        # take the queued requests in the same batch
+        while len(requests) < max_batch_size:
+            try:
+                requests.append(request_queue.get_nowait())
+            except queue.Empty:
+                break
+        if requests[-1] is None:
+            requests.pop()
+            stopped = True
+        if not requests:
+            break
+        req_ids = [req_id for req_id, _ in requests]
+        try:
+            imgs = [_load_shared_image(img) for _, img in requests]
+            results = predictor.predict(imgs)
+        except Exception as e:
+            for req_id in req_ids:
+                result_queue.put((worker_id, req_id, False, e))
+            continue
+        for req_id, result in zip(req_ids, results):
+            result_queue.put((worker_id, req_id, True, result))
+
+
+class CPUInferencePool:
+    """Inference with several replicas of a detector in CPU processes.
+
+    On CPU, a single model does not scale to many cores as its small ops
+    can not use all of them, and the asynchronous interface relies on CUDA
+    streams. Instead, each replica runs in a worker process, pinned to a
+    disjoint set of cores with as many intra-op threads, so that several
+    requests are forwarded in parallel. Loaded images are sent to the
+    workers through shared memory.
+
+    Args:
+        config (str | :obj:`mmcv.Config`): Config file path or the config
+            object.
+        checkpoint (str, optional): Checkpoint path. Default: None.
+        num_replicas (int): Number of worker processes. Default: 2.
+        threads_per_replica (int, optional): Number of intra-op threads of
+            each replica. Default to the available cores divided by the
+            number of replicas.
+        dispatch (str): How requests are assigned to the replicas, either
+            "least_loaded", to the replica with the fewest pending requests,
+            or "round_robin". Default: "least_loaded".
+        max_batch_size (int): Maximum number of queued requests a replica
+            forwards in a batch. Default: 1.
+        cpu_optimize (bool): Whether to optimize the replicas as
+            :func:`init_detector` does. Default: False.
+        pin_cores (bool): Whether to pin each replica to its own cores,
+            which is only supported on Linux. Default: True.
+
+    Example:
+        >>> with CPUInferencePool(config_file, checkpoint_file,
+        >>>                       num_replicas=4) as pool:
+        >>>     results = pool.predict(imgs)
+        >>>     future = pool.submit(img)
+        >>>     result = await asyncio.wrap_future(future)
+    """
+
+    def __init__(self,
+                 config,
+                 checkpoint=None,
+                 num_replicas=2,
+                 threads_per_replica=None,
+                 dispatch='least_loaded',
+                 max_batch_size=1,
+                 cpu_optimize=False,
+                 pin_cores=True):
+        assert num_replicas >= 1
+        assert max_batch_size >= 1
+        assert dispatch in ('least_loaded', 'round_robin'), \
+            f'dispatch should be "least_loaded" or "round_robin", ' \
+            f'but got {dispatch}'
+        if threads_per_replica is None:
+            num_cores = len(os.sched_getaffinity(0)) if hasattr(
+                os, 'sched_getaffinity') else os.cpu_count()
+            threads_per_replica = max(num_cores // num_replicas, 1)
+        self.num_replicas = num_replicas
+        self.threads_per_replica = threads_per_replica
+        self.dispatch = dispatch
+        if pin_cores:
+            cores = _partition_cores(num_replicas, threads_per_replica)
+        else:
+            cores = [None] * num_replicas
+
+        # forking a process using torch threads may deadlock
+        ctx = multiprocessing.get_context('spawn')
+        self._result_queue = ctx.Queue()
+        self._request_queues = [ctx.Queue() for _ in range(num_replicas)]
+        self._workers = [
+            ctx.Process(
+                target=_worker_loop,
+                args=(i, config, checkpoint, cpu_optimize, cores[i],
+                      threads_per_replica, max_batch_size,
+                      self._request_queues[i], self._result_queue),
+                daemon=True) for i in range(num_replicas)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._num_pending = [0] * num_replicas
+        self._dead = [False] * num_replicas
+        self._req_ids = itertools.count()
+        self._replica_ids = itertools.cycle(range(num_replicas))
+        self._closed = False
+        self._wait_ready()
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+
+    def _wait_ready(self):
+        """Wait until all the replicas have loaded the detector."""
+        ready = [False] * self.num_replicas
+        while not all(ready):
+            try:
+                worker_id, _, ok, error = self._result_queue.get(timeout=1)
+            except queue.Empty:
+                # the replicas killed by a signal, e.g. by the oom killer,
+                # never send their message
+                for replica_id, worker in enumerate(self._workers):
+                    if not ready[replica_id] and not worker.is_alive():
+                        self._stop_workers()
+                        raise RuntimeError(
+                            f'replica {replica_id} exited with code '
+                            f'{worker.exitcode} before it was ready')
+                continue
+            if not ok:
+                self._stop_workers()
+                raise error
+            ready[worker_id] = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def submit(self, img):
+        """Submit an image to a replica.
+
+        Args:
+            img (str | ndarray): Either an image file or a loaded image.
+
+        Returns:
+            :obj:`concurrent.futures.Future`: The future of the detection
+            result, which can be awaited with ``asyncio.wrap_future``.
+        """
+        assert not self._closed, 'the pool is closed'
+        future = Future()
+        img, shm = _share_image(img)
+        with self._lock:
+            alive = [
+                not dead and worker.is_alive()
+                for dead, worker in zip(self._dead, self._workers)
+            ]
+            if not any(alive):
+                if shm is not None:
+                    shm.close()
+                    shm.unlink()
+                raise RuntimeError('all the replicas of the pool exited')
+            if self.dispatch == 'least_loaded':
+                replica_id = min(
+                    (i for i in range(self.num_replicas) if alive[i]),
+                    key=lambda i: self._num_pending[i])
+            else:
+                replica_id = next(self._replica_ids)
+                while not alive[replica_id]:
+                    replica_id = next(self._replica_ids)
+            req_id = next(self._req_ids)
+            self._pending[req_id] = (replica_id, future, shm)
+            self._num_pending[replica_id] += 1
+        self._request_queues[replica_id].put((req_id, img))
+        return future
+
+    def predict(self, imgs):
+        """Inference images with the replicas in parallel.
+
+        Args:
+            imgs (str/ndarray or list[str/ndarray] or tuple[str/ndarray]):
+               Either image files or loaded images.
+
+        Returns:
+            If imgs is a list or tuple, the same length list type results
+            will be returned, otherwise return the detection results directly.
+        """
+        if not isinstance(imgs, (list, tuple)):
+            return self.submit(imgs).result()
+        futures = [self.submit(img) for img in imgs]
+        return [future.result() for future in futures]
+
+    def _finish(self, req_id, ok, payload):
+        with self._lock:
+            if req_id not in self._pending:
+                # already failed as its replica exited
+                return
+            replica_id, future, shm = self._pending.pop(req_id)
+            self._num_pending[replica_id] -= 1
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+        if ok:
+            future.set_result(payload)
+        else:
+            future.set_exception(payload)
+
+    def _collect(self):
+        """Set the results of the requests in a thread."""
+        while True:
+            try:
+                message = self._result_queue.get(timeout=1)
+            except queue.Empty:
+                self._check_workers()
+                continue
+            if message is None:
+                break
+            _, req_id, ok, payload = message
+            self._finish(req_id, ok, payload)
+
+    def _check_workers(self):
+        """Fail the pending requests of the dead replicas."""
+        for replica_id, worker in enumerate(self._workers):
+            if worker.is_alive():
+                continue
+            with self._lock:
+                # no new request is sent to the dead replica
+                self._dead[replica_id] = True
+                req_ids = [
+                    req_id for req_id, (i, _, _) in self._pending.items()
+                    if i == replica_id
+                ]
+            for req_id in req_ids:
+                self._finish(
+                    req_id, False,
+                    RuntimeError(f'replica {replica_id} exited with code '
+                                 f'{worker.exitcode}'))
+
+    def _stop_workers(self):
+        for request_queue in self._request_queues:
+            request_queue.put(None)
+        for worker in self._workers:
+            worker.join()
+
+    def close(self):
+        """Stop the replicas after the pending requests."""
+        if self._closed:
+            return
+        self._closed = True
+        self._stop_workers()
+        self._result_queue.put(None)
+        self._collector.join()
+        # the requests which are never answered
+        self._check_workers()
@@ -0,0 +1,221 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+from mmcv.ops import batched_nms
+
+from mmdet.core import compact2result, result2compact
+from mmdet.datasets import replace_ImageToTensor
+from .inference import Predictor
+from .sliced import weighted_merge
+
+
+def _pipeline_signature(predictor):
+    """Get the key of the predictors which can share the preprocessing."""
+    pipeline = replace_ImageToTensor(predictor.model.cfg.data.test.pipeline)
+    return (json.dumps(pipeline, sort_keys=True, default=str),
+            str(predictor.device), predictor.channels_last)
+
+
+class EnsembleInference:
+    """Inference images with several detectors and fuse their detections.
+
+    The images are loaded and preprocessed once for each group of detectors
+    with the same test pipeline and device, instead of once for each
+    detector. The detectors are forwarded in sequence or concurrently in
+    threads, and their detections are fused across the detectors, like
+    :func:`merge_aug_bboxes` fuses those of the augmented images, by
+    averaging the overlapping bboxes of each class weighted by their scores
+    and the weights of the detectors.
+
+    Args:
+        models (list[nn.Module]): The loaded detectors, which predict the
+            same classes.
+        weights (list[float], optional): The weights of the detectors.
+            Default to equal weights.
+        merge (str): How to fuse the detections, either "weighted" with
+            :func:`weighted_merge`, whose scores are the weighted sums of the
+            scores of the fused detections divided by the total weight, or
+            "nms" with :func:`batched_nms` on the scores weighted by the
+            weights of the detectors divided by the max weight.
+            Default: "weighted".
+        iou_threshold (float): IoU threshold to fuse two detections of the
+            same class. Default: 0.55.
+        concurrent (bool): Whether to forward the detectors concurrently in
+            threads. Default: False.
+        max_per_img (int, optional): Maximum number of detections kept
+            after fusing. Default: None.
+
+    Example:
+        >>> models = [init_detector(config, checkpoint)
+        >>>           for config, checkpoint in zip(configs, checkpoints)]
+        >>> ensemble = EnsembleInference(models, weights=[2, 1, 1])
+        >>> results = ensemble.predict(['demo/demo.jpg', img])
+        >>> ensemble.stats()
+    """
+
+    def __init__(self,
+                 models,
+                 weights=None,
+                 merge='weighted',
+                 iou_threshold=0.55,
+                 concurrent=False,
+                 max_per_img=None):
+        assert len(models) >= 1
+        assert merge in ('weighted', 'nms'), \
+            f'merge should be "weighted" or "nms", but got {merge}'
+        if weights is None:
+            weights = [1.] * len(models)
+        assert len(weights) == len(models)
+        num_classes = {len(model.CLASSES) for model in models}
+        assert len(num_classes) == 1, \
+            'the detectors of an ensemble should predict the same classes'
+        self.num_classes = num_classes.pop()
+        self.weights = weights
+        self.merge = merge
+        self.iou_threshold = iou_threshold
+        self.max_per_img = max_per_img
+
+        self.predictors = [Predictor(model) for model in models]
+        # the predictors of each group share the preprocessing of the first
+        self.groups = {}
+        for i, predictor in enumerate(self.predictors):
+            signature = _pipeline_signature(predictor)
+            self.groups.setdefault(signature, []).append(i)
+        self.executor = ThreadPoolExecutor(
+            len(models)) if concurrent and len(models) > 1 else None
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Reset the latency counters."""
+        self._num_batches = 0
+        self._preprocess_time = 0.
+        self._model_times = [0.] * len(self.predictors)
+        self._merge_time = 0.
+        self._total_time = 0.
+
+    def stats(self):
+        """Get the latency counters.
+
+        Returns:
+            dict: The number of batches since the last :meth:`reset_stats`,
+            and the mean latency in seconds per batch of the preprocessing,
+            the forward of each detector, the fusion and the whole
+            inference.
+        """
+        num_batches = max(self._num_batches, 1)
+        return dict(
+            num_batches=self._num_batches,
+            num_pipelines=len(self.groups),
+            preprocess_latency=self._preprocess_time / num_batches,
+            model_latencies=[t / num_batches for t in self._model_times],
+            merge_latency=self._merge_time / num_batches,
+            total_latency=self._total_time / num_batches)
+
+    def _forward(self, i, data):
+        start = time.perf_counter()
+        # the detectors may write into the image metas
+        data = dict(
+            data,
+            img_metas=[[dict(img_meta) for img_meta in img_metas]
+                       for img_metas in data['img_metas']])
+        results = self.predictors[i].forward_batch(data)
+        self._model_times[i] += time.perf_counter() - start
+        return results
+
+    def predict(self, imgs):
+        """Inference image(s) with the ensemble.
+
+        Only the bboxes are fused, the mask results of the detectors are
+        dropped.
+
+        Args:
+            imgs (str/ndarray or list[str/ndarray] or tuple[str/ndarray]):
+               Either image files or loaded images.
+
+        Returns:
+            If imgs is a list or tuple, the same length list type results
+            will be returned, otherwise return the bbox results of each
+            class directly.
+        """
+        if isinstance(imgs, (list, tuple)):
+            is_batch = True
+        else:
+            imgs = [imgs]
+            is_batch = False
+
+        start = time.perf_counter()
+        jobs = []
+        for inds in self.groups.values():
+            data = self.predictors[inds[0]].prepare_batch(imgs)
+            jobs.extend((i, data) for i in inds)
+        self._preprocess_time += time.perf_counter() - start
+
+        if self.executor is not None:
+            outputs = list(
+                self.executor.map(lambda job: self._forward(*job), jobs))
+        else:
+            outputs = [self._forward(*job) for job in jobs]
+        # the results of the detectors in their order
+        model_results = [None] * len(self.predictors)
+        for (i, _), output in zip(jobs, outputs):
+            model_results[i] = output
+
+        merge_start = time.perf_counter()
+        results = [
+            self._fuse(img_results) for img_results in zip(*model_results)
+        ]
+        end = time.perf_counter()
+        self._merge_time += end - merge_start
+        self._total_time += end - start
+        self._num_batches += 1
+
+        if not is_batch:
+            return results[0]
+        else:
+            return results
+
+    def _fuse(self, results):
+        """Fuse the results of an image from each detector."""
+        all_bboxes, all_labels = [], []
+        # the weighted scores of NMS are normalized by the max weight to
+        # keep them in [0, 1], those of weighted_merge by the total weight
+        score_scale = 1. if self.merge == 'weighted' else max(self.weights)
+        for result, weight in zip(results, self.weights):
+            if isinstance(result, tuple):
+                result = result[0]
+            result = result2compact(result)
+            bboxes = result['bboxes']
+            bboxes[:, 4] *= weight / score_scale
+            all_bboxes.append(bboxes)
+            all_labels.append(result['labels'])
+        bboxes = np.concatenate(all_bboxes)
+        labels = np.concatenate(all_labels)
+        if len(bboxes) > 0:
+            if self.merge == 'weighted':
+                bboxes, labels = weighted_merge(
+                    bboxes,
+                    labels,
+                    self.iou_threshold,
+                    score_norm=sum(self.weights))
+            else:
+                bboxes, keep = batched_nms(
+                    torch.from_numpy(bboxes[:, :4]),
+                    torch.from_numpy(bboxes[:, 4]), torch.from_numpy(labels),
+                    dict(type='nms', iou_threshold=self.iou_threshold))
+                bboxes, labels = bboxes.numpy(), labels[keep.numpy()]
+        if self.max_per_img is not None:
+            bboxes = bboxes[:self.max_per_img]
+            labels = labels[:self.max_per_img]
+        return compact2result(
+            dict(bboxes=bboxes, labels=labels), self.num_classes)
+
+    def close(self):
+        """Shut down the threads of the predictors and the detectors."""
+        for predictor in self.predictors:
+            predictor.close()
+        if self.executor is not None:
+            self.executor.shutdown()
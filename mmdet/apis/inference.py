@@ -1,8 +1,11 @@
 # Copyright (c) OpenMMLab. All rights reserved.
+import copy
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import mmcv
+import mmcv.cnn
 import numpy as np
 import torch
 from mmcv.ops import RoIPool
@@ -13,9 +16,14 @@ from mmdet.core import get_classes
 from mmdet.datasets import replace_ImageToTensor
 from mmdet.datasets.pipelines import Compose
 from mmdet.models import build_detector
+from .cache import hash_image, model_fingerprint
 
 
-def init_detector(config, checkpoint=None, device='cuda:0', cfg_options=None):
+def init_detector(config,
+                  checkpoint=None,
+                  device='cuda:0',
+                  cfg_options=None,
+                  cpu_optimize=False):
     """Initialize a detector from config file.
 
     Args:
@@ -25,6 +33,11 @@ def init_detector(config, checkpoint=None, device='cuda:0', cfg_options=None):
             will not load any weights.
         cfg_options (dict): Options to override some settings in the used
             config.
+        cpu_optimize (bool | dict): Whether to optimize the model for CPU
+            inference with :func:`optimize_for_cpu`, a dict is used as its
+            keyword arguments. ``RoIPool`` layers, which have no CPU
+            kernel, are replaced by ``RoIAlign`` in max mode as well. Only
+            valid when ``device`` is 'cpu'. Default: False.
 
     Returns:
         nn.Module: The constructed detector.
@@ -41,6 +54,12 @@ def init_detector(config, checkpoint=None, device='cuda:0', cfg_options=None):
     elif 'init_cfg' in config.model.backbone:
         config.model.backbone.init_cfg = None
     config.model.train_cfg = None
+    if cpu_optimize:
+        assert str(device) == 'cpu', \
+            '`cpu_optimize` is only valid for CPU inference'
+        if _replace_roi_pool(config.model):
+            warnings.warn('RoIPool is replaced by RoIAlign for CPU '
+                          'inference, the results may differ slightly.')
     model = build_detector(config.model, test_cfg=config.get('test_cfg'))
     if checkpoint is not None:
         checkpoint = load_checkpoint(model, checkpoint, map_location='cpu')
@@ -54,6 +73,10 @@ def init_detector(config, checkpoint=None, device='cuda:0', cfg_options=None):
     model.cfg = config  # save the config in the model for convenience
     model.to(device)
     model.eval()
+    if cpu_optimize:
+        if not isinstance(cpu_optimize, dict):
+            cpu_optimize = dict()
+        model = optimize_for_cpu(model, **cpu_optimize)
 
     if device == 'npu':
         from mmcv.device.npu import NPUDataParallel
@@ -63,6 +86,81 @@ def init_detector(config, checkpoint=None, device='cuda:0', cfg_options=None):
     return model
 
 
+def _replace_roi_pool(cfg):
+    """Replace ``RoIPool`` layers in a model config by ``RoIAlign`` in max
+    mode in place.
+
+    Returns:
+        bool: Whether any layer is replaced.
+    """
+    replaced = False
+    if isinstance(cfg, dict):
+        if cfg.get('type') == 'RoIPool':
+            cfg.update(
+                type='RoIAlign',
+                sampling_ratio=0,
+                pool_mode='max',
+                aligned=False)
+            return True
+        for value in cfg.values():
+            replaced |= _replace_roi_pool(value)
+    elif isinstance(cfg, (list, tuple)):
+        for value in cfg:
+            replaced |= _replace_roi_pool(value)
+    return replaced
+
+
+def optimize_for_cpu(model,
+                     fuse_conv_bn=True,
+                     channels_last=True,
+                     inference_mode=True,
+                     num_threads=None,
+                     trace_shape=None):
+    """Optimize a detector for CPU inference.
+
+    Args:
+        model (nn.Module): The detector on CPU.
+        fuse_conv_bn (bool): Whether to fuse conv and bn layers.
+            Default: True.
+        channels_last (bool): Whether to convert the model to the channels
+            last memory format, with which oneDNN runs convolutions faster.
+            Default: True.
+        inference_mode (bool): Whether :class:`Predictor` runs the model
+            under ``torch.inference_mode`` rather than ``torch.no_grad``.
+            Default: True.
+        num_threads (int, optional): Number of intra-op threads of torch.
+            Default: None, keep the current setting.
+        trace_shape (tuple[int], optional): If given, the backbone and the
+            neck are traced with TorchScript on a random input of this
+            (N, C, H, W) shape. Modules with shape dependent control flow
+            may not work with inputs of other shapes. Default: None.
+
+    Returns:
+        nn.Module: The optimized detector in eval mode.
+    """
+    model.eval()
+    if num_threads is not None:
+        torch.set_num_threads(num_threads)
+    if fuse_conv_bn:
+        model = mmcv.cnn.fuse_conv_bn(model)
+    if channels_last:
+        model = model.to(memory_format=torch.channels_last)
+    if trace_shape is not None:
+        img = torch.rand(trace_shape)
+        if channels_last:
+            img = img.contiguous(memory_format=torch.channels_last)
+        with torch.no_grad():
+            model.backbone = torch.jit.trace(model.backbone, img)
+            if getattr(model, 'with_neck', False):
+                feats = model.backbone(img)
+                model.neck = torch.jit.trace(model.neck, (feats, ))
+    # read by Predictor to prepare the inputs
+    model.use_channels_last = channels_last
+    model.use_inference_mode = inference_mode and hasattr(
+        torch, 'inference_mode')
+    return model
+
+
 class LoadImage:
     """Deprecated.
 
@@ -96,127 +194,223 @@ class LoadImage:
         return results
 
 
-def inference_detector(model, imgs):
-    """Inference image(s) with the detector.
+class Predictor:
+    """Inference images with a detector, doing the setup only once.
+
+    The test pipelines of image files and loaded images are built and the
+    device of the model is checked at initialization, so each call only
+    preprocesses and forwards the images.
 
     Args:
         model (nn.Module): The loaded detector.
-        imgs (str/ndarray or list[str/ndarray] or tuple[str/ndarray]):
-           Either image files or loaded images.
-
-    Returns:
-        If imgs is a list or tuple, the same length list type results
-        will be returned, otherwise return the detection results directly.
+        num_workers (int): Number of threads to preprocess the images of a
+            batch, 0 means preprocessing in the calling thread. Default: 0.
+        cache (:obj:`ResultCache`, optional): If specified, the results of
+            :meth:`predict` are cached by the content of the images and the
+            fingerprint of the model, so that repeated images skip both
+            preprocessing and the forward. The cached results are shared
+            and should not be modified in place. Default: None.
+
+    Example:
+        >>> model = init_detector(config_file, checkpoint_file)
+        >>> predictor = Predictor(model, num_workers=4)
+        >>> results = predictor.predict(['demo/demo.jpg', img])
     """
 
-    if isinstance(imgs, (list, tuple)):
-        is_batch = True
-    else:
-        imgs = [imgs]
-        is_batch = False
-
-    cfg = model.cfg
-    device = next(model.parameters()).device  # model device
-
-    if isinstance(imgs[0], np.ndarray):
-        cfg = cfg.copy()
+    def __init__(self, model, num_workers=0, cache=None):
+        self.model = model
+        param = next(model.parameters())
+        self.device = param.device  # model device
+        self.is_cuda = param.is_cuda
+        if not self.is_cuda:
+            for m in model.modules():
+                assert not isinstance(
+                    m, RoIPool
+                ), 'CPU inference with RoIPool is not supported currently.'
+
+        pipeline = replace_ImageToTensor(model.cfg.data.test.pipeline)
+        self.file_pipeline = Compose(pipeline)
+        pipeline = copy.deepcopy(pipeline)
         # set loading pipeline type
-        cfg.data.test.pipeline[0].type = 'LoadImageFromWebcam'
+        pipeline[0].type = 'LoadImageFromWebcam'
+        self.array_pipeline = Compose(pipeline)
+        self.executor = ThreadPoolExecutor(
+            num_workers) if num_workers > 0 else None
+        if getattr(model, 'use_inference_mode', False):
+            self.no_grad = torch.inference_mode
+        else:
+            self.no_grad = torch.no_grad
+        self.channels_last = getattr(model, 'use_channels_last', False)
+        self.cache = cache
+        # the weights are hashed once, so a cache shared by several models
+        # never mixes up their results
+        self.fingerprint = None if cache is None else model_fingerprint(model)
 
-    cfg.data.test.pipeline = replace_ImageToTensor(cfg.data.test.pipeline)
-    test_pipeline = Compose(cfg.data.test.pipeline)
+    def preprocess(self, img):
+        """Run the test pipeline on an image.
 
-    datas = []
-    for img in imgs:
-        # prepare data
+        Args:
+            img (str | ndarray): Either an image file or a loaded image.
+
+        Returns:
+            dict: The data of the image.
+        """
         if isinstance(img, np.ndarray):
             # directly add img
             data = dict(img=img)
+            return self.array_pipeline(data)
+        # add information into dict
+        data = dict(img_info=dict(filename=img), img_prefix=None)
+        return self.file_pipeline(data)
+
+    def prepare_batch(self, imgs):
+        """Preprocess images and collate them into a batch on the device.
+
+        Args:
+            imgs (list[str | ndarray]): Either image files or loaded images.
+
+        Returns:
+            dict: The inputs of the detector.
+        """
+        if self.executor is not None and len(imgs) > 1:
+            datas = list(self.executor.map(self.preprocess, imgs))
+        else:
+            datas = [self.preprocess(img) for img in imgs]
+
+        data = collate(datas, samples_per_gpu=len(imgs))
+        # just get the actual data from DataContainer
+        data['img_metas'] = [
+            img_metas.data[0] for img_metas in data['img_metas']
+        ]
+        data['img'] = [img.data[0] for img in data['img']]
+        if self.channels_last:
+            data['img'] = [
+                img.contiguous(memory_format=torch.channels_last)
+                for img in data['img']
+            ]
+        if self.is_cuda:
+            # scatter to specified GPU
+            data = scatter(data, [self.device])[0]
+        return data
+
+    def predict(self, imgs):
+        """Inference image(s) with the detector.
+
+        Args:
+            imgs (str/ndarray or list[str/ndarray] or tuple[str/ndarray]):
+               Either image files or loaded images.
+
+        Returns:
+            If imgs is a list or tuple, the same length list type results
+            will be returned, otherwise return the detection results directly.
+        """
+        if isinstance(imgs, (list, tuple)):
+            is_batch = True
+        else:
+            imgs = [imgs]
+            is_batch = False
+
+        if self.cache is None:
+            results = self._forward(imgs)
         else:
-            # add information into dict
-            data = dict(img_info=dict(filename=img), img_prefix=None)
-        # build the data pipeline
-        data = test_pipeline(data)
-        datas.append(data)
-
-    data = collate(datas, samples_per_gpu=len(imgs))
-    # just get the actual data from DataContainer
-    data['img_metas'] = [img_metas.data[0] for img_metas in data['img_metas']]
-    data['img'] = [img.data[0] for img in data['img']]
-    if next(model.parameters()).is_cuda:
-        # scatter to specified GPU
-        data = scatter(data, [device])[0]
-    else:
-        for m in model.modules():
-            assert not isinstance(
-                m, RoIPool
-            ), 'CPU inference with RoIPool is not supported currently.'
-
-    # forward the model
-    with torch.no_grad():
-        results = model(return_loss=False, rescale=True, **data)
-
-    if not is_batch:
-        return results[0]
-    else:
+            results = self._cached_forward(imgs)
+
+        if not is_batch:
+            return results[0]
+        else:
+            return results
+
+    def _forward(self, imgs):
+        return self.forward_batch(self.prepare_batch(imgs))
+
+    def forward_batch(self, data):
+        """Forward a preprocessed batch.
+
+        Args:
+            data (dict): The batch made by :meth:`prepare_batch`, which can
+                be shared by the predictors of the same test pipeline and
+                device.
+
+        Returns:
+            list: The detection results of the images.
+        """
+        with self.no_grad():
+            return self.model(return_loss=False, rescale=True, **data)
+
+    def _cached_forward(self, imgs):
+        keys = [(self.fingerprint, hash_image(img)) for img in imgs]
+        results = [self.cache.get(key) for key in keys]
+        # forward the missing images once even if they repeat in the batch
+        missing = {}
+        for i, (key, result) in enumerate(zip(keys, results)):
+            if result is None and key not in missing:
+                missing[key] = i
+        if missing:
+            forwarded = self._forward([imgs[i] for i in missing.values()])
+            forwarded = dict(zip(missing, forwarded))
+            for key, result in forwarded.items():
+                self.cache.put(key, result)
+            results = [
+                forwarded[key] if result is None else result
+                for key, result in zip(keys, results)
+            ]
         return results
 
+    async def async_predict(self, imgs):
+        """Async inference image(s) with the detector.
 
-async def async_inference_detector(model, imgs):
-    """Async inference image(s) with the detector.
+        Args:
+            imgs (str/ndarray or list[str/ndarray] or tuple[str/ndarray]):
+               Either image files or loaded images.
+
+        Returns:
+            Awaitable detection results.
+        """
+        if not isinstance(imgs, (list, tuple)):
+            imgs = [imgs]
+
+        data = self.prepare_batch(imgs)
+        # We don't restore `torch.is_grad_enabled()` value during concurrent
+        # inference since execution can overlap
+        torch.set_grad_enabled(False)
+        results = await self.model.aforward_test(rescale=True, **data)
+        return results
+
+    def close(self):
+        """Shut down the preprocessing threads."""
+        if self.executor is not None:
+            self.executor.shutdown()
+
+
+def inference_detector(model, imgs):
+    """Inference image(s) with the detector.
+
+    To inference many times with the same model, use :class:`Predictor`
+    instead, which does the setup only once.
 
     Args:
         model (nn.Module): The loaded detector.
-        img (str | ndarray): Either image files or loaded images.
+        imgs (str/ndarray or list[str/ndarray] or tuple[str/ndarray]):
+           Either image files or loaded images.
 
     Returns:
-        Awaitable detection results.
+        If imgs is a list or tuple, the same length list type results
+        will be returned, otherwise return the detection results directly.
     """
-    if not isinstance(imgs, (list, tuple)):
-        imgs = [imgs]
+    return Predictor(model).predict(imgs)
 
-    cfg = model.cfg
-    device = next(model.parameters()).device  # model device
 
-    if isinstance(imgs[0], np.ndarray):
-        cfg = cfg.copy()
-        # set loading pipeline type
-        cfg.data.test.pipeline[0].type = 'LoadImageFromWebcam'
+async def async_inference_detector(model, imgs):
+    """Async inference image(s) with the detector.
 
-    cfg.data.test.pipeline = replace_ImageToTensor(cfg.data.test.pipeline)
-    test_pipeline = Compose(cfg.data.test.pipeline)
+    Args:
+        model (nn.Module): The loaded detector.
+        img (str | ndarray): Either image files or loaded images.
 
-    datas = []
-    for img in imgs:
-        # prepare data
-        if isinstance(img, np.ndarray):
-            # directly add img
-            data = dict(img=img)
-        else:
-            # add information into dict
-            data = dict(img_info=dict(filename=img), img_prefix=None)
-        # build the data pipeline
-        data = test_pipeline(data)
-        datas.append(data)
-
-    data = collate(datas, samples_per_gpu=len(imgs))
-    # just get the actual data from DataContainer
-    data['img_metas'] = [img_metas.data[0] for img_metas in data['img_metas']]
-    data['img'] = [img.data[0] for img in data['img']]
-    if next(model.parameters()).is_cuda:
-        # scatter to specified GPU
-        data = scatter(data, [device])[0]
-    else:
-        for m in model.modules():
-            assert not isinstance(
-                m, RoIPool
-            ), 'CPU inference with RoIPool is not supported currently.'
-
-    # We don't restore `torch.is_grad_enabled()` value during concurrent
-    # inference since execution can overlap
-    torch.set_grad_enabled(False)
-    results = await model.aforward_test(rescale=True, **data)
-    return results
+    Returns:
+        Awaitable detection results.
+    """
+    return await Predictor(model).async_predict(imgs)
 
 
 def show_result_pyplot(model,
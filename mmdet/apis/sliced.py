@@ -0,0 +1,244 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import mmcv
+import numpy as np
+import torch
+from mmcv.ops import batched_nms
+
+from mmdet.core import compact2result, result2compact
+from mmdet.core.evaluation.bbox_overlaps import bbox_overlaps
+
+
+def get_slices(height, width, slice_size, overlap_ratio=0.2):
+    """Get the windows to slice an image into overlapping tiles.
+
+    The tiles cover the whole image. Those at the right and bottom borders
+    are shifted inwards, so that all the tiles have the same size unless
+    the image is smaller than a tile.
+
+    Args:
+        height (int): Height of the image.
+        width (int): Width of the image.
+        slice_size (int | tuple[int]): Size of the tiles, as (h, w) if it
+            is a tuple.
+        overlap_ratio (float): Ratio of the overlap between two neighbouring
+            tiles to the tile size. Default: 0.2.
+
+    Returns:
+        ndarray: Shape (n, 4), the windows of the tiles in
+        ``(x1, y1, x2, y2)`` order.
+    """
+    assert 0 <= overlap_ratio < 1
+    if isinstance(slice_size, int):
+        slice_size = (slice_size, slice_size)
+
+    def get_starts(length, size):
+        if length <= size:
+            return np.zeros(1, dtype=np.int64)
+        step = max(int(size * (1 - overlap_ratio)), 1)
+        starts = np.arange(0, length - size, step, dtype=np.int64)
+        return np.append(starts, length - size)
+
+    slice_h, slice_w = slice_size
+    ys = get_starts(height, slice_h)
+    xs = get_starts(width, slice_w)
+    x1, y1 = np.meshgrid(xs, ys)
+    x1, y1 = x1.reshape(-1), y1.reshape(-1)
+    x2 = np.minimum(x1 + slice_w, width)
+    y2 = np.minimum(y1 + slice_h, height)
+    return np.stack([x1, y1, x2, y2], axis=1)
+
+
+def weighted_merge(bboxes, labels, iou_threshold=0.5, score_norm=None):
+    """Merge the overlapping bboxes of each class by averaging them.
+
+    The bboxes are visited in descending order of scores. Each one either
+    joins the first cluster of the same class whose top bbox overlaps it
+    by more than ``iou_threshold``, or starts a new cluster. The bbox of a
+    cluster is the average of its bboxes weighted by their scores, and its
+    score is the top score.
+
+    Args:
+        bboxes (ndarray): Shape (n, 5), the bboxes and their scores.
+        labels (ndarray): Shape (n, ), the labels of the bboxes.
+        iou_threshold (float): IoU threshold to merge two bboxes.
+            Default: 0.5.
+        score_norm (float, optional): If specified, the score of a cluster
+            is the sum of its scores divided by ``score_norm`` instead, e.g.
+            by the total weight of the models of an ensemble, so that the
+            bboxes found by fewer models get lower scores. Default: None.
+
+    Returns:
+        tuple[ndarray]: The merged bboxes and their labels, in descending
+        order of scores.
+    """
+    order = np.argsort(-bboxes[:, 4], kind='stable')
+    bboxes, labels = bboxes[order], labels[order]
+    clusters = np.full(len(bboxes), -1, dtype=np.int64)
+    for label in np.unique(labels):
+        inds = np.nonzero(labels == label)[0]
+        for i in inds:
+            if clusters[i] >= 0:
+                continue
+            clusters[i] = i
+            # the ious are computed against the unclustered bboxes only, to
+            # keep the memory linear in the number of bboxes
+            rest = inds[clusters[inds] < 0]
+            if len(rest) > 0:
+                ious = bbox_overlaps(bboxes[i:i + 1, :4], bboxes[rest, :4])[0]
+                clusters[rest[ious > iou_threshold]] = i
+    heads, clusters = np.unique(clusters, return_inverse=True)
+    weights = bboxes[:, 4:5]
+    merged = np.zeros((len(heads), 5), dtype=bboxes.dtype)
+    np.add.at(merged, clusters,
+              np.concatenate([bboxes[:, :4] * weights, weights], axis=1))
+    merged[:, :4] /= np.maximum(merged[:, 4:5], np.finfo(np.float32).eps)
+    if score_norm is None:
+        merged[:, 4] = bboxes[heads, 4]
+        return merged, labels[heads]
+    merged[:, 4] /= score_norm
+    order = np.argsort(-merged[:, 4], kind='stable')
+    return merged[order], labels[heads][order]
+
+
+class SlicedInference:
+    """Detect the objects in a large image by slicing it into tiles.
+
+    Very large images, e.g. aerial images or scanned documents, are either
+    downsized by the test pipeline, which loses the small objects, or run
+    out of memory. Instead, the image is sliced into overlapping tiles of a
+    fixed size, which are forwarded in batches. The detections of the tiles
+    are shifted back to the image and merged across the borders of the
+    tiles. Only a batch of tiles is preprocessed at a time, so the memory
+    of the forward is bounded regardless of the image size.
+
+    Args:
+        predictor (:obj:`Predictor`): The predictor to run the batches of
+            tiles. Any object whose ``predict`` takes a list of images and
+            returns a list of results, and which has the detector as
+            ``model``, can be used.
+        slice_size (int | tuple[int]): Size of the tiles, as (h, w) if it
+            is a tuple. Default: 1024.
+        overlap_ratio (float): Ratio of the overlap between two neighbouring
+            tiles to the tile size. It should be large enough for the
+            objects crossing a border to be entirely in a tile.
+            Default: 0.2.
+        batch_size (int): Number of tiles forwarded in a batch. Default: 4.
+        merge (str): How to merge the detections of the tiles, either
+            "nms" with :func:`batched_nms` or "weighted" with
+            :func:`weighted_merge`. Default: "nms".
+        iou_threshold (float): IoU threshold to merge two detections of the
+            same class. Default: 0.5.
+        score_thr (float): Detections with scores below this threshold are
+            dropped before merging. Default: 0.
+        full_image_size (int, optional): If specified, the image downsized
+            to this longer side is also forwarded, and its detections, e.g.
+            of the objects larger than a tile, are merged with those of the
+            tiles. Default: None.
+        max_per_img (int, optional): Maximum number of detections kept
+            after merging. Default: None.
+
+    Example:
+        >>> predictor = Predictor(init_detector(config_file, checkpoint_file))
+        >>> sliced = SlicedInference(predictor, slice_size=1024)
+        >>> result = sliced.predict('aerial.png')
+    """
+
+    def __init__(self,
+                 predictor,
+                 slice_size=1024,
+                 overlap_ratio=0.2,
+                 batch_size=4,
+                 merge='nms',
+                 iou_threshold=0.5,
+                 score_thr=0.,
+                 full_image_size=None,
+                 max_per_img=None):
+        assert merge in ('nms', 'weighted'), \
+            f'merge should be "nms" or "weighted", but got {merge}'
+        assert batch_size >= 1
+        self.predictor = predictor
+        self.slice_size = slice_size
+        self.overlap_ratio = overlap_ratio
+        self.batch_size = batch_size
+        self.merge = merge
+        self.iou_threshold = iou_threshold
+        self.score_thr = score_thr
+        self.full_image_size = full_image_size
+        self.max_per_img = max_per_img
+
+    def _predict_bboxes(self, imgs):
+        """Predict a batch of images and flatten the bboxes of each."""
+        outputs = []
+        for result in self.predictor.predict(imgs):
+            # only the bboxes are merged across the tiles
+            if isinstance(result, tuple):
+                result = result[0]
+            result = result2compact(result)
+            bboxes, labels = result['bboxes'], result['labels']
+            keep = bboxes[:, 4] >= self.score_thr
+            outputs.append((bboxes[keep], labels[keep]))
+        return outputs
+
+    def predict(self, img):
+        """Detect the objects in an image.
+
+        Args:
+            img (str | ndarray): Either an image file or a loaded image.
+
+        Returns:
+            list[ndarray]: The bbox results of each class, in the
+            coordinates of the image.
+        """
+        if isinstance(img, str):
+            img = mmcv.imread(img)
+        height, width = img.shape[:2]
+        num_classes = len(self.predictor.model.CLASSES)
+
+        all_bboxes, all_labels = [], []
+        windows = get_slices(height, width, self.slice_size,
+                             self.overlap_ratio)
+        for i in range(0, len(windows), self.batch_size):
+            batch_windows = windows[i:i + self.batch_size]
+            tiles = [
+                np.ascontiguousarray(img[y1:y2, x1:x2])
+                for x1, y1, x2, y2 in batch_windows
+            ]
+            outputs = self._predict_bboxes(tiles)
+            for window, (bboxes, labels) in zip(batch_windows, outputs):
+                # shift the bboxes from the tile to the image
+                x1, y1 = window[:2]
+                bboxes[:, :4] += np.array([x1, y1, x1, y1], dtype=bboxes.dtype)
+                all_bboxes.append(bboxes)
+                all_labels.append(labels)
+
+        if self.full_image_size is not None:
+            scale = min(self.full_image_size / max(height, width), 1.)
+            small_img = mmcv.imrescale(img, scale)
+            (bboxes, labels), = self._predict_bboxes([small_img])
+            # the exact ratios of the sizes of the rescaled image
+            scale_x = width / small_img.shape[1]
+            scale_y = height / small_img.shape[0]
+            bboxes[:, :4] *= np.array([scale_x, scale_y, scale_x, scale_y],
+                                      dtype=bboxes.dtype)
+            all_bboxes.append(bboxes)
+            all_labels.append(labels)
+
+        bboxes = np.concatenate(all_bboxes)
+        labels = np.concatenate(all_labels)
+        if len(bboxes) > 0:
+            bboxes, labels = self._merge(bboxes, labels)
+        if self.max_per_img is not None:
+            bboxes = bboxes[:self.max_per_img]
+            labels = labels[:self.max_per_img]
+        return compact2result(dict(bboxes=bboxes, labels=labels), num_classes)
+
+    def _merge(self, bboxes, labels):
+        """Merge the detections of the tiles, in descending order of
+        scores."""
+        if self.merge == 'weighted':
+            return weighted_merge(bboxes, labels, self.iou_threshold)
+        dets, keep = batched_nms(
+            torch.from_numpy(bboxes[:, :4]), torch.from_numpy(bboxes[:, 4]),
+            torch.from_numpy(labels),
+            dict(type='nms', iou_threshold=self.iou_threshold))
+        return dets.numpy(), labels[keep.numpy()]
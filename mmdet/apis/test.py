@@ -3,7 +3,13 @@ import os.path as osp
 import pickle
 import shutil
 import tempfile
+import threading
 import time
+import weakref
+from collections import deque
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
 import mmcv
 import torch
@@ -11,74 +17,187 @@ import torch.distributed as dist
 from mmcv.image import tensor2imgs
 from mmcv.runner import get_dist_info
 
-from mmdet.core import encode_mask_results
+from mmdet.core import encode_mask_results, result2compact
+from mmdet.core.utils.dist_utils import _get_global_gloo_group
+from mmdet.datasets.api_wrappers import (ColumnarResultDumper,
+                                         ResultsWithColumns,
+                                         merge_columnar_results)
 
 
 def single_gpu_test(model,
                     data_loader,
                     show=False,
                     out_dir=None,
-                    show_score_thr=0.3):
+                    show_score_thr=0.3,
+                    post_workers=0,
+                    compact_results=False,
+                    columnar_prefix=None):
+    """Test model with a single gpu.
+
+    If ``post_workers`` is positive, the outputs of each batch are post
+    processed (i.e., mask encoding and painting images to ``out_dir``) by a
+    pool of background threads while the next batches are forwarded. At most
+    ``2 * post_workers`` batches are pending, after that the test loop waits
+    for the oldest one, and the results are kept in the dataset order.
+
+    If ``columnar_prefix`` is given, the detections of each batch are also
+    written to the columnar format of :meth:`CocoDataset.results2columns`,
+    and the results come with the columns as a :class:`ResultsWithColumns`,
+    which the dataset evaluates and formats without converting them again.
+
+    Args:
+        model (nn.Module): Model to be tested.
+        data_loader (nn.Dataloader): Pytorch data loader.
+        show (bool): Whether to show the painted images. Default: False.
+        out_dir (str, optional): Directory to save the painted images.
+            Default: None.
+        show_score_thr (float): Minimum score of bboxes to be painted.
+            Default: 0.3.
+        post_workers (int): Number of threads for post processing, 0 means
+            post processing in the test loop. Default: 0.
+        compact_results (bool): Whether to convert the detection results of
+            each image to the compact form of :func:`result2compact`.
+            Default: False.
+        columnar_prefix (str, optional): The directory prefix of the columns
+            of the detections. If the prefix is "somepath/xxx", the columns
+            are saved in "somepath/xxx.bbox", "somepath/xxx.segm" and
+            "somepath/xxx.proposal". Default: None.
+
+    Returns:
+        list | :obj:`ResultsWithColumns`: The prediction results.
+    """
     model.eval()
     results = []
     dataset = data_loader.dataset
+    dumper = None
+    if columnar_prefix is not None:
+        dumper = ColumnarResultDumper(columnar_prefix)
     PALETTE = getattr(dataset, 'PALETTE', None)
     prog_bar = mmcv.ProgressBar(len(dataset))
+    post_process = partial(
+        _post_process_batch,
+        model,
+        show=show,
+        out_dir=out_dir,
+        show_score_thr=show_score_thr,
+        palette=PALETTE,
+        compact_results=compact_results)
+    if post_workers > 0:
+        # windows can only be shown in the main thread
+        assert not show, 'show is not supported with post_workers'
+        executor = ThreadPoolExecutor(post_workers)
+    else:
+        executor = None
+    pending = deque()
+
+    def collect(batch_result):
+        if dumper is not None:
+            img_inds = range(len(results), len(results) + len(batch_result))
+            dumper.write(dataset.results2arrays(batch_result, img_inds))
+        results.extend(batch_result)
+        for _ in range(len(batch_result)):
+            prog_bar.update()
+
     for i, data in enumerate(data_loader):
         with torch.no_grad():
             result = model(return_loss=False, rescale=True, **data)
 
-        batch_size = len(result)
-        if show or out_dir:
-            if batch_size == 1 and isinstance(data['img'][0], torch.Tensor):
-                img_tensor = data['img'][0]
-            else:
-                img_tensor = data['img'][0].data[0]
-            img_metas = data['img_metas'][0].data[0]
-            imgs = tensor2imgs(img_tensor, **img_metas[0]['img_norm_cfg'])
-            assert len(imgs) == len(img_metas)
+        if executor is None:
+            collect(post_process(data, result))
+            continue
+        pending.append(executor.submit(post_process, data, result))
+        # wait for the oldest batch if too many batches are pending
+        while len(pending) > 2 * post_workers:
+            collect(pending.popleft().result())
+
+    while pending:
+        collect(pending.popleft().result())
+    if executor is not None:
+        executor.shutdown()
+    if dumper is not None:
+        results = ResultsWithColumns(results, dumper.close())
+    return results
+
+
+# pyplot used by ``show_result`` is not thread-safe
+_show_result_lock = threading.Lock()
 
-            for i, (img, img_meta) in enumerate(zip(imgs, img_metas)):
-                h, w, _ = img_meta['img_shape']
-                img_show = img[:h, :w, :]
 
-                ori_h, ori_w = img_meta['ori_shape'][:-1]
-                img_show = mmcv.imresize(img_show, (ori_w, ori_h))
+def _post_process_batch(model, data, result, show, out_dir, show_score_thr,
+                        palette, compact_results):
+    """Paint the images of a batch if needed, encode the mask results and
+    compact the results if needed."""
+    batch_size = len(result)
+    if show or out_dir:
+        if batch_size == 1 and isinstance(data['img'][0], torch.Tensor):
+            img_tensor = data['img'][0]
+        else:
+            img_tensor = data['img'][0].data[0]
+        img_metas = data['img_metas'][0].data[0]
+        imgs = tensor2imgs(img_tensor, **img_metas[0]['img_norm_cfg'])
+        assert len(imgs) == len(img_metas)
 
-                if out_dir:
-                    out_file = osp.join(out_dir, img_meta['ori_filename'])
-                else:
-                    out_file = None
+        for i, (img, img_meta) in enumerate(zip(imgs, img_metas)):
+            h, w, _ = img_meta['img_shape']
+            img_show = img[:h, :w, :]
 
+            ori_h, ori_w = img_meta['ori_shape'][:-1]
+            img_show = mmcv.imresize(img_show, (ori_w, ori_h))
+
+            if out_dir:
+                out_file = osp.join(out_dir, img_meta['ori_filename'])
+            else:
+                out_file = None
+
+            with _show_result_lock:
                 model.module.show_result(
                     img_show,
                     result[i],
-                    bbox_color=PALETTE,
-                    text_color=PALETTE,
-                    mask_color=PALETTE,
+                    bbox_color=palette,
+                    text_color=palette,
+                    mask_color=palette,
                     show=show,
                     out_file=out_file,
                     score_thr=show_score_thr)
 
-        # encode mask results
-        if isinstance(result[0], tuple):
-            result = [(bbox_results, encode_mask_results(mask_results))
-                      for bbox_results, mask_results in result]
-        # This logic is only used in panoptic segmentation test.
-        elif isinstance(result[0], dict) and 'ins_results' in result[0]:
-            for j in range(len(result)):
-                bbox_results, mask_results = result[j]['ins_results']
-                result[j]['ins_results'] = (bbox_results,
-                                            encode_mask_results(mask_results))
+    result = _encode_batch_mask_results(result)
+    if compact_results:
+        result = _compact_batch_results(result)
+    return result
 
-        results.extend(result)
 
-        for _ in range(batch_size):
-            prog_bar.update()
-    return results
+def _encode_batch_mask_results(result):
+    """Encode the mask results of a batch to RLE."""
+    # encode mask results
+    if isinstance(result[0], tuple):
+        result = [(bbox_results, encode_mask_results(mask_results))
+                  for bbox_results, mask_results in result]
+    # This logic is only used in panoptic segmentation test.
+    elif isinstance(result[0], dict) and 'ins_results' in result[0]:
+        for j in range(len(result)):
+            bbox_results, mask_results = result[j]['ins_results']
+            result[j]['ins_results'] = (bbox_results,
+                                        encode_mask_results(mask_results))
+    return result
 
 
-def multi_gpu_test(model, data_loader, tmpdir=None, gpu_collect=False):
+def _compact_batch_results(result):
+    """Convert the per-class detection results of a batch to the compact
+    form, other results are kept."""
+    return [
+        result2compact(img_result) if isinstance(img_result,
+                                                 (list, tuple)) else img_result
+        for img_result in result
+    ]
+
+
+def multi_gpu_test(model,
+                   data_loader,
+                   tmpdir=None,
+                   gpu_collect=False,
+                   spill_chunk_size=None,
+                   compact_results=False,
+                   columnar_prefix=None):
     """Test model with multiple gpus.
 
     This method tests model with multiple gpus and collects the results
@@ -87,37 +206,71 @@ def multi_gpu_test(model, data_loader, tmpdir=None, gpu_collect=False):
     collection. On cpu mode it saves the results on different gpus to 'tmpdir'
     and collects them by the rank 0 worker.
 
+    On cpu mode, if ``spill_chunk_size`` is given, results are not kept in
+    memory during testing. Each rank appends every ``spill_chunk_size``
+    results to its part file in 'tmpdir', and rank 0 returns a
+    :class:`SpilledResults` which loads them lazily in dataset order.
+
+    If ``columnar_prefix`` is given, each rank also writes the detections of
+    each batch to its part of the columns as :func:`single_gpu_test` does,
+    and rank 0 merges the parts and returns a :class:`ResultsWithColumns`.
+    The parts are saved in "{columnar_prefix}.parts", so it should be
+    shared by all the ranks.
+
     Args:
         model (nn.Module): Model to be tested.
         data_loader (nn.Dataloader): Pytorch data loader.
         tmpdir (str): Path of directory to save the temporary results from
             different gpus under cpu mode.
         gpu_collect (bool): Option to use either gpu or cpu to collect results.
+        spill_chunk_size (int, optional): Number of results in each chunk
+            spilled to 'tmpdir' under cpu mode. Default: None.
+        compact_results (bool): Whether to convert the detection results of
+            each image to the compact form of :func:`result2compact`, which
+            is faster to collect. Default: False.
+        columnar_prefix (str, optional): The directory prefix of the columns
+            of the detections, see :func:`single_gpu_test`. Default: None.
 
     Returns:
-        list: The prediction results.
+        list | :obj:`SpilledResults` | :obj:`ResultsWithColumns`: The
+        prediction results.
     """
     model.eval()
     results = []
     dataset = data_loader.dataset
     rank, world_size = get_dist_info()
+    dumper = None
+    if columnar_prefix is not None:
+        part_dir = f'{columnar_prefix}.parts'
+        dumper = ColumnarResultDumper(osp.join(part_dir, f'part_{rank}'))
+    num_local_results = 0
+    if spill_chunk_size is not None:
+        assert not gpu_collect, \
+            'spill_chunk_size is only supported when collecting on cpu'
+        tmpdir = _get_dist_tmpdir(tmpdir)
+        results = ResultSpillWriter(
+            osp.join(tmpdir, f'part_{rank}.pkl'), spill_chunk_size)
     if rank == 0:
         prog_bar = mmcv.ProgressBar(len(dataset))
     time.sleep(2)  # This line can prevent deadlock problem in some cases.
     for i, data in enumerate(data_loader):
         with torch.no_grad():
             result = model(return_loss=False, rescale=True, **data)
-            # encode mask results
-            if isinstance(result[0], tuple):
-                result = [(bbox_results, encode_mask_results(mask_results))
-                          for bbox_results, mask_results in result]
-            # This logic is only used in panoptic segmentation test.
-            elif isinstance(result[0], dict) and 'ins_results' in result[0]:
-                for j in range(len(result)):
-                    bbox_results, mask_results = result[j]['ins_results']
-                    result[j]['ins_results'] = (
-                        bbox_results, encode_mask_results(mask_results))
+            result = _encode_batch_mask_results(result)
+        if compact_results:
+            result = _compact_batch_results(result)
 
+        if dumper is not None:
+            # the i-th result of each rank is the image ``i * world_size +
+            # rank`` as in collect_results_cpu, the padded ones are skipped
+            img_inds = [(num_local_results + j) * world_size + rank
+                        for j in range(len(result))]
+            kept = [(idx, res) for idx, res in zip(img_inds, result)
+                    if idx < len(dataset)]
+            if kept:
+                img_inds, kept_result = zip(*kept)
+                dumper.write(dataset.results2arrays(kept_result, img_inds))
+        num_local_results += len(result)
         results.extend(result)
 
         if rank == 0:
@@ -126,16 +279,34 @@ def multi_gpu_test(model, data_loader, tmpdir=None, gpu_collect=False):
                 prog_bar.update()
 
     # collect results from all ranks
-    if gpu_collect:
+    if spill_chunk_size is not None:
+        results.close()
+        dist.barrier()
+        if rank == 0:
+            results = SpilledResults(tmpdir, len(dataset), world_size)
+        else:
+            results = None
+    elif gpu_collect:
         results = collect_results_gpu(results, len(dataset))
     else:
         results = collect_results_cpu(results, len(dataset), tmpdir)
+
+    if dumper is not None:
+        dumper.close()
+        dist.barrier()
+        if rank == 0:
+            # merge the columns of all ranks
+            result_dirs = merge_columnar_results(
+                [osp.join(part_dir, f'part_{i}') for i in range(world_size)],
+                columnar_prefix)
+            shutil.rmtree(part_dir)
+            results = ResultsWithColumns(results, result_dirs)
     return results
 
 
-def collect_results_cpu(result_part, size, tmpdir=None):
-    rank, world_size = get_dist_info()
-    # create a tmp dir if it is not specified
+def _get_dist_tmpdir(tmpdir=None):
+    """Create a tmp dir shared by all ranks if it is not specified."""
+    rank, _ = get_dist_info()
     if tmpdir is None:
         MAX_LEN = 512
         # 32 is whitespace
@@ -153,6 +324,128 @@ def collect_results_cpu(result_part, size, tmpdir=None):
         tmpdir = dir_tensor.cpu().numpy().tobytes().decode().rstrip()
     else:
         mmcv.mkdir_or_exist(tmpdir)
+    return tmpdir
+
+
+class ResultSpillWriter:
+    """Append results to a part file chunk by chunk.
+
+    Every ``chunk_size`` results are pickled and appended to the part file,
+    and the offsets of the chunks are saved to an index file next to it by
+    :meth:`close`.
+
+    Args:
+        part_file (str): Path of the part file.
+        chunk_size (int): Number of results in each chunk.
+    """
+
+    def __init__(self, part_file, chunk_size):
+        assert chunk_size > 0
+        self.part_file = part_file
+        self.chunk_size = chunk_size
+        self._file = open(part_file, 'wb')
+        self._buffer = []
+        self.offsets = []
+        self.num_results = 0
+
+    def extend(self, results):
+        """Add results, a chunk is spilled whenever it is full."""
+        self._buffer.extend(results)
+        while len(self._buffer) >= self.chunk_size:
+            self._spill(self._buffer[:self.chunk_size])
+            self._buffer = self._buffer[self.chunk_size:]
+
+    def _spill(self, chunk):
+        self.offsets.append(self._file.tell())
+        pickle.dump(chunk, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.num_results += len(chunk)
+
+    def close(self):
+        """Spill the last chunk and save the index of chunks."""
+        if self._buffer:
+            self._spill(self._buffer)
+            self._buffer = []
+        self._file.close()
+        index = dict(
+            chunk_size=self.chunk_size,
+            offsets=self.offsets,
+            num_results=self.num_results)
+        mmcv.dump(index, _index_file(self.part_file))
+
+
+def _index_file(part_file):
+    return osp.splitext(part_file)[0] + '_index.pkl'
+
+
+class SpilledResults(Sequence):
+    """A read-only view of the results spilled by all ranks.
+
+    Results are ordered in the same way as :func:`collect_results_cpu`,
+    i.e., the i-th result is from rank ``i % world_size``. Chunks are loaded
+    on access and only the last loaded chunk of each rank is kept in memory,
+    so iterating over the results in order loads each chunk once. The
+    tmp dir is removed when the view is garbage collected. Pickling the view
+    gives a plain list of all the results.
+
+    Args:
+        tmpdir (str): Directory of the part files.
+        size (int): Size of the dataset, results padded by the dataloader
+            are dropped.
+        world_size (int): Number of ranks.
+    """
+
+    def __init__(self, tmpdir, size, world_size):
+        self.tmpdir = tmpdir
+        self.world_size = world_size
+        self.part_files = [
+            osp.join(tmpdir, f'part_{i}.pkl') for i in range(world_size)
+        ]
+        self.indexes = [mmcv.load(_index_file(f)) for f in self.part_files]
+        # the results of all ranks are zipped as in collect_results_cpu
+        self.size = min(
+            size,
+            world_size * min(index['num_results'] for index in self.indexes))
+        self._chunks = [(None, None)] * world_size
+        self._finalizer = weakref.finalize(
+            self, shutil.rmtree, tmpdir, ignore_errors=True)
+
+    def __len__(self):
+        return self.size
+
+    def _load_chunk(self, rank, chunk_idx):
+        cached_idx, chunk = self._chunks[rank]
+        if cached_idx != chunk_idx:
+            with open(self.part_files[rank], 'rb') as f:
+                f.seek(self.indexes[rank]['offsets'][chunk_idx])
+                chunk = pickle.load(f)
+            self._chunks[rank] = (chunk_idx, chunk)
+        return chunk
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(self.size))]
+        if idx < 0:
+            idx += self.size
+        if not 0 <= idx < self.size:
+            raise IndexError('result index out of range')
+        rank = idx % self.world_size
+        local_idx = idx // self.world_size
+        chunk_size = self.indexes[rank]['chunk_size']
+        chunk = self._load_chunk(rank, local_idx // chunk_size)
+        return chunk[local_idx % chunk_size]
+
+    def __reduce__(self):
+        return list, (list(self), )
+
+    def cleanup(self):
+        """Remove the tmp dir."""
+        self._chunks = [(None, None)] * self.world_size
+        self._finalizer()
+
+
+def collect_results_cpu(result_part, size, tmpdir=None):
+    rank, world_size = get_dist_info()
+    tmpdir = _get_dist_tmpdir(tmpdir)
     # dump the part result to the dir
     mmcv.dump(result_part, osp.join(tmpdir, f'part_{rank}.pkl'))
     dist.barrier()
@@ -176,34 +469,87 @@ def collect_results_cpu(result_part, size, tmpdir=None):
         return ordered_results
 
 
-def collect_results_gpu(result_part, size):
+def collect_results_gpu(result_part, size, chunk_size=2**24):
+    """Collect results from all ranks to rank 0 via gpu communication.
+
+    The pickled results of each rank are sent to rank 0 in chunks of
+    ``chunk_size`` bytes, so no rank needs to hold the results of all the
+    ranks on the device. If the backend is gloo, the results are collected
+    by :func:`collect_results_gloo` instead.
+
+    Args:
+        result_part (list): Results of this rank.
+        size (int): Size of the dataset.
+        chunk_size (int): Number of bytes sent at a time. Default: 2**24.
+
+    Returns:
+        list | None: The ordered results on rank 0 and None on other ranks.
+    """
+    if dist.get_backend() == 'gloo':
+        return collect_results_gloo(result_part, size, chunk_size)
+    part_list = _gather_part_bytes(result_part, chunk_size, device='cuda')
+    return _merge_part_bytes(part_list, size)
+
+
+def collect_results_gloo(result_part, size, chunk_size=2**24):
+    """Collect results from all ranks to rank 0 via cpu communication.
+
+    Same as :func:`collect_results_gpu` but the chunks are cpu tensors sent
+    through a gloo group, so neither CUDA nor a tmp dir shared by all the
+    ranks is needed.
+
+    Args:
+        result_part (list): Results of this rank.
+        size (int): Size of the dataset.
+        chunk_size (int): Number of bytes sent at a time. Default: 2**24.
+
+    Returns:
+        list | None: The ordered results on rank 0 and None on other ranks.
+    """
+    part_list = _gather_part_bytes(
+        result_part, chunk_size, device='cpu', group=_get_global_gloo_group())
+    return _merge_part_bytes(part_list, size)
+
+
+def _gather_part_bytes(result_part, chunk_size, device, group=None):
+    """Send the pickled result part of each rank to rank 0 in chunks."""
     rank, world_size = get_dist_info()
-    # dump result part to tensor with pickle
-    part_tensor = torch.tensor(
-        bytearray(pickle.dumps(result_part)), dtype=torch.uint8, device='cuda')
-    # gather all result part tensor shape
-    shape_tensor = torch.tensor(part_tensor.shape, device='cuda')
+    part_bytes = pickle.dumps(result_part)
+    # gather the number of bytes of all ranks
+    shape_tensor = torch.tensor([len(part_bytes)], device=device)
     shape_list = [shape_tensor.clone() for _ in range(world_size)]
-    dist.all_gather(shape_list, shape_tensor)
-    # padding result part tensor to max length
-    shape_max = torch.tensor(shape_list).max()
-    part_send = torch.zeros(shape_max, dtype=torch.uint8, device='cuda')
-    part_send[:shape_tensor[0]] = part_tensor
-    part_recv_list = [
-        part_tensor.new_zeros(shape_max) for _ in range(world_size)
-    ]
-    # gather all result part
-    dist.all_gather(part_recv_list, part_send)
+    dist.all_gather(shape_list, shape_tensor, group=group)
+    if rank != 0:
+        for start in range(0, len(part_bytes), chunk_size):
+            chunk = torch.tensor(
+                bytearray(part_bytes[start:start + chunk_size]),
+                dtype=torch.uint8,
+                device=device)
+            dist.send(chunk, dst=0, group=group)
+        return None
 
-    if rank == 0:
-        part_list = []
-        for recv, shape in zip(part_recv_list, shape_list):
-            part_list.append(
-                pickle.loads(recv[:shape[0]].cpu().numpy().tobytes()))
-        # sort the results
-        ordered_results = []
-        for res in zip(*part_list):
-            ordered_results.extend(list(res))
-        # the dataloader may pad some samples
-        ordered_results = ordered_results[:size]
-        return ordered_results
+    part_list = [part_bytes]
+    recv_buffer = torch.empty(chunk_size, dtype=torch.uint8, device=device)
+    for src in range(1, world_size):
+        num_bytes = shape_list[src].item()
+        chunks = []
+        for start in range(0, num_bytes, chunk_size):
+            recv = recv_buffer[:min(chunk_size, num_bytes - start)]
+            dist.recv(recv, src=src, group=group)
+            chunks.append(recv.cpu().numpy().tobytes())
+        part_list.append(b''.join(chunks))
+    return part_list
+
+
+def _merge_part_bytes(part_list, size):
+    """Unpickle the result parts on rank 0 and put them in order."""
+    if part_list is None:
+        return None
+    part_list = [pickle.loads(part_bytes) for part_bytes in part_list]
+    # sort the results
+    ordered_results = []
+    for res in zip(*part_list):
+        ordered_results.extend(list(res))
+    # the dataloader may pad some samples
+    ordered_results = ordered_results[:size]
+    return ordered_results
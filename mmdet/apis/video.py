@@ -0,0 +1,158 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import queue
+import threading
+import time
+
+# marks the end of the frames in the queues
+_END = object()
+
+
+class VideoInference:
+    """Run a detector over a video with a pipeline of three stages.
+
+    The frames are decoded in a thread, forwarded in batches in the calling
+    thread, and passed with their results to a sink in another thread, e.g.
+    to draw and encode them. The stages are connected by bounded queues,
+    so that they run concurrently with bounded memory, and the sink gets
+    the frames in order.
+
+    Args:
+        predictor (:obj:`Predictor`): The predictor to run the batches. Any
+            object whose ``predict`` takes a list of frames and returns a
+            list of results can be used.
+        batch_size (int): Number of frames forwarded in a batch. Default: 4.
+        queue_size (int): Number of frames buffered between two stages.
+            Default: 16.
+
+    Example:
+        >>> predictor = Predictor(init_detector(config_file, checkpoint_file))
+        >>> video_reader = mmcv.VideoReader('demo/demo.mp4')
+        >>> def sink(frame, result):
+        >>>     frame = predictor.model.show_result(frame, result)
+        >>>     video_writer.write(frame)
+        >>> stats = VideoInference(predictor).run(video_reader, sink)
+    """
+
+    def __init__(self, predictor, batch_size=4, queue_size=16):
+        assert batch_size >= 1
+        assert queue_size >= batch_size, \
+            'queue_size should not be smaller than batch_size'
+        self.predictor = predictor
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+
+    def run(self, frames, sink):
+        """Run the detector over the frames.
+
+        Args:
+            frames (Iterable[ndarray]): The frames, e.g. a
+                :obj:`mmcv.VideoReader`.
+            sink (callable): Called with each frame and its result, in
+                order, in the writing thread.
+
+        Returns:
+            dict: The number of frames, the overall FPS, and the FPS of
+            each stage measured by the time it is busy, i.e. not waiting
+            for the other stages.
+        """
+        frame_queue = queue.Queue(self.queue_size)
+        # the items of the result queue are batches
+        result_queue = queue.Queue(self.queue_size // self.batch_size)
+        stop = threading.Event()
+        errors = []
+        busy = dict(decode=0., inference=0., write=0.)
+        counts = dict(decode=0, inference=0, write=0)
+
+        def run_stage(stage, *args):
+            try:
+                stage(*args)
+            except BaseException as e:
+                errors.append(e)
+                stop.set()
+
+        def decode():
+            frames_iter = iter(frames)
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    frame = next(frames_iter)
+                except StopIteration:
+                    break
+                busy['decode'] += time.perf_counter() - start
+                counts['decode'] += 1
+                _put(frame_queue, frame, stop)
+            _put(frame_queue, _END, stop)
+
+        def write():
+            while True:
+                item = _get(result_queue, stop)
+                if item is _END:
+                    break
+                start = time.perf_counter()
+                for frame, result in zip(*item):
+                    sink(frame, result)
+                busy['write'] += time.perf_counter() - start
+                counts['write'] += len(item[0])
+
+        threads = [
+            threading.Thread(target=run_stage, args=(decode, ), daemon=True),
+            threading.Thread(target=run_stage, args=(write, ), daemon=True)
+        ]
+        run_start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        try:
+            ended = False
+            while not ended:
+                batch = []
+                while len(batch) < self.batch_size:
+                    frame = _get(frame_queue, stop)
+                    if frame is _END:
+                        ended = True
+                        break
+                    batch.append(frame)
+                if not batch:
+                    break
+                start = time.perf_counter()
+                results = self.predictor.predict(batch)
+                busy['inference'] += time.perf_counter() - start
+                counts['inference'] += len(batch)
+                _put(result_queue, (batch, results), stop)
+            _put(result_queue, _END, stop)
+        except BaseException:
+            stop.set()
+            raise
+        finally:
+            for thread in threads:
+                thread.join()
+        if errors:
+            raise errors[0]
+
+        elapsed = time.perf_counter() - run_start
+        stats = dict(
+            num_frames=counts['write'],
+            fps=counts['write'] / elapsed if elapsed > 0 else 0.)
+        for stage, busy_time in busy.items():
+            stats[f'{stage}_fps'] = counts[stage] / busy_time \
+                if busy_time > 0 else 0.
+        return stats
+
+
+def _put(q, item, stop, interval=0.1):
+    """Put an item into a bounded queue unless the pipeline is stopped."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=interval)
+            return
+        except queue.Full:
+            pass
+
+
+def _get(q, stop, interval=0.1):
+    """Get an item from a queue, or ``_END`` if the pipeline is stopped."""
+    while not stop.is_set():
+        try:
+            return q.get(timeout=interval)
+        except queue.Empty:
+            pass
+    return _END
@@ -7,6 +7,7 @@ import torch
 from torch.nn.modules.utils import _pair
 
 from .builder import PRIOR_GENERATORS
+from .utils import PriorCache
 
 
 @PRIOR_GENERATORS.register_module()
@@ -38,6 +39,9 @@ class AnchorGenerator:
             float is given, they will be used to shift the centers of anchors.
         center_offset (float): The offset of center in proportion to anchors'
             width and height. By default it is 0 in V2.0.
+        cache_size (int): Maximum number of feature map sizes whose anchors
+            and valid flags are cached, see :class:`PriorCache`. 0 disables
+            the cache. Default: 8.
 
     Examples:
         >>> from mmdet.core import AnchorGenerator
@@ -67,7 +71,8 @@ class AnchorGenerator:
                  octave_base_scale=None,
                  scales_per_octave=None,
                  centers=None,
-                 center_offset=0.):
+                 center_offset=0.,
+                 cache_size=8):
         # check center and center_offset
         if center_offset != 0:
             assert centers is None, 'center cannot be set when center_offset' \
@@ -111,6 +116,7 @@ class AnchorGenerator:
         self.centers = centers
         self.center_offset = center_offset
         self.base_anchors = self.gen_base_anchors()
+        self.prior_cache = PriorCache(cache_size)
 
     @property
     def num_base_anchors(self):
@@ -228,15 +234,21 @@ class AnchorGenerator:
                 The sizes of each tensor should be [N, 4], where \
                 N = width * height * num_base_anchors, width and height \
                 are the sizes of the corresponding feature level, \
-                num_base_anchors is the number of anchors for that level.
+                num_base_anchors is the number of anchors for that level. \
+                The anchors are cached and should not be modified in place.
         """
         assert self.num_levels == len(featmap_sizes)
-        multi_level_anchors = []
-        for i in range(self.num_levels):
-            anchors = self.single_level_grid_priors(
-                featmap_sizes[i], level_idx=i, dtype=dtype, device=device)
-            multi_level_anchors.append(anchors)
-        return multi_level_anchors
+
+        def _grid_priors():
+            multi_level_anchors = []
+            for i in range(self.num_levels):
+                anchors = self.single_level_grid_priors(
+                    featmap_sizes[i], level_idx=i, dtype=dtype, device=device)
+                multi_level_anchors.append(anchors)
+            return multi_level_anchors
+
+        return self.prior_cache.get(
+            ('grid_priors', featmap_sizes, dtype, device), _grid_priors)
 
     def single_level_grid_priors(self,
                                  featmap_size,
@@ -400,21 +412,28 @@ class AnchorGenerator:
 
         Return:
             list(torch.Tensor): Valid flags of anchors in multiple levels.
+                The flags are cached and should not be modified in place.
         """
         assert self.num_levels == len(featmap_sizes)
-        multi_level_flags = []
-        for i in range(self.num_levels):
-            anchor_stride = self.strides[i]
-            feat_h, feat_w = featmap_sizes[i]
-            h, w = pad_shape[:2]
-            valid_feat_h = min(int(np.ceil(h / anchor_stride[1])), feat_h)
-            valid_feat_w = min(int(np.ceil(w / anchor_stride[0])), feat_w)
-            flags = self.single_level_valid_flags((feat_h, feat_w),
-                                                  (valid_feat_h, valid_feat_w),
-                                                  self.num_base_anchors[i],
-                                                  device=device)
-            multi_level_flags.append(flags)
-        return multi_level_flags
+
+        def _valid_flags():
+            multi_level_flags = []
+            for i in range(self.num_levels):
+                anchor_stride = self.strides[i]
+                feat_h, feat_w = featmap_sizes[i]
+                h, w = pad_shape[:2]
+                valid_feat_h = min(int(np.ceil(h / anchor_stride[1])), feat_h)
+                valid_feat_w = min(int(np.ceil(w / anchor_stride[0])), feat_w)
+                flags = self.single_level_valid_flags(
+                    (feat_h, feat_w), (valid_feat_h, valid_feat_w),
+                    self.num_base_anchors[i],
+                    device=device)
+                multi_level_flags.append(flags)
+            return multi_level_flags
+
+        return self.prior_cache.get(
+            ('valid_flags', featmap_sizes, pad_shape[:2], device),
+            _valid_flags)
 
     def single_level_valid_flags(self,
                                  featmap_size,
@@ -487,6 +506,8 @@ class SSDAnchorGenerator(AnchorGenerator):
         scale_major (bool): Whether to multiply scales first when generating
             base anchors. If true, the anchors in the same row will have the
             same scales. It is always set to be False in SSD.
+        cache_size (int): Maximum number of feature map sizes whose anchors
+            and valid flags are cached. Default: 8.
     """
 
     def __init__(self,
@@ -496,7 +517,8 @@ class SSDAnchorGenerator(AnchorGenerator):
                  max_sizes=None,
                  basesize_ratio_range=(0.15, 0.9),
                  input_size=300,
-                 scale_major=True):
+                 scale_major=True,
+                 cache_size=8):
         assert len(strides) == len(ratios)
         assert not (min_sizes is None) ^ (max_sizes is None)
         self.strides = [_pair(stride) for stride in strides]
@@ -567,6 +589,7 @@ class SSDAnchorGenerator(AnchorGenerator):
         self.scale_major = scale_major
         self.center_offset = 0
         self.base_anchors = self.gen_base_anchors()
+        self.prior_cache = PriorCache(cache_size)
 
     def gen_base_anchors(self):
         """Generate base anchors.
@@ -718,13 +741,15 @@ class LegacySSDAnchorGenerator(SSDAnchorGenerator, LegacyAnchorGenerator):
                  ratios,
                  basesize_ratio_range,
                  input_size=300,
-                 scale_major=True):
+                 scale_major=True,
+                 cache_size=8):
         super(LegacySSDAnchorGenerator, self).__init__(
             strides=strides,
             ratios=ratios,
             basesize_ratio_range=basesize_ratio_range,
             input_size=input_size,
-            scale_major=scale_major)
+            scale_major=scale_major,
+            cache_size=cache_size)
         self.centers = [((stride - 1) / 2., (stride - 1) / 2.)
                         for stride in strides]
         self.base_anchors = self.gen_base_anchors()
@@ -739,9 +764,11 @@ class YOLOAnchorGenerator(AnchorGenerator):
             in multiple feature levels.
         base_sizes (list[list[tuple[int, int]]]): The basic sizes
             of anchors in multiple levels.
+        cache_size (int): Maximum number of feature map sizes whose anchors
+            and valid flags are cached. Default: 8.
     """
 
-    def __init__(self, strides, base_sizes):
+    def __init__(self, strides, base_sizes, cache_size=8):
         self.strides = [_pair(stride) for stride in strides]
         self.centers = [(stride[0] / 2., stride[1] / 2.)
                         for stride in self.strides]
@@ -752,6 +779,7 @@ class YOLOAnchorGenerator(AnchorGenerator):
             self.base_sizes.append(
                 [_pair(base_size) for base_size in base_sizes_per_level])
         self.base_anchors = self.gen_base_anchors()
+        self.prior_cache = PriorCache(cache_size)
 
     @property
     def num_levels(self):
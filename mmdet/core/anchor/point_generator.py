@@ -4,6 +4,7 @@ import torch
 from torch.nn.modules.utils import _pair
 
 from .builder import PRIOR_GENERATORS
+from .utils import PriorCache
 
 
 @PRIOR_GENERATORS.register_module()
@@ -50,11 +51,15 @@ class MlvlPointGenerator:
             in multiple feature levels in order (w, h).
         offset (float): The offset of points, the value is normalized with
             corresponding stride. Defaults to 0.5.
+        cache_size (int): Maximum number of feature map sizes whose points
+            and valid flags are cached, see :class:`PriorCache`. 0 disables
+            the cache. Defaults to 8.
     """
 
-    def __init__(self, strides, offset=0.5):
+    def __init__(self, strides, offset=0.5, cache_size=8):
         self.strides = [_pair(stride) for stride in strides]
         self.offset = offset
+        self.prior_cache = PriorCache(cache_size)
 
     @property
     def num_levels(self):
@@ -102,19 +107,26 @@ class MlvlPointGenerator:
             otherwise the shape should be (N, 4),
             and the last dimension 4 represent
             (coord_x, coord_y, stride_w, stride_h).
+            The points are cached and should not be modified in place.
         """
 
         assert self.num_levels == len(featmap_sizes)
-        multi_level_priors = []
-        for i in range(self.num_levels):
-            priors = self.single_level_grid_priors(
-                featmap_sizes[i],
-                level_idx=i,
-                dtype=dtype,
-                device=device,
-                with_stride=with_stride)
-            multi_level_priors.append(priors)
-        return multi_level_priors
+
+        def _grid_priors():
+            multi_level_priors = []
+            for i in range(self.num_levels):
+                priors = self.single_level_grid_priors(
+                    featmap_sizes[i],
+                    level_idx=i,
+                    dtype=dtype,
+                    device=device,
+                    with_stride=with_stride)
+                multi_level_priors.append(priors)
+            return multi_level_priors
+
+        return self.prior_cache.get(
+            ('grid_priors', featmap_sizes, dtype, device, with_stride),
+            _grid_priors)
 
     def single_level_grid_priors(self,
                                  featmap_size,
@@ -187,20 +199,27 @@ class MlvlPointGenerator:
 
         Return:
             list(torch.Tensor): Valid flags of points of multiple levels.
+            The flags are cached and should not be modified in place.
         """
         assert self.num_levels == len(featmap_sizes)
-        multi_level_flags = []
-        for i in range(self.num_levels):
-            point_stride = self.strides[i]
-            feat_h, feat_w = featmap_sizes[i]
-            h, w = pad_shape[:2]
-            valid_feat_h = min(int(np.ceil(h / point_stride[1])), feat_h)
-            valid_feat_w = min(int(np.ceil(w / point_stride[0])), feat_w)
-            flags = self.single_level_valid_flags((feat_h, feat_w),
-                                                  (valid_feat_h, valid_feat_w),
-                                                  device=device)
-            multi_level_flags.append(flags)
-        return multi_level_flags
+
+        def _valid_flags():
+            multi_level_flags = []
+            for i in range(self.num_levels):
+                point_stride = self.strides[i]
+                feat_h, feat_w = featmap_sizes[i]
+                h, w = pad_shape[:2]
+                valid_feat_h = min(int(np.ceil(h / point_stride[1])), feat_h)
+                valid_feat_w = min(int(np.ceil(w / point_stride[0])), feat_w)
+                flags = self.single_level_valid_flags(
+                    (feat_h, feat_w), (valid_feat_h, valid_feat_w),
+                    device=device)
+                multi_level_flags.append(flags)
+            return multi_level_flags
+
+        return self.prior_cache.get(
+            ('valid_flags', featmap_sizes, pad_shape[:2], device),
+            _valid_flags)
 
     def single_level_valid_flags(self,
                                  featmap_size,
@@ -1,4 +1,7 @@
 # Copyright (c) OpenMMLab. All rights reserved.
+from collections import OrderedDict
+
+import numpy as np
 import torch
 
 
@@ -70,3 +73,94 @@ def calc_region(bbox, ratio, featmap_size=None):
         x2 = x2.clamp(min=0, max=featmap_size[1])
         y2 = y2.clamp(min=0, max=featmap_size[0])
     return (x1, y1, x2, y2)
+
+
+def _hashable(item):
+    """Convert the feature map sizes, shapes and devices of a key."""
+    if isinstance(item, (list, tuple)):
+        return tuple(_hashable(x) for x in item)
+    if isinstance(item, (torch.Tensor, np.integer)):
+        return int(item)
+    if isinstance(item, torch.device):
+        return str(item)
+    return item
+
+
+class PriorCache:
+    """A bounded LRU cache of the priors of a prior generator.
+
+    Training and inference mostly use a few fixed feature map sizes, so the
+    priors and valid flags generated for them are cached instead of being
+    rebuilt in every forward and loss. The least recently used entry is
+    evicted when the cache is full. The cached tensors are shared by all the
+    callers, which should not modify them in place. The cache is bypassed
+    when exporting to ONNX, as the feature map sizes are dynamic.
+
+    Args:
+        max_size (int): Maximum number of cached entries, 0 disables the
+            cache. Default: 8.
+
+    Example:
+        >>> from mmdet.core import AnchorGenerator
+        >>> self = AnchorGenerator([16], [1.], [1.], [9])
+        >>> anchors = self.grid_priors([(2, 2)], device='cpu')
+        >>> anchors = self.grid_priors([(2, 2)], device='cpu')
+        >>> self.prior_cache.stats()
+        {'num_hits': 1, 'num_misses': 1, 'size': 1}
+    """
+
+    def __init__(self, max_size=8):
+        assert max_size >= 0
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self.num_hits = 0
+        self.num_misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, create):
+        """Get the cached priors, creating them if missing.
+
+        Args:
+            key (tuple): The arguments the priors are generated with, e.g.
+                the feature map sizes, dtype and device.
+            create (callable): Generate the priors if they are not cached.
+
+        Returns:
+            list[Tensor]: The priors of each level.
+        """
+        if self.max_size == 0 or torch.onnx.is_in_onnx_export() \
+                or torch.jit.is_tracing():
+            return create()
+        key = _hashable(key)
+        priors = self._entries.get(key)
+        if priors is None:
+            self.num_misses += 1
+            priors = create()
+            self._entries[key] = priors
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        else:
+            self.num_hits += 1
+            self._entries.move_to_end(key)
+        # the callers may change the list, but not the tensors
+        return list(priors)
+
+    def clear(self):
+        """Remove all the cached priors and reset the counters."""
+        self._entries.clear()
+        self.num_hits = 0
+        self.num_misses = 0
+
+    def stats(self):
+        """Get the counters of the cache.
+
+        Returns:
+            dict: The number of hits and misses, and the number of cached
+            entries.
+        """
+        return dict(
+            num_hits=self.num_hits,
+            num_misses=self.num_misses,
+            size=len(self._entries))
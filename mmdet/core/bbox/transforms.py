@@ -133,6 +133,90 @@ def bbox2result(bboxes, labels, num_classes):
         return [bboxes[labels == i, :] for i in range(num_classes)]
 
 
+def is_compact_result(result):
+    """Whether a detection result of an image is in the compact form.
+
+    Args:
+        result (list | tuple | dict | ndarray): The result of an image.
+
+    Returns:
+        bool: Whether it is a dict made by :func:`result2compact`.
+    """
+    return isinstance(result, dict) and 'bboxes' in result \
+        and 'labels' in result
+
+
+def result2compact(result):
+    """Convert the per-class detection result of an image to the compact
+    form.
+
+    The detections of all classes are kept in a single array in the order of
+    classes, instead of an array for each class, which is faster to pickle,
+    gather and evaluate when there are many classes.
+
+    Args:
+        result (list[ndarray] | tuple[list]): The bbox results of each
+            class, or a tuple of the bbox results and the mask results of
+            each class. The mask results can also be a tuple of the masks
+            and the mask scores of each class.
+
+    Returns:
+        dict: The compact result with keys:
+
+            - bboxes (ndarray): Shape (n, 5), the bboxes of all classes.
+            - labels (ndarray): Shape (n, ), the labels of the bboxes.
+            - masks (list, optional): The masks of the bboxes.
+            - mask_scores (ndarray, optional): Shape (n, ), the mask scores
+              if they differ from the bbox scores.
+    """
+    if isinstance(result, tuple):
+        bbox_result, segm_result = result
+    else:
+        bbox_result, segm_result = result, None
+    compact = dict(
+        bboxes=np.concatenate(bbox_result).reshape(-1, 5).astype(
+            np.float32, copy=False),
+        labels=np.repeat(
+            np.arange(len(bbox_result), dtype=np.int64),
+            [len(bboxes) for bboxes in bbox_result]))
+    if segm_result is not None:
+        if isinstance(segm_result, tuple):
+            segm_result, mask_scores = segm_result
+            compact['mask_scores'] = np.concatenate(
+                [np.asarray(scores).reshape(-1) for scores in mask_scores])
+        compact['masks'] = [mask for masks in segm_result for mask in masks]
+    return compact
+
+
+def compact2result(result, num_classes):
+    """Convert the compact detection result of an image back to the
+    per-class form.
+
+    Args:
+        result (dict): The compact result made by :func:`result2compact`.
+        num_classes (int): Number of classes.
+
+    Returns:
+        list[ndarray] | tuple[list]: The bbox results of each class, with
+        the mask results of each class as :func:`result2compact` takes them
+        if the compact result has masks.
+    """
+    bboxes, labels = result['bboxes'], result['labels']
+    # the detections of each class are kept in order, as bbox2result does
+    order = np.argsort(labels, kind='stable')
+    splits = np.searchsorted(labels[order], np.arange(1, num_classes))
+    bbox_result = np.split(bboxes[order], splits)
+    if 'masks' not in result:
+        return bbox_result
+    masks = result['masks']
+    segm_result = [[masks[i] for i in inds]
+                   for inds in np.split(order, splits)]
+    if 'mask_scores' in result:
+        segm_result = (segm_result,
+                       np.split(result['mask_scores'][order], splits))
+    return bbox_result, segm_result
+
+
 def distance2bbox(points, distance, max_shape=None):
     """Decode distance prediction to bounding box.
 
@@ -63,3 +63,122 @@ def bbox_overlaps(bboxes1,
     if exchange:
         ious = ious.T
     return ious
+
+
+def _bbox_overlaps_tile(bboxes1, bboxes2, area1, area2, mode, eps,
+                        extra_length):
+    """Calculate the overlaps of a tile with broadcasting."""
+    x_start = np.maximum(bboxes1[:, None, 0], bboxes2[None, :, 0])
+    y_start = np.maximum(bboxes1[:, None, 1], bboxes2[None, :, 1])
+    x_end = np.minimum(bboxes1[:, None, 2], bboxes2[None, :, 2])
+    y_end = np.minimum(bboxes1[:, None, 3], bboxes2[None, :, 3])
+    overlap = np.maximum(x_end - x_start + extra_length, 0) * np.maximum(
+        y_end - y_start + extra_length, 0)
+    if mode == 'iou':
+        union = area1[:, None] + area2[None, :] - overlap
+    else:
+        union = area1[:, None]
+    union = np.maximum(union, eps)
+    return overlap / union
+
+
+def _iter_bbox_overlaps_tiles(bboxes1, bboxes2, mode, eps,
+                              use_legacy_coordinate, chunk_size, dtype):
+    """Yield ``(row_slice, col_slice, overlaps)`` over tiles of at most
+    ``chunk_size`` x ``chunk_size`` elements."""
+    assert mode in ['iou', 'iof']
+    assert chunk_size > 0, 'chunk_size must be positive.'
+    extra_length = 0. if not use_legacy_coordinate else 1.
+    bboxes1 = bboxes1[:, :4].astype(dtype)
+    bboxes2 = bboxes2[:, :4].astype(dtype)
+    area1 = (bboxes1[:, 2] - bboxes1[:, 0] + extra_length) * (
+        bboxes1[:, 3] - bboxes1[:, 1] + extra_length)
+    area2 = (bboxes2[:, 2] - bboxes2[:, 0] + extra_length) * (
+        bboxes2[:, 3] - bboxes2[:, 1] + extra_length)
+    for i in range(0, bboxes1.shape[0], chunk_size):
+        rows = slice(i, i + chunk_size)
+        for j in range(0, bboxes2.shape[0], chunk_size):
+            cols = slice(j, j + chunk_size)
+            yield rows, cols, _bbox_overlaps_tile(bboxes1[rows], bboxes2[cols],
+                                                  area1[rows], area2[cols],
+                                                  mode, eps, extra_length)
+
+
+def chunked_bbox_overlaps(bboxes1,
+                          bboxes2,
+                          mode='iou',
+                          eps=1e-6,
+                          use_legacy_coordinate=False,
+                          chunk_size=256,
+                          dtype=np.float32):
+    """Calculate the ious between bboxes tile by tile.
+
+    The result is the same as :func:`bbox_overlaps`, but every tile is
+    computed with broadcasting instead of a python loop over boxes, and the
+    temporaries never exceed ``chunk_size`` x ``chunk_size`` elements, so
+    they stay in cache however large the inputs are.
+
+    Args:
+        bboxes1 (ndarray): Shape (n, 4)
+        bboxes2 (ndarray): Shape (k, 4)
+        mode (str): IOU (intersection over union) or IOF (intersection
+            over foreground)
+        eps (float): A value added to the denominator for numerical
+            stability. Default: 1e-6.
+        use_legacy_coordinate (bool): Whether to use coordinate system in
+            mmdet v1.x. See :func:`bbox_overlaps`. Default: False.
+        chunk_size (int): Max number of boxes of each side of a tile.
+            Default: 256.
+        dtype (np.dtype): Data type used for the computation and the output.
+            Use ``np.float64`` when the precision of float32 is not enough.
+            Default: np.float32.
+
+    Returns:
+        ious (ndarray): Shape (n, k)
+    """
+    ious = np.zeros((bboxes1.shape[0], bboxes2.shape[0]), dtype=dtype)
+    tiles = _iter_bbox_overlaps_tiles(bboxes1, bboxes2, mode, eps,
+                                      use_legacy_coordinate, chunk_size, dtype)
+    for rows, cols, tile in tiles:
+        ious[rows, cols] = tile
+    return ious
+
+
+def max_bbox_overlaps(bboxes1,
+                      bboxes2,
+                      mode='iou',
+                      eps=1e-6,
+                      use_legacy_coordinate=False,
+                      chunk_size=256,
+                      dtype=np.float32):
+    """Calculate the max overlap of each bbox in bboxes1 with bboxes2.
+
+    This is equivalent to ``ious.max(axis=1), ious.argmax(axis=1)`` on the
+    output of :func:`chunked_bbox_overlaps`, but reduces tile by tile so the
+    (n, k) matrix is never materialized.
+
+    Args:
+        bboxes1 (ndarray): Shape (n, 4)
+        bboxes2 (ndarray): Shape (k, 4), k must be positive.
+        mode, eps, use_legacy_coordinate, chunk_size, dtype: See
+            :func:`chunked_bbox_overlaps`.
+
+    Returns:
+        tuple[ndarray]: The max overlap of each bbox in bboxes1 and the index
+        of the bbox in bboxes2 that reaches it (the first one on ties), both
+        of shape (n, ).
+    """
+    assert bboxes2.shape[0] > 0, 'bboxes2 must not be empty.'
+    ious_max = np.full(bboxes1.shape[0], -np.inf, dtype=dtype)
+    ious_argmax = np.zeros(bboxes1.shape[0], dtype=np.int64)
+    tiles = _iter_bbox_overlaps_tiles(bboxes1, bboxes2, mode, eps,
+                                      use_legacy_coordinate, chunk_size, dtype)
+    for rows, cols, tile in tiles:
+        tile_argmax = tile.argmax(axis=1)
+        tile_max = tile[np.arange(tile.shape[0]), tile_argmax]
+        # only strictly larger values win to keep the first index on ties
+        update = tile_max > ious_max[rows]
+        ious_max[rows] = np.where(update, tile_max, ious_max[rows])
+        ious_argmax[rows] = np.where(update, tile_argmax + cols.start,
+                                     ious_argmax[rows])
+    return ious_max, ious_argmax
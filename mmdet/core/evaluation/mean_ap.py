@@ -6,7 +6,8 @@ import numpy as np
 from mmcv.utils import print_log
 from terminaltables import AsciiTable
 
-from .bbox_overlaps import bbox_overlaps
+from ..bbox.transforms import compact2result, is_compact_result
+from .bbox_overlaps import chunked_bbox_overlaps, max_bbox_overlaps
 from .class_names import get_classes
 
 
@@ -117,7 +118,7 @@ def tpfp_imagenet(det_bboxes,
             for i, (min_area, max_area) in enumerate(area_ranges):
                 fp[i, (det_areas >= min_area) & (det_areas < max_area)] = 1
         return tp, fp
-    ious = bbox_overlaps(
+    ious = chunked_bbox_overlaps(
         det_bboxes, gt_bboxes - 1, use_legacy_coordinate=use_legacy_coordinate)
     gt_w = gt_bboxes[:, 2] - gt_bboxes[:, 0] + extra_length
     gt_h = gt_bboxes[:, 3] - gt_bboxes[:, 1] + extra_length
@@ -230,12 +231,10 @@ def tpfp_default(det_bboxes,
                 fp[i, (det_areas >= min_area) & (det_areas < max_area)] = 1
         return tp, fp
 
-    ious = bbox_overlaps(
+    # for each det, the max iou with all gts and which gt overlaps most
+    # with it, reduced tile by tile without keeping the whole iou matrix
+    ious_max, ious_argmax = max_bbox_overlaps(
         det_bboxes, gt_bboxes, use_legacy_coordinate=use_legacy_coordinate)
-    # for each det, the max iou with all gts
-    ious_max = ious.max(axis=1)
-    # for each det, which gt overlaps most with it
-    ious_argmax = ious.argmax(axis=1)
     # sort all dets in descending order by scores
     sort_inds = np.argsort(-det_bboxes[:, -1])
     for k, (min_area, max_area) in enumerate(area_ranges):
@@ -354,19 +353,20 @@ def tpfp_openimages(det_bboxes,
         non_group_gt_bboxes = gt_bboxes[~gt_bboxes_group_of]
         group_gt_bboxes = gt_bboxes[gt_bboxes_group_of]
         num_gts_group = group_gt_bboxes.shape[0]
-        ious = bbox_overlaps(det_bboxes, non_group_gt_bboxes)
-        ioas = bbox_overlaps(det_bboxes, group_gt_bboxes, mode='iof')
+        overlap_gt_bboxes = non_group_gt_bboxes
+        overlap_kwargs = dict()
     else:
         # if not consider group-of boxes, only calculate ious through gt boxes
-        ious = bbox_overlaps(
-            det_bboxes, gt_bboxes, use_legacy_coordinate=use_legacy_coordinate)
-        ioas = None
-
-    if ious.shape[1] > 0:
-        # for each det, the max iou with all gts
-        ious_max = ious.max(axis=1)
-        # for each det, which gt overlaps most with it
-        ious_argmax = ious.argmax(axis=1)
+        num_gts_group = 0
+        overlap_gt_bboxes = gt_bboxes
+        overlap_kwargs = dict(use_legacy_coordinate=use_legacy_coordinate)
+
+    if overlap_gt_bboxes.shape[0] > 0:
+        # for each det, the max iou with all gts and which gt overlaps most
+        # with it, reduced tile by tile without keeping the whole iou matrix
+        ious_max, ious_argmax = max_bbox_overlaps(det_bboxes,
+                                                  overlap_gt_bboxes,
+                                                  **overlap_kwargs)
         # sort all dets in descending order by scores
         sort_inds = np.argsort(-det_bboxes[:, -1])
         for k, (min_area, max_area) in enumerate(area_ranges):
@@ -411,7 +411,7 @@ def tpfp_openimages(det_bboxes,
             for i, (min_area, max_area) in enumerate(area_ranges):
                 fp[i, (det_areas >= min_area) & (det_areas < max_area)] = 1
 
-    if ioas is None or ioas.shape[1] <= 0:
+    if num_gts_group <= 0:
         return tp, fp, det_bboxes
     else:
         # The evaluation of group-of TP and FP are done in two stages:
@@ -421,12 +421,13 @@ def tpfp_openimages(det_bboxes,
         #    against group-of boxes and calculated group-of TP and FP.
         # Only used in OpenImages evaluation.
         det_bboxes_group = np.zeros(
-            (num_scales, ioas.shape[1], det_bboxes.shape[1]), dtype=float)
+            (num_scales, num_gts_group, det_bboxes.shape[1]), dtype=float)
         match_group_of = np.zeros((num_scales, num_dets), dtype=bool)
         tp_group = np.zeros((num_scales, num_gts_group), dtype=np.float32)
-        ioas_max = ioas.max(axis=1)
-        # for each det, which gt overlaps most with it
-        ioas_argmax = ioas.argmax(axis=1)
+        # for each det, the max ioa with all group-of gts and which gt
+        # overlaps most with it
+        ioas_max, ioas_argmax = max_bbox_overlaps(
+            det_bboxes, group_gt_bboxes, mode='iof')
         # sort all dets in descending order by scores
         sort_inds = np.argsort(-det_bboxes[:, -1])
         for k, (min_area, max_area) in enumerate(area_ranges):
@@ -438,22 +439,20 @@ def tpfp_openimages(det_bboxes,
                 gt_areas = (gt_bboxes[:, 2] - gt_bboxes[:, 0]) * (
                     gt_bboxes[:, 3] - gt_bboxes[:, 1])
                 gt_area_ignore = (gt_areas < min_area) | (gt_areas >= max_area)
-            for i in sort_inds:
-                matched_gt = ioas_argmax[i]
-                if not box_is_covered[i]:
-                    if ioas_max[i] >= ioa_thr:
-                        if not (gt_ignore_inds[matched_gt]
-                                or gt_area_ignore[matched_gt]):
-                            if not tp_group[k, matched_gt]:
-                                tp_group[k, matched_gt] = 1
-                                match_group_of[k, i] = True
-                            else:
-                                match_group_of[k, i] = True
-
-                            if det_bboxes_group[k, matched_gt, -1] < \
-                                    det_bboxes[i, -1]:
-                                det_bboxes_group[k, matched_gt] = \
-                                    det_bboxes[i]
+            # uncovered dets that hit a group-of gt are all merged into it
+            matched = (box_is_covered == 0) & (ioas_max >= ioa_thr) & ~(
+                gt_ignore_inds[ioas_argmax] | gt_area_ignore[ioas_argmax])
+            match_group_of[k] = matched
+            tp_group[k, ioas_argmax[matched]] = 1
+            # a group-of gt keeps the first det in score order, which has
+            # the highest score among the dets matched to it
+            matched_inds = sort_inds[matched[sort_inds]]
+            matched_gts, first_inds = np.unique(
+                ioas_argmax[matched_inds], return_index=True)
+            matched_inds = matched_inds[first_inds]
+            positive = det_bboxes[matched_inds, -1] > 0
+            det_bboxes_group[k, matched_gts[positive]] = \
+                det_bboxes[matched_inds[positive]]
 
         fp_group = (tp_group <= 0).astype(float)
         tps = []
@@ -538,7 +537,9 @@ def eval_map(det_results,
     Args:
         det_results (list[list]): [[cls1_det, cls2_det, ...], ...].
             The outer list indicates images, and the inner list indicates
-            per-class detected bboxes.
+            per-class detected bboxes. The compact results of
+            :func:`result2compact` are also accepted, in which case the
+            number of classes is taken from ``dataset``.
         annotations (list[dict]): Ground truth annotations where each item of
             the list indicates an image. Keys of annotations are:
 
@@ -584,7 +585,19 @@ def eval_map(det_results,
 
     num_imgs = len(det_results)
     num_scales = len(scale_ranges) if scale_ranges is not None else 1
-    num_classes = len(det_results[0])  # positive class num
+    if is_compact_result(det_results[0]):
+        assert dataset is not None, \
+            'dataset is required to evaluate compact results'
+        if isinstance(dataset, str):
+            num_classes = len(get_classes(dataset))
+        else:
+            num_classes = len(dataset)
+        det_results = [
+            compact2result(det_result, num_classes)
+            for det_result in det_results
+        ]
+    else:
+        num_classes = len(det_results[0])  # positive class num
     area_ranges = ([(rg[0]**2, rg[1]**2) for rg in scale_ranges]
                    if scale_ranges is not None else None)
 
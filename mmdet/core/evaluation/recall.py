@@ -1,11 +1,12 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 from collections.abc import Sequence
+from multiprocessing.pool import ThreadPool
 
 import numpy as np
 from mmcv.utils import print_log
 from terminaltables import AsciiTable
 
-from .bbox_overlaps import bbox_overlaps
+from .bbox_overlaps import chunked_bbox_overlaps
 
 
 def _recalls(all_ious, proposal_nums, thrs):
@@ -41,6 +42,83 @@ def _recalls(all_ious, proposal_nums, thrs):
     return recalls
 
 
+def _matched_ious(ious, proposal_nums, min_iou=None):
+    """Greedily match gts to proposals for all proposal nums at once.
+
+    The result is identical to the sequential greedy matching in
+    :func:`_recalls`: the pair with the highest IoU (ties broken by the
+    smallest gt index, then the smallest proposal index) is matched first,
+    then its gt and proposal are removed. Under this strict order every pair
+    that is the best one for both its gt and its proposal is matched by the
+    greedy procedure, so all such pairs can be matched in the same round.
+    Every proposal num is handled as one slice of a (K, n, k) stack.
+
+    Args:
+        ious (ndarray): IoUs between gts and sorted proposals, shape (n, k).
+        proposal_nums (ndarray): Top N proposals to be evaluated, shape (K, ).
+        min_iou (float | None): Pairs with IoU lower than it are matched
+            after all the others by the greedy procedure, so they never
+            change a match with IoU >= min_iou. They are dropped before
+            matching when it is given. Default: None.
+
+    Returns:
+        ndarray: IoU of the proposal matched to each gt, shape (K, n). Gts
+            without a matched proposal get -1.
+    """
+    num_gts, num_props = ious.shape
+    matched = np.full((proposal_nums.size, num_gts), -1, dtype=np.float32)
+    # keep the behaviour of `_recalls` when there are no proposals to match
+    matched[np.minimum(proposal_nums, num_props) == 0] = 0
+    prop_inds = np.arange(num_props)
+    if min_iou is not None:
+        ious = np.where(ious >= min_iou, ious, -1)
+        keep = (ious >= 0).any(axis=0)
+        ious, prop_inds = ious[:, keep], prop_inds[keep]
+    if ious.size == 0:
+        return matched
+
+    in_topk = prop_inds[None, None, :] < proposal_nums[:, None, None]
+    stacked = np.where(in_topk, ious[None].astype(np.float32), np.float32(-1))
+    gt_inds = np.arange(num_gts)[None, :]
+    while True:
+        best_props = stacked.argmax(axis=2)
+        best_ious = np.take_along_axis(stacked, best_props[..., None],
+                                       2).squeeze(2)
+        best_gts = stacked.argmax(axis=1)
+        mutual = (best_ious >= 0) & (
+            np.take_along_axis(best_gts, best_props, 1) == gt_inds)
+        if not mutual.any():
+            break
+        k_inds, g_inds = np.nonzero(mutual)
+        p_inds = best_props[k_inds, g_inds]
+        matched[k_inds, g_inds] = best_ious[k_inds, g_inds]
+        stacked[k_inds, g_inds, :] = -1
+        stacked[k_inds, :, p_inds] = -1
+    return matched
+
+
+def _img_recall_hits(gt, proposal, proposal_nums, thrs, use_legacy_coordinate):
+    """Count the recalled gts of a single image.
+
+    Returns:
+        tuple: (hits, num_gts), where hits is an array of shape (K, T) with
+            the number of gts recalled for each proposal num and IoU thr.
+    """
+    if proposal.ndim == 2 and proposal.shape[1] == 5:
+        sort_idx = np.argsort(proposal[:, 4])[::-1]
+        proposal = proposal[sort_idx, :]
+    prop_num = min(proposal.shape[0], proposal_nums[-1])
+    if gt is None or gt.shape[0] == 0:
+        return np.zeros((proposal_nums.size, thrs.size)), 0
+    ious = chunked_bbox_overlaps(
+        gt,
+        proposal[:prop_num, :4],
+        use_legacy_coordinate=use_legacy_coordinate)
+    matched = _matched_ious(ious, proposal_nums, min_iou=thrs.min())
+    hits = (matched[..., None] >= thrs[None, None, :]).sum(axis=1)
+    return hits, gt.shape[0]
+
+
 def set_recall_param(proposal_nums, iou_thrs):
     """Check proposal_nums and iou_thrs and set correct format."""
     if isinstance(proposal_nums, Sequence):
@@ -67,7 +145,8 @@ def eval_recalls(gts,
                  proposal_nums=None,
                  iou_thrs=0.5,
                  logger=None,
-                 use_legacy_coordinate=False):
+                 use_legacy_coordinate=False,
+                 nproc=1):
     """Calculate recalls.
 
     Args:
@@ -81,7 +160,9 @@ def eval_recalls(gts,
             in mmdet v1.x. "1" was added to both height and width
             which means w, h should be
             computed as 'x2 - x1 + 1` and 'y2 - y1 + 1'. Default: False.
-
+        nproc (int): Threads used for matching gts and proposals of
+            different images. Numpy releases the GIL in the heavy parts, so
+            threads scale without copying the proposals. Default: 1.
 
     Returns:
         ndarray: recalls of different ious and proposal nums
@@ -90,25 +171,20 @@ def eval_recalls(gts,
     img_num = len(gts)
     assert img_num == len(proposals)
     proposal_nums, iou_thrs = set_recall_param(proposal_nums, iou_thrs)
-    all_ious = []
-    for i in range(img_num):
-        if proposals[i].ndim == 2 and proposals[i].shape[1] == 5:
-            scores = proposals[i][:, 4]
-            sort_idx = np.argsort(scores)[::-1]
-            img_proposal = proposals[i][sort_idx, :]
-        else:
-            img_proposal = proposals[i]
-        prop_num = min(img_proposal.shape[0], proposal_nums[-1])
-        if gts[i] is None or gts[i].shape[0] == 0:
-            ious = np.zeros((0, img_proposal.shape[0]), dtype=np.float32)
-        else:
-            ious = bbox_overlaps(
-                gts[i],
-                img_proposal[:prop_num, :4],
-                use_legacy_coordinate=use_legacy_coordinate)
-        all_ious.append(ious)
-    all_ious = np.array(all_ious)
-    recalls = _recalls(all_ious, proposal_nums, iou_thrs)
+    args = [(gts[i], proposals[i], proposal_nums, iou_thrs,
+             use_legacy_coordinate) for i in range(img_num)]
+    if nproc > 1 and img_num > 1:
+        with ThreadPool(min(nproc, img_num)) as pool:
+            img_results = pool.starmap(_img_recall_hits, args)
+    else:
+        img_results = [_img_recall_hits(*arg) for arg in args]
+
+    hits = np.zeros((proposal_nums.size, iou_thrs.size))
+    total_gt_num = 0
+    for img_hits, num_gts in img_results:
+        hits += img_hits
+        total_gt_num += num_gts
+    recalls = hits / float(total_gt_num)
 
     print_recall_summary(recalls, proposal_nums, iou_thrs, logger=logger)
     return recalls
@@ -1,9 +1,10 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 from .mask_target import mask_target
 from .structures import BaseInstanceMasks, BitmapMasks, PolygonMasks
-from .utils import encode_mask_results, mask2bbox, split_combined_polys
+from .utils import (encode_mask_results, encode_masks, mask2bbox,
+                    split_combined_polys)
 
 __all__ = [
     'split_combined_polys', 'mask_target', 'BaseInstanceMasks', 'BitmapMasks',
-    'PolygonMasks', 'encode_mask_results', 'mask2bbox'
+    'PolygonMasks', 'encode_mask_results', 'encode_masks', 'mask2bbox'
 ]
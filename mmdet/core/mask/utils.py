@@ -34,6 +34,45 @@ def split_combined_polys(polys, poly_lens, polys_per_mask):
     return mask_polys_list
 
 
+def encode_masks(masks):
+    """Encode bitmap masks of an image to RLE codes in a single call.
+
+    pycocotools encodes masks in column-major order, so the masks are
+    stacked into one Fortran-ordered (h, w, n) array and encoded at once
+    instead of being copied and encoded one by one. Stacking is only a
+    plain copy if the masks are already column-major, e.g., the masks from
+    :meth:`FCNMaskHead.get_seg_masks`. A (n, h, w) tensor is transposed on
+    its device and needs no copy on cpu at all.
+
+    Args:
+        masks (Tensor | ndarray | list[ndarray]): Masks of shape (n, h, w)
+            or n masks of the same shape (h, w).
+
+    Returns:
+        list[dict]: RLE codes of the masks.
+    """
+    if isinstance(masks, torch.Tensor):
+        # column-major masks of shape (n, h, w)
+        masks = masks.transpose(1, 2).contiguous().cpu().numpy()
+        masks = masks.transpose(0, 2, 1)
+    num_masks = len(masks)
+    if num_masks == 0:
+        return []
+    if isinstance(masks, np.ndarray) and \
+            masks.transpose(1, 2, 0).flags.f_contiguous:
+        # already stacked in the required layout
+        stacked_masks = masks.transpose(1, 2, 0)
+        if stacked_masks.dtype == bool:
+            stacked_masks = stacked_masks.view(np.uint8)
+        stacked_masks = stacked_masks.astype(np.uint8, order='F', copy=False)
+    else:
+        h, w = masks[0].shape
+        stacked_masks = np.empty((h, w, num_masks), dtype=np.uint8, order='F')
+        for i, mask in enumerate(masks):
+            stacked_masks[:, :, i] = mask
+    return mask_util.encode(stacked_masks)
+
+
 # TODO: move this function to more proper place
 def encode_mask_results(mask_results):
     """Encode bitmap mask to RLE code.
@@ -50,15 +89,14 @@ def encode_mask_results(mask_results):
         cls_segms, cls_mask_scores = mask_results
     else:
         cls_segms = mask_results
-    num_classes = len(cls_segms)
-    encoded_mask_results = [[] for _ in range(num_classes)]
-    for i in range(len(cls_segms)):
-        for cls_segm in cls_segms[i]:
-            encoded_mask_results[i].append(
-                mask_util.encode(
-                    np.array(
-                        cls_segm[:, :, np.newaxis], order='F',
-                        dtype='uint8'))[0])  # encoded with RLE
+    # masks of all classes are from the same image and encoded together
+    encoded_masks = encode_masks(
+        [cls_segm for segms in cls_segms for cls_segm in segms])
+    encoded_mask_results = []
+    start = 0
+    for segms in cls_segms:
+        encoded_mask_results.append(encoded_masks[start:start + len(segms)])
+        start += len(segms)
     if isinstance(mask_results, tuple):
         return encoded_mask_results, cls_mask_scores
     else:
@@ -11,7 +11,9 @@ def multiclass_nms(multi_bboxes,
                    nms_cfg,
                    max_num=-1,
                    score_factors=None,
-                   return_inds=False):
+                   return_inds=False,
+                   nms_pre=-1,
+                   nms_pre_per_class=-1):
     """NMS for multi-class bboxes.
 
     Args:
@@ -27,12 +29,83 @@ def multiclass_nms(multi_bboxes,
             before applying NMS. Default to None.
         return_inds (bool, optional): Whether return the indices of kept
             bboxes. Default to False.
+        nms_pre (int, optional): If positive, only the top nms_pre scores
+            of all the classes are considered, which bounds the number of
+            bboxes of NMS when there are many classes, e.g. for LVIS.
+            Default to -1.
+        nms_pre_per_class (int, optional): If positive, only the top
+            nms_pre_per_class scores of each class are considered.
+            Default to -1.
 
     Returns:
         tuple: (dets, labels, indices (optional)), tensors of shape (k, 5),
             (k), and (k). Dets are boxes with scores. Labels are 0-based.
     """
     num_classes = multi_scores.size(1) - 1
+    if torch.onnx.is_in_onnx_export():
+        return _multiclass_nms_onnx(multi_bboxes, multi_scores, score_thr,
+                                    nms_cfg, max_num, score_factors)
+
+    # exclude background category
+    scores = multi_scores[:, :-1]
+    # remove low scoring boxes
+    valid_mask = scores > score_thr
+    if 0 < nms_pre_per_class < scores.size(0):
+        _, topk_rows = scores.topk(nms_pre_per_class, dim=0)
+        topk_mask = torch.zeros_like(valid_mask)
+        topk_mask.scatter_(0, topk_rows, True)
+        valid_mask &= topk_mask
+    valid_mask = valid_mask.reshape(-1)
+    if 0 < nms_pre < valid_mask.numel():
+        _, topk_inds = scores.reshape(-1).masked_fill(
+            ~valid_mask, float('-inf')).topk(nms_pre)
+        topk_mask = torch.zeros_like(valid_mask)
+        topk_mask[topk_inds] = True
+        valid_mask &= topk_mask
+    # the bboxes and labels are only gathered for the kept candidates,
+    # instead of being expanded to all the classes
+    inds = valid_mask.nonzero(as_tuple=False).squeeze(1)
+
+    rows = torch.div(inds, num_classes, rounding_mode='floor')
+    labels = inds % num_classes
+    scores = scores[rows, labels]
+    if multi_bboxes.shape[1] > 4:
+        bboxes = multi_bboxes.view(multi_scores.size(0), -1, 4)[rows, labels]
+    else:
+        bboxes = multi_bboxes[rows]
+    # multiply score_factor after threshold to preserve more bboxes, improve
+    # mAP by 1% for YOLOv3
+    if score_factors is not None:
+        scores = scores * score_factors.view(-1)[rows]
+
+    if bboxes.numel() == 0:
+        dets = torch.cat([bboxes, scores[:, None]], -1)
+        if return_inds:
+            return dets, labels, inds
+        else:
+            return dets, labels
+
+    dets, keep = batched_nms(bboxes, scores, labels, nms_cfg)
+
+    if max_num > 0:
+        dets = dets[:max_num]
+        keep = keep[:max_num]
+
+    if return_inds:
+        return dets, labels[keep], inds[keep]
+    else:
+        return dets, labels[keep]
+
+
+def _multiclass_nms_onnx(multi_bboxes,
+                         multi_scores,
+                         score_thr,
+                         nms_cfg,
+                         max_num=-1,
+                         score_factors=None):
+    """:func:`multiclass_nms` when exporting to ONNX, which keeps all the
+    candidates as NonZero is not supported in TensorRT."""
+    num_classes = multi_scores.size(1) - 1
     # exclude background category
     if multi_bboxes.shape[1] > 4:
         bboxes = multi_bboxes.view(multi_scores.size(0), -1, 4)
@@ -49,12 +122,6 @@ def multiclass_nms(multi_bboxes,
     scores = scores.reshape(-1)
     labels = labels.reshape(-1)
 
-    if not torch.onnx.is_in_onnx_export():
-        # NonZero not supported  in TensorRT
-        # remove low scoring boxes
-        valid_mask = scores > score_thr
-    # multiply score_factor after threshold to preserve more bboxes, improve
-    # mAP by 1% for YOLOv3
     if score_factors is not None:
         # expand the shape to match original shape of score
         score_factors = score_factors.view(-1, 1).expand(
@@ -62,26 +129,15 @@ def multiclass_nms(multi_bboxes,
         score_factors = score_factors.reshape(-1)
         scores = scores * score_factors
 
-    if not torch.onnx.is_in_onnx_export():
-        # NonZero not supported  in TensorRT
-        inds = valid_mask.nonzero(as_tuple=False).squeeze(1)
-        bboxes, scores, labels = bboxes[inds], scores[inds], labels[inds]
-    else:
-        # TensorRT NMS plugin has invalid output filled with -1
-        # add dummy data to make detection output correct.
-        bboxes = torch.cat([bboxes, bboxes.new_zeros(1, 4)], dim=0)
-        scores = torch.cat([scores, scores.new_zeros(1)], dim=0)
-        labels = torch.cat([labels, labels.new_zeros(1)], dim=0)
+    # TensorRT NMS plugin has invalid output filled with -1
+    # add dummy data to make detection output correct.
+    bboxes = torch.cat([bboxes, bboxes.new_zeros(1, 4)], dim=0)
+    scores = torch.cat([scores, scores.new_zeros(1)], dim=0)
+    labels = torch.cat([labels, labels.new_zeros(1)], dim=0)
 
     if bboxes.numel() == 0:
-        if torch.onnx.is_in_onnx_export():
-            raise RuntimeError('[ONNX Error] Can not record NMS '
-                               'as it has not been executed this time')
-        dets = torch.cat([bboxes, scores[:, None]], -1)
-        if return_inds:
-            return dets, labels, inds
-        else:
-            return dets, labels
+        raise RuntimeError('[ONNX Error] Can not record NMS '
+                           'as it has not been executed this time')
 
     dets, keep = batched_nms(bboxes, scores, labels, nms_cfg)
 
@@ -89,10 +145,7 @@ def multiclass_nms(multi_bboxes,
         dets = dets[:max_num]
         keep = keep[:max_num]
 
-    if return_inds:
-        return dets, labels[keep], inds[keep]
-    else:
-        return dets, labels[keep]
+    return dets, labels[keep]
 
 
 def fast_nms(multi_bboxes,
@@ -1,7 +1,13 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 from .coco_api import COCO, COCOeval
+from .columnar_results import (ColumnarResultDumper, ColumnarResults,
+                               ColumnarResultWriter, ResultsWithColumns,
+                               merge_columnar_results)
+from .lvis_fast_eval import FastLVISEval
 from .panoptic_evaluation import pq_compute_multi_core, pq_compute_single_core
 
 __all__ = [
-    'COCO', 'COCOeval', 'pq_compute_multi_core', 'pq_compute_single_core'
+    'COCO', 'COCOeval', 'ColumnarResults', 'ColumnarResultWriter',
+    'ColumnarResultDumper', 'ResultsWithColumns', 'merge_columnar_results',
+    'FastLVISEval', 'pq_compute_multi_core', 'pq_compute_single_core'
 ]
@@ -2,6 +2,7 @@
 # This file add snake case alias for coco api
 
 import warnings
+from collections import defaultdict
 
 import pycocotools
 from pycocotools.coco import COCO as _COCO
@@ -43,5 +44,47 @@ class COCO(_COCO):
         return self.loadImgs(ids)
 
 
-# just for the ease of import
-COCOeval = _COCOeval
+class COCOeval(_COCOeval):
+    """This class is almost the same as official pycocotools package.
+
+    It can reuse the ground truths prepared by ``evaluate()`` in later
+    evaluations of the same ground truth and params.
+
+    Args:
+        cocoGt (COCO): Ground truth.
+        cocoDt (COCO): Detections.
+        iouType (str): 'segm', 'bbox' or 'keypoints'. Default: 'segm'.
+        gt_cache (dict, optional): Dict to keep the prepared ground truths
+            of ``cocoGt``. Default: None.
+    """
+
+    def __init__(self,
+                 cocoGt=None,
+                 cocoDt=None,
+                 iouType='segm',
+                 gt_cache=None):
+        super().__init__(cocoGt=cocoGt, cocoDt=cocoDt, iouType=iouType)
+        self.gt_cache = gt_cache
+
+    def _prepare(self):
+        if self.gt_cache is None:
+            return super()._prepare()
+        p = self.params
+        cat_ids = p.catIds if p.useCats else []
+        key = (p.iouType, tuple(p.imgIds), tuple(cat_ids))
+        if key not in self.gt_cache:
+            super()._prepare()
+            self.gt_cache[key] = dict(self._gts)
+            return
+
+        dts = self.cocoDt.loadAnns(
+            self.cocoDt.getAnnIds(imgIds=p.imgIds, catIds=cat_ids))
+        if p.iouType == 'segm':
+            for dt in dts:
+                dt['segmentation'] = self.cocoDt.annToRLE(dt)
+        self._gts = defaultdict(list, self.gt_cache[key])
+        self._dts = defaultdict(list)
+        for dt in dts:
+            self._dts[dt['image_id'], dt['category_id']].append(dt)
+        self.evalImgs = defaultdict(list)
+        self.eval = {}
@@ -0,0 +1,353 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import json
+import os.path as osp
+from collections.abc import Sequence
+
+import mmcv
+import numpy as np
+
+# name: (dtype, shape of each detection)
+COLUMNS = dict(
+    image_ids=(np.int64, ()),
+    category_ids=(np.int64, ()),
+    bboxes=(np.float64, (4, )),
+    scores=(np.float64, ()),
+)
+# the RLE counts of all masks are concatenated in ``rle_counts`` and the
+# ones of the i-th detection are ``rle_counts[rle_offsets[i]:
+# rle_offsets[i + 1]]``
+SEGM_COLUMNS = dict(
+    rle_sizes=(np.int64, (2, )),
+    rle_offsets=(np.int64, ()),
+    rle_counts=(np.uint8, ()),
+)
+META_FILE = 'meta.json'
+METRICS = ('bbox', 'segm', 'proposal')
+
+
+class ColumnarResultWriter:
+    """Write detection results to a columnar format incrementally.
+
+    Each column is a raw binary file in ``out_dir`` and detections are
+    appended to all the columns at every :meth:`write`, so results never
+    need to be held in memory as a whole. The number of detections is saved
+    in ``meta.json`` by :meth:`close`, after that the results can be loaded
+    by :class:`ColumnarResults`.
+
+    Args:
+        out_dir (str): Directory to save the columns.
+        with_segm (bool): Whether to save RLE masks. Default: False.
+
+    Example:
+        >>> with ColumnarResultWriter(out_dir) as writer:
+        >>>     for data in data_loader:
+        >>>         writer.write(image_ids, category_ids, bboxes, scores)
+        >>> results = ColumnarResults(out_dir)
+    """
+
+    def __init__(self, out_dir, with_segm=False):
+        mmcv.mkdir_or_exist(out_dir)
+        self.out_dir = out_dir
+        self.with_segm = with_segm
+        self.columns = dict(COLUMNS, **SEGM_COLUMNS) if with_segm else COLUMNS
+        self._files = {
+            name: open(osp.join(out_dir, f'{name}.bin'), 'wb')
+            for name in self.columns
+        }
+        self.num_dets = 0
+        self.num_rle_bytes = 0
+
+    def write(self, image_ids, category_ids, bboxes, scores, segms=None):
+        """Append detections.
+
+        Args:
+            image_ids (ndarray): Shape (n, ).
+            category_ids (ndarray): Shape (n, ).
+            bboxes (ndarray): Shape (n, 4), in ``xywh`` order.
+            scores (ndarray): Shape (n, ).
+            segms (list[dict], optional): n RLEs, required if ``with_segm``.
+        """
+        num_dets = len(scores)
+        data = dict(
+            image_ids=image_ids,
+            category_ids=category_ids,
+            bboxes=bboxes,
+            scores=scores)
+        if self.with_segm:
+            assert segms is not None and len(segms) == num_dets
+            counts = [
+                segm['counts'].encode()
+                if isinstance(segm['counts'], str) else segm['counts']
+                for segm in segms
+            ]
+            lengths = np.array([len(c) for c in counts], dtype=np.int64)
+            data['rle_sizes'] = np.array([segm['size'] for segm in segms],
+                                         dtype=np.int64).reshape(-1, 2)
+            data['rle_offsets'] = self.num_rle_bytes + np.cumsum(
+                lengths) - lengths
+            data['rle_counts'] = np.frombuffer(b''.join(counts), np.uint8)
+            self.num_rle_bytes += int(lengths.sum())
+        for name, (dtype, shape) in self.columns.items():
+            column = np.ascontiguousarray(data[name], dtype=dtype)
+            if name != 'rle_counts':
+                assert column.shape == (num_dets, ) + shape, \
+                    f'{name} should be of shape {(num_dets, ) + shape}.'
+            column.tofile(self._files[name])
+        self.num_dets += num_dets
+
+    def close(self):
+        """Close the column files and save the meta information."""
+        for f in self._files.values():
+            f.close()
+        meta = dict(
+            num_dets=self.num_dets,
+            num_rle_bytes=self.num_rle_bytes,
+            with_segm=self.with_segm)
+        mmcv.dump(meta, osp.join(self.out_dir, META_FILE))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class _LazyRLEs:
+    """A read-only sequence of RLEs decoded from the columns on access."""
+
+    def __init__(self, sizes, offsets, counts):
+        self.sizes = sizes
+        self.offsets = offsets
+        self.counts = counts
+
+    def __len__(self):
+        return self.sizes.shape[0]
+
+    def __getitem__(self, idx):
+        start = self.offsets[idx]
+        end = self.offsets[idx + 1] if idx + 1 < len(self) else \
+            self.counts.shape[0]
+        return dict(
+            size=self.sizes[idx].tolist(),
+            counts=self.counts[start:end].tobytes())
+
+
+class ColumnarResults:
+    """Detection results saved by :class:`ColumnarResultWriter`.
+
+    The columns are memory-mapped, so only the pages that are accessed are
+    loaded, and COCO style json results are generated on the fly by
+    :meth:`dump_json`.
+
+    Args:
+        out_dir (str): Directory of the columns.
+    """
+
+    def __init__(self, out_dir):
+        meta = mmcv.load(osp.join(out_dir, META_FILE))
+        self.out_dir = out_dir
+        self.num_dets = meta['num_dets']
+        self.with_segm = meta['with_segm']
+        columns = dict(COLUMNS, **SEGM_COLUMNS) if self.with_segm else COLUMNS
+        self.columns = dict()
+        for name, (dtype, shape) in columns.items():
+            length = meta['num_rle_bytes'] if name == 'rle_counts' else \
+                self.num_dets
+            if length == 0:
+                # empty files can not be memory-mapped
+                self.columns[name] = np.zeros((0, ) + shape, dtype=dtype)
+            else:
+                self.columns[name] = np.memmap(
+                    osp.join(out_dir, f'{name}.bin'),
+                    dtype=dtype,
+                    mode='r',
+                    shape=(length, ) + shape)
+
+    def __len__(self):
+        return self.num_dets
+
+    @property
+    def segms(self):
+        """Sequence of RLEs, decoded lazily."""
+        if not self.with_segm:
+            raise AttributeError('The results have no segms.')
+        return _LazyRLEs(self.columns['rle_sizes'],
+                         self.columns['rle_offsets'],
+                         self.columns['rle_counts'])
+
+    def to_arrays(self):
+        """Get memory-mapped arrays in the format of
+        :meth:`CocoDataset.results2arrays`."""
+        arrays = {name: self.columns[name] for name in COLUMNS}
+        if self.with_segm:
+            arrays['segms'] = self.segms
+        return arrays
+
+    def iter_json(self, chunk_size=10000):
+        """Yield detections as COCO style json dicts.
+
+        Args:
+            chunk_size (int): Number of detections read from the columns at
+                a time. Default: 10000.
+        """
+        segms = self.segms if self.with_segm else None
+        for start in range(0, self.num_dets, chunk_size):
+            end = min(start + chunk_size, self.num_dets)
+            image_ids = self.columns['image_ids'][start:end].tolist()
+            category_ids = self.columns['category_ids'][start:end].tolist()
+            bboxes = self.columns['bboxes'][start:end].tolist()
+            scores = self.columns['scores'][start:end].tolist()
+            for i in range(end - start):
+                data = dict(
+                    image_id=image_ids[i],
+                    bbox=bboxes[i],
+                    score=scores[i],
+                    category_id=category_ids[i])
+                if segms is not None:
+                    segm = segms[start + i]
+                    segm['counts'] = segm['counts'].decode()
+                    data['segmentation'] = segm
+                yield data
+
+    def dump_json(self, file, chunk_size=10000):
+        """Dump the results to a COCO style json file for submission.
+
+        Detections are written one by one, so the whole json list is never
+        built in memory.
+
+        Args:
+            file (str): Path of the json file.
+            chunk_size (int): See :meth:`iter_json`. Default: 10000.
+        """
+        with open(file, 'w') as f:
+            f.write('[')
+            for i, data in enumerate(self.iter_json(chunk_size)):
+                if i > 0:
+                    f.write(', ')
+                f.write(json.dumps(data))
+            f.write(']')
+
+
+class ColumnarResultDumper:
+    """Dump the results of a dataset to the columns of each metric.
+
+    The arrays of each metric given by :meth:`CocoDataset.results2arrays`
+    are appended to the columns in "{outfile_prefix}.{metric}" by a
+    :class:`ColumnarResultWriter`, proposals share the columns of bboxes if
+    there are bboxes.
+
+    Args:
+        outfile_prefix (str): The directory prefix of the columns.
+
+    Example:
+        >>> dumper = ColumnarResultDumper(outfile_prefix)
+        >>> for img_inds, results in batches:
+        >>>     dumper.write(dataset.results2arrays(results, img_inds))
+        >>> result_dirs = dumper.close()
+    """
+
+    def __init__(self, outfile_prefix):
+        self.outfile_prefix = outfile_prefix
+        self.result_dirs = dict()
+        self._writers = dict()
+
+    def write(self, result_arrays):
+        """Append the arrays of each metric.
+
+        Args:
+            result_arrays (dict[str: dict]): The arrays of each metric in
+                the format of :meth:`CocoDataset.results2arrays`.
+        """
+        if not self._writers:
+            for metric in result_arrays:
+                if metric == 'proposal' and 'bbox' in result_arrays:
+                    continue
+                self.result_dirs[metric] = f'{self.outfile_prefix}.{metric}'
+                self._writers[metric] = ColumnarResultWriter(
+                    self.result_dirs[metric], with_segm=metric == 'segm')
+            if 'bbox' in self.result_dirs:
+                self.result_dirs['proposal'] = self.result_dirs['bbox']
+        for metric, writer in self._writers.items():
+            writer.write(**result_arrays[metric])
+
+    def close(self):
+        """Close the columns of all the metrics.
+
+        Returns:
+            dict[str: str]: Possible keys are "bbox", "segm", "proposal", \
+                and values are corresponding directories.
+        """
+        for writer in self._writers.values():
+            writer.close()
+        return dict(self.result_dirs)
+
+
+def merge_columnar_results(part_prefixes, outfile_prefix, chunk_size=10000):
+    """Merge the columns dumped by several :class:`ColumnarResultDumper`.
+
+    The detections of the parts are copied part by part, ``chunk_size`` at
+    a time, so the parts are never loaded as a whole.
+
+    Args:
+        part_prefixes (list[str]): The prefixes of the dumped parts.
+        outfile_prefix (str): The directory prefix of the merged columns.
+        chunk_size (int): Number of detections copied at a time.
+            Default: 10000.
+
+    Returns:
+        dict[str: str]: Possible keys are "bbox", "segm", "proposal", and \
+            values are corresponding directories.
+    """
+    result_dirs = dict()
+    for metric in METRICS:
+        part_dirs = [
+            f'{prefix}.{metric}' for prefix in part_prefixes
+            if osp.isdir(f'{prefix}.{metric}')
+        ]
+        if not part_dirs:
+            continue
+        result_dirs[metric] = f'{outfile_prefix}.{metric}'
+        with ColumnarResultWriter(
+                result_dirs[metric], with_segm=metric == 'segm') as writer:
+            for part_dir in part_dirs:
+                part = ColumnarResults(part_dir)
+                arrays = part.to_arrays()
+                for start in range(0, len(part), chunk_size):
+                    end = min(start + chunk_size, len(part))
+                    chunk = {name: arrays[name][start:end] for name in COLUMNS}
+                    if part.with_segm:
+                        chunk['segms'] = [
+                            arrays['segms'][i] for i in range(start, end)
+                        ]
+                    writer.write(**chunk)
+    if 'bbox' in result_dirs:
+        result_dirs['proposal'] = result_dirs['bbox']
+    return result_dirs
+
+
+class ResultsWithColumns(Sequence):
+    """Testing results of a dataset along with their columns.
+
+    It is a read-only view of the results, and the columns written during
+    testing are used instead of converting the results again, e.g. by
+    :meth:`CocoDataset.results2json`. Pickling it gives a plain list of
+    the results.
+
+    Args:
+        results (Sequence): Testing results of the dataset.
+        result_dirs (dict[str: str]): The columns of each metric, e.g. the
+            output of :meth:`ColumnarResultDumper.close`.
+    """
+
+    def __init__(self, results, result_dirs):
+        self.results = results
+        self.result_dirs = result_dirs
+
+    def __len__(self):
+        return len(self.results)
+
+    def __getitem__(self, idx):
+        return self.results[idx]
+
+    def __reduce__(self):
+        return list, (list(self.results), )
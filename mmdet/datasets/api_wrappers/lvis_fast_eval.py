@@ -0,0 +1,534 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import datetime
+from collections import OrderedDict
+
+import numpy as np
+import pycocotools.mask as mask_util
+
+
+class LVISEvalParams:
+    """Params for LVIS evaluation, the same as ``lvis.eval.Params``."""
+
+    def __init__(self, iou_type):
+        self.img_ids = []
+        self.cat_ids = []
+        # np.arange causes trouble.  the data point on arange is slightly
+        # larger than the true value
+        self.iou_thrs = np.linspace(
+            0.5, 0.95, int(np.round((0.95 - 0.5) / 0.05)) + 1, endpoint=True)
+        self.rec_thrs = np.linspace(
+            0.0, 1.00, int(np.round((1.00 - 0.0) / 0.01)) + 1, endpoint=True)
+        self.max_dets = 300
+        self.area_rng = [
+            [0**2, 1e5**2],
+            [0**2, 32**2],
+            [32**2, 96**2],
+            [96**2, 1e5**2],
+        ]
+        self.area_rng_lbl = ['all', 'small', 'medium', 'large']
+        self.use_cats = 1
+        # We bin categories in three bins based how many images of the
+        # training set the category is present in.
+        # r: Rare    :  < 10
+        # c: Common  : >= 10 and < 100
+        # f: Frequent: >= 100
+        self.img_count_lbl = ['r', 'c', 'f']
+        self.iou_type = iou_type
+
+
+def _bbox_ious(dt_bboxes, gt_bboxes):
+    """Element-wise IoU of xywh bboxes, in the same float64 arithmetic as
+    ``pycocotools.mask.iou`` so that matches on thresholds are identical."""
+    dt_areas = dt_bboxes[:, 2] * dt_bboxes[:, 3]
+    gt_areas = gt_bboxes[:, 2] * gt_bboxes[:, 3]
+    w = np.minimum(dt_bboxes[:, 2] + dt_bboxes[:, 0],
+                   gt_bboxes[:, 2] + gt_bboxes[:, 0]) - np.maximum(
+                       dt_bboxes[:, 0], gt_bboxes[:, 0])
+    h = np.minimum(dt_bboxes[:, 3] + dt_bboxes[:, 1],
+                   gt_bboxes[:, 3] + gt_bboxes[:, 1]) - np.maximum(
+                       dt_bboxes[:, 1], gt_bboxes[:, 1])
+    inter = w * h
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ious = inter / (dt_areas + gt_areas - inter)
+    return np.where((w > 0) & (h > 0), ious, 0.)
+
+
+class FastLVISEval:
+    """Vectorized LVIS evaluation on flat detection arrays.
+
+    It follows the federated rules of ``lvis.LVISEval`` and gives the same
+    results, but works on whole arrays instead of per-image per-category
+    python loops:
+
+    - detections of categories neither in the gt of an image nor in its
+      ``neg_category_ids`` are dropped;
+    - unmatched detections of categories in ``not_exhaustive_category_ids``
+      of an image are ignored;
+    - AP is also summarized over the rare, common and frequent categories.
+
+    Detections and gts are grouped by (category, image) and the greedy
+    matching of all the groups, IoU thresholds and area ranges runs at once,
+    one detection rank at a time.
+
+    Args:
+        lvis_gt (LVIS): LVIS api of the ground truth.
+        lvis_dt (dict): Flat detection arrays of N detections. Keys are:
+
+            - `image_ids` (ndarray): Shape (N, ).
+            - `category_ids` (ndarray): Shape (N, ).
+            - `bboxes` (ndarray): Shape (N, 4), in ``xywh`` order.
+            - `scores` (ndarray): Shape (N, ).
+            - `segms` (list[dict]): N RLEs, only needed by segm evaluation.
+        iou_type (str): 'segm' or 'bbox'. Default: 'bbox'.
+        max_dets (int): Max number of detections per image, the same as the
+            one of ``lvis.LVISResults``. Default: 300.
+    """
+
+    def __init__(self, lvis_gt, lvis_dt, iou_type='bbox', max_dets=300):
+        if iou_type not in ['bbox', 'segm']:
+            raise ValueError(f'iou_type: {iou_type} is not supported.')
+        if iou_type == 'segm':
+            assert 'segms' in lvis_dt, 'segm evaluation needs `segms`.'
+        self.lvis_gt = lvis_gt
+        self.lvis_dt = lvis_dt
+        self.max_dets = max_dets
+        self.params = LVISEvalParams(iou_type=iou_type)
+        self.params.img_ids = sorted(self.lvis_gt.get_img_ids())
+        self.params.cat_ids = sorted(self.lvis_gt.get_cat_ids())
+        self.eval = {}
+        self.results = OrderedDict()
+
+    def _limit_dets_per_image(self, img_ids, scores):
+        """Keep the top ``max_dets`` detections of each image by score, ties
+        are broken by the original order."""
+        order = np.lexsort((np.arange(scores.shape[0]), -scores, img_ids))
+        sorted_img_ids = img_ids[order]
+        starts = np.searchsorted(sorted_img_ids, sorted_img_ids, side='left')
+        ranks = np.arange(order.shape[0]) - starts
+        keep = np.zeros(scores.shape[0], dtype=bool)
+        keep[order[ranks < self.max_dets]] = True
+        return keep
+
+    def _load_gts(self, img_ids, cat_ids):
+        """Gather gts of the evaluated images and categories as arrays."""
+        p = self.params
+        gts = self.lvis_gt.load_anns(
+            self.lvis_gt.get_ann_ids(img_ids=p.img_ids, cat_ids=p.cat_ids))
+        gt_img_inds = np.searchsorted(
+            img_ids, np.array([gt['image_id'] for gt in gts], dtype=np.int64))
+        gt_cat_inds = np.searchsorted(
+            cat_ids, np.array([gt['category_id'] for gt in gts],
+                              dtype=np.int64))
+        gt_bboxes = np.array([gt['bbox'] for gt in gts],
+                             dtype=np.float64).reshape(-1, 4)
+        gt_areas = np.array([gt['area'] for gt in gts], dtype=np.float64)
+        gt_ignores = np.array([gt.get('ignore', 0) for gt in gts], dtype=bool)
+        return gts, gt_img_inds, gt_cat_inds, gt_bboxes, gt_areas, gt_ignores
+
+    def _load_dts(self, img_ids, cat_ids, gt_keys):
+        """Gather detections that are evaluated under the federated rules."""
+        dt = self.lvis_dt
+        dt_img_ids = np.asarray(dt['image_ids'], dtype=np.int64)
+        dt_cat_ids = np.asarray(dt['category_ids'], dtype=np.int64)
+        dt_scores = np.asarray(dt['scores'], dtype=np.float64)
+        dt_inds = np.arange(dt_scores.shape[0])
+        if self.max_dets >= 0:
+            dt_inds = dt_inds[self._limit_dets_per_image(
+                dt_img_ids, dt_scores)]
+        dt_img_inds = np.searchsorted(img_ids, dt_img_ids[dt_inds])
+        dt_cat_inds = np.searchsorted(cat_ids, dt_cat_ids[dt_inds])
+        valid = (dt_img_inds < img_ids.shape[0]) & (
+            dt_cat_inds < cat_ids.shape[0])
+        valid[valid] = (
+            img_ids[dt_img_inds[valid]] == dt_img_ids[dt_inds[valid]]) & (
+                cat_ids[dt_cat_inds[valid]] == dt_cat_ids[dt_inds[valid]])
+        dt_inds = dt_inds[valid]
+        dt_img_inds, dt_cat_inds = dt_img_inds[valid], dt_cat_inds[valid]
+        if 'bboxes' in dt:
+            # LVISResults uses the bbox area when bboxes are given
+            dt_bboxes = np.asarray(
+                dt['bboxes'], dtype=np.float64).reshape(-1, 4)
+            dt_areas = dt_bboxes[dt_inds, 2] * dt_bboxes[dt_inds, 3]
+        else:
+            dt_areas = mask_util.area([dt['segms'][i] for i in dt_inds
+                                       ]).astype(np.float64).reshape(-1)
+        # detections with empty areas are dropped by ``LVIS.get_ann_ids``
+        valid = (dt_areas > 0) & (dt_areas < np.inf)
+        dt_inds, dt_areas = dt_inds[valid], dt_areas[valid]
+        dt_img_inds, dt_cat_inds = dt_img_inds[valid], dt_cat_inds[valid]
+        dt_keys = dt_img_inds * cat_ids.shape[0] + dt_cat_inds
+
+        # a detector is only evaluated on the categories verified to be
+        # present (gt) or absent (neg_category_ids) in an image
+        img_data = self.lvis_gt.load_imgs(ids=self.params.img_ids)
+        neg_keys = self._img_cat_keys(img_data, 'neg_category_ids', cat_ids)
+        keep = np.isin(dt_keys, neg_keys) | np.isin(dt_keys, gt_keys)
+        nel_keys = self._img_cat_keys(img_data, 'not_exhaustive_category_ids',
+                                      cat_ids)
+        dt_inds, dt_img_inds, dt_cat_inds, dt_keys = \
+            dt_inds[keep], dt_img_inds[keep], dt_cat_inds[keep], dt_keys[keep]
+        dt_not_exhaustive = np.isin(dt_keys, nel_keys)
+        return (dt_inds, dt_img_inds, dt_cat_inds, dt_areas[keep],
+                dt_not_exhaustive)
+
+    @staticmethod
+    def _img_cat_keys(img_data, field, cat_ids):
+        keys = []
+        for img_idx, img in enumerate(img_data):
+            img_cat_ids = np.asarray(img[field], dtype=np.int64)
+            cat_inds = np.searchsorted(cat_ids, img_cat_ids)
+            valid = cat_inds < cat_ids.shape[0]
+            valid[valid] = cat_ids[cat_inds[valid]] == img_cat_ids[valid]
+            keys.append(img_idx * cat_ids.shape[0] + cat_inds[valid])
+        return np.concatenate(keys) if keys else np.zeros(0, dtype=np.int64)
+
+    def _compute_pair_ious(self, dt_inds, gts, gt_bboxes, pair_dts, pair_gts,
+                           pair_group_inds):
+        """IoUs of the given (dt, gt) pairs, sorted by group."""
+        if self.params.iou_type == 'bbox':
+            dt_bboxes = np.asarray(
+                self.lvis_dt['bboxes'], dtype=np.float64).reshape(-1, 4)
+            return _bbox_ious(dt_bboxes[dt_inds[pair_dts]],
+                              gt_bboxes[pair_gts])
+
+        # masks of a group are compared with one call of pycocotools
+        ious = np.zeros(pair_dts.shape[0], dtype=np.float64)
+        segms = self.lvis_dt['segms']
+        bounds = np.flatnonzero(np.diff(pair_group_inds)) + 1
+        for start, end in zip(
+                np.concatenate([[0], bounds]),
+                np.concatenate([bounds, [pair_dts.shape[0]]])):
+            if start == end:
+                continue
+            group_dts = np.unique(pair_dts[start:end])
+            group_gts = np.unique(pair_gts[start:end])
+            group_ious = mask_util.iou(
+                [segms[dt_inds[i]] for i in group_dts],
+                [self.lvis_gt.ann_to_rle(gts[i])
+                 for i in group_gts], [0] * len(group_gts))
+            ious[start:end] = np.asarray(group_ious).reshape(
+                len(group_dts), len(group_gts))[
+                    np.searchsorted(group_dts, pair_dts[start:end]),
+                    np.searchsorted(group_gts, pair_gts[start:end])]
+        return ious
+
+    def evaluate(self):
+        """Match detections with gts of all images and categories."""
+        p = self.params
+        img_ids = np.unique(np.asarray(p.img_ids, dtype=np.int64))
+        cat_ids = np.asarray(p.cat_ids, dtype=np.int64)
+        p.img_ids = img_ids.tolist()
+        num_cats = cat_ids.shape[0]
+        area_rng = np.asarray(p.area_rng, dtype=np.float64)
+        iou_thrs = np.minimum(p.iou_thrs, 1 - 1e-10)
+        num_thrs, num_areas = iou_thrs.shape[0], area_rng.shape[0]
+
+        gts, gt_img_inds, gt_cat_inds, gt_bboxes, gt_areas, gt_ignores = \
+            self._load_gts(img_ids, cat_ids)
+        gt_keys = gt_img_inds * num_cats + gt_cat_inds
+        dt_inds, dt_img_inds, dt_cat_inds, dt_areas, dt_not_exhaustive = \
+            self._load_dts(img_ids, cat_ids, gt_keys)
+        dt_keys = dt_img_inds * num_cats + dt_cat_inds
+        dt_scores = np.asarray(
+            self.lvis_dt['scores'], dtype=np.float64)[dt_inds]
+
+        # group by (category, image), detections in a group are sorted by
+        # score and gts keep their original order
+        group_keys = dt_cat_inds * img_ids.shape[0] + dt_img_inds
+        dt_order = np.lexsort(
+            (np.arange(dt_inds.shape[0]), -dt_scores, group_keys))
+        dt_inds, dt_keys, dt_scores, dt_areas = dt_inds[dt_order], dt_keys[
+            dt_order], dt_scores[dt_order], dt_areas[dt_order]
+        dt_img_inds, dt_cat_inds = dt_img_inds[dt_order], dt_cat_inds[dt_order]
+        dt_not_exhaustive = dt_not_exhaustive[dt_order]
+        gt_order = np.lexsort((np.arange(len(gts)),
+                               gt_cat_inds * img_ids.shape[0] + gt_img_inds))
+        gt_keys, gt_cat_inds = gt_keys[gt_order], gt_cat_inds[gt_order]
+        gt_bboxes = gt_bboxes[gt_order]
+        gt_areas, gt_ignores = gt_areas[gt_order], gt_ignores[gt_order]
+        gts = [gts[i] for i in gt_order]
+
+        # (num_gts, num_areas), gts to ignore in each area range
+        gt_area_ignores = gt_ignores[:, None] | (
+            gt_areas[:, None] < area_rng[None, :, 0]) | (
+                gt_areas[:, None] > area_rng[None, :, 1])
+        dt_matched = np.zeros((dt_inds.shape[0], num_thrs, num_areas),
+                              dtype=bool)
+        dt_gt_ignores = np.zeros_like(dt_matched)
+
+        # groups that have both detections and gts need matching
+        group_keys, dt_starts, dt_counts = np.unique(
+            dt_keys, return_index=True, return_counts=True)
+        gt_group_keys, gt_starts, gt_counts = np.unique(
+            gt_keys, return_index=True, return_counts=True)
+        has_gts = np.isin(group_keys, gt_group_keys)
+        dt_starts, dt_counts = dt_starts[has_gts], dt_counts[has_gts]
+        gt_pos = np.searchsorted(gt_group_keys, group_keys[has_gts])
+        gt_starts, gt_counts = gt_starts[gt_pos], gt_counts[gt_pos]
+
+        # all (dt, gt) pairs of the groups, gts vary fastest
+        pair_counts = dt_counts * gt_counts
+        pair_starts = np.cumsum(pair_counts) - pair_counts
+        pair_group_inds = np.repeat(
+            np.arange(pair_counts.shape[0]), pair_counts)
+        pair_offsets = np.arange(pair_group_inds.shape[0]) - \
+            pair_starts[pair_group_inds]
+        pair_dts = dt_starts[pair_group_inds] + \
+            pair_offsets // gt_counts[pair_group_inds]
+        pair_gts = gt_starts[pair_group_inds] + \
+            pair_offsets % gt_counts[pair_group_inds]
+        pair_ious = self._compute_pair_ious(dt_inds, gts, gt_bboxes, pair_dts,
+                                            pair_gts, pair_group_inds)
+
+        # groups of similar gt numbers share one padded matching state
+        buckets = np.ceil(np.log2(np.maximum(gt_counts, 1))).astype(np.int64)
+        for bucket in np.unique(buckets):
+            group_inds = np.flatnonzero(buckets == bucket)
+            # groups with more detections go first, so the active groups of
+            # each detection rank are always a prefix
+            group_inds = group_inds[np.argsort(
+                -dt_counts[group_inds], kind='mergesort')]
+            self._match_groups(pair_ious, pair_starts[group_inds],
+                               dt_starts[group_inds], dt_counts[group_inds],
+                               gt_starts[group_inds], gt_counts[group_inds],
+                               gt_area_ignores, iou_thrs, dt_matched,
+                               dt_gt_ignores)
+
+        # unmatched detections out of the area range or of not exhaustively
+        # annotated categories are ignored
+        dt_area_ignores = (dt_areas[:, None] < area_rng[None, :, 0]) | (
+            dt_areas[:, None] > area_rng[None, :, 1]) | \
+            dt_not_exhaustive[:, None]
+        dt_ignores = dt_gt_ignores | (~dt_matched
+                                      & dt_area_ignores[:, None, :])
+
+        self._dts = dict(
+            cat_inds=dt_cat_inds,
+            img_inds=dt_img_inds,
+            scores=dt_scores,
+            matched=dt_matched,
+            ignores=dt_ignores)
+        self._num_gts = np.zeros((num_cats, num_areas), dtype=np.int64)
+        np.add.at(self._num_gts, gt_cat_inds, ~gt_area_ignores)
+        self._has_eval = np.zeros((num_cats, ), dtype=bool)
+        self._has_eval[dt_cat_inds] = True
+        self._has_eval[gt_cat_inds] = True
+
+    @staticmethod
+    def _match_groups(pair_ious, pair_starts, dt_starts, dt_counts, gt_starts,
+                      gt_counts, gt_area_ignores, iou_thrs, dt_matched,
+                      dt_gt_ignores):
+        """Greedily match the detections of groups in score order.
+
+        For each detection, an unmatched gt with IoU >= threshold is matched
+        if it has the highest IoU (the last one on ties) among the
+        candidates, and ignored gts are only used when no regular gt is a
+        candidate, the same as ``lvis.LVISEval.evaluate_img``.
+        """
+        max_gts = gt_counts.max()
+        num_thrs, num_areas = dt_matched.shape[1:]
+        gt_range = np.arange(max_gts)
+        is_pad = gt_range[None, :] >= gt_counts[:, None]
+        gt_inds = np.minimum(gt_starts[:, None] + gt_range[None, :],
+                             gt_area_ignores.shape[0] - 1)
+        # (num_groups, num_areas, max_gts)
+        group_gt_ignores = gt_area_ignores[gt_inds].transpose(0, 2, 1)
+        # padded gts are regarded as matched and never become candidates
+        gt_matched = np.repeat(
+            is_pad[:, None, None, :], num_thrs, axis=1).repeat(
+                num_areas, axis=2)
+        for rank in range(dt_counts.max()):
+            num_active = np.count_nonzero(dt_counts > rank)
+            pair_inds = pair_starts[:num_active, None] + \
+                rank * gt_counts[:num_active, None] + gt_range[None, :]
+            ious = np.where(
+                is_pad[:num_active], -1.,
+                pair_ious[np.minimum(pair_inds, pair_ious.shape[0] - 1)])
+            # (num_active, num_thrs, num_areas, max_gts)
+            candidates = ~gt_matched[:num_active] & (
+                ious[:, None, None, :] >= iou_thrs[None, :, None, None])
+            regular = candidates & ~group_gt_ignores[:num_active, None]
+            candidates = np.where(
+                regular.any(axis=-1, keepdims=True), regular, candidates)
+            hit = candidates.any(axis=-1)
+            scores = np.where(candidates, ious[:, None, None, :], -np.inf)
+            matched_gts = max_gts - 1 - scores[..., ::-1].argmax(axis=-1)
+
+            group_inds, thr_inds, area_inds = np.nonzero(hit)
+            gt_inds_hit = matched_gts[group_inds, thr_inds, area_inds]
+            gt_matched[group_inds, thr_inds, area_inds, gt_inds_hit] = True
+            dt_inds = dt_starts[:num_active] + rank
+            dt_matched[dt_inds] = hit
+            dt_gt_ignores[dt_inds[group_inds], thr_inds, area_inds] = \
+                group_gt_ignores[group_inds, area_inds, gt_inds_hit]
+
+    def accumulate(self):
+        """Accumulate matches to precision and recall of each category."""
+        if not hasattr(self, '_dts'):
+            raise RuntimeError('Please run evaluate() first.')
+        p = self.params
+        num_thrs = len(p.iou_thrs)
+        num_recalls = len(p.rec_thrs)
+        num_cats = len(p.cat_ids)
+        num_areas = len(p.area_rng)
+
+        # -1 for absent categories
+        precision = -np.ones((num_thrs, num_recalls, num_cats, num_areas))
+        recall = -np.ones((num_thrs, num_cats, num_areas))
+
+        dts = self._dts
+        # the detections of a category are sorted by score, ties are kept
+        # in the order of images
+        order = np.lexsort((np.arange(dts['scores'].shape[0]), -dts['scores'],
+                            dts['cat_inds']))
+        cat_inds = dts['cat_inds'][order]
+        matched = dts['matched'][order]
+        ignores = dts['ignores'][order]
+        tps = matched & ~ignores
+        fps = ~matched & ~ignores
+        cat_starts = np.searchsorted(cat_inds, np.arange(num_cats + 1))
+
+        for cat_idx in np.flatnonzero(self._has_eval):
+            start, end = cat_starts[cat_idx], cat_starts[cat_idx + 1]
+            num_gts = self._num_gts[cat_idx]
+            areas = np.flatnonzero(num_gts > 0)
+            if areas.size == 0:
+                continue
+            if start == end:
+                recall[:, cat_idx, areas] = 0
+                precision[:, :, cat_idx, areas] = 0
+                continue
+            # (num_dts, num_thrs, num_areas)
+            tp_sum = np.cumsum(tps[start:end], axis=0).astype(np.float64)
+            fp_sum = np.cumsum(fps[start:end], axis=0).astype(np.float64)
+            rc = tp_sum[..., areas] / num_gts[areas]
+            # np.spacing(1) ~= eps
+            pr = tp_sum[..., areas] / (
+                fp_sum[..., areas] + tp_sum[..., areas] + np.spacing(1))
+            # use the max precision to the right of each recall level
+            pr = np.maximum.accumulate(pr[::-1], axis=0)[::-1]
+            recall[:, cat_idx, areas] = rc[-1]
+            for thr_idx in range(num_thrs):
+                for i, area_idx in enumerate(areas):
+                    inds = np.searchsorted(
+                        rc[:, thr_idx, i], p.rec_thrs, side='left')
+                    valid = inds < rc.shape[0]
+                    pr_at_recall = np.zeros(num_recalls)
+                    pr_at_recall[valid] = pr[inds[valid], thr_idx, i]
+                    precision[thr_idx, :, cat_idx, area_idx] = pr_at_recall
+
+        self.eval = {
+            'params': p,
+            'counts': [num_thrs, num_recalls, num_cats, num_areas],
+            'date': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'precision': precision,
+            'recall': recall,
+        }
+
+    def _prepare_freq_group(self):
+        freq_groups = [[] for _ in self.params.img_count_lbl]
+        cat_data = self.lvis_gt.load_cats(self.params.cat_ids)
+        for idx, _cat_data in enumerate(cat_data):
+            frequency = _cat_data['frequency']
+            freq_groups[self.params.img_count_lbl.index(frequency)].append(idx)
+        return freq_groups
+
+    def _summarize(self,
+                   summary_type,
+                   iou_thr=None,
+                   area_rng='all',
+                   freq_group_idx=None):
+        aidx = [
+            idx for idx, _area_rng in enumerate(self.params.area_rng_lbl)
+            if _area_rng == area_rng
+        ]
+
+        if summary_type == 'ap':
+            s = self.eval['precision']
+            if iou_thr is not None:
+                tidx = np.where(iou_thr == self.params.iou_thrs)[0]
+                s = s[tidx]
+            if freq_group_idx is not None:
+                s = s[:, :, self.freq_groups[freq_group_idx], aidx]
+            else:
+                s = s[:, :, :, aidx]
+        else:
+            s = self.eval['recall']
+            if iou_thr is not None:
+                tidx = np.where(iou_thr == self.params.iou_thrs)[0]
+                s = s[tidx]
+            s = s[:, :, aidx]
+
+        if len(s[s > -1]) == 0:
+            mean_s = -1
+        else:
+            mean_s = np.mean(s[s > -1])
+        return mean_s
+
+    def summarize(self):
+        """Compute the summary metrics, the same as ``lvis.LVISEval``."""
+        if not self.eval:
+            raise RuntimeError('Please run accumulate() first.')
+
+        max_dets = self.params.max_dets
+        self.freq_groups = self._prepare_freq_group()
+
+        self.results['AP'] = self._summarize('ap')
+        self.results['AP50'] = self._summarize('ap', iou_thr=0.50)
+        self.results['AP75'] = self._summarize('ap', iou_thr=0.75)
+        self.results['APs'] = self._summarize('ap', area_rng='small')
+        self.results['APm'] = self._summarize('ap', area_rng='medium')
+        self.results['APl'] = self._summarize('ap', area_rng='large')
+        self.results['APr'] = self._summarize('ap', freq_group_idx=0)
+        self.results['APc'] = self._summarize('ap', freq_group_idx=1)
+        self.results['APf'] = self._summarize('ap', freq_group_idx=2)
+
+        key = 'AR@{}'.format(max_dets)
+        self.results[key] = self._summarize('ar')
+
+        for area_rng in ['small', 'medium', 'large']:
+            key = 'AR{}@{}'.format(area_rng[0], max_dets)
+            self.results[key] = self._summarize('ar', area_rng=area_rng)
+
+    def run(self):
+        """Wrapper function which calculates the results."""
+        self.evaluate()
+        self.accumulate()
+        self.summarize()
+
+    def print_results(self):
+        template = ' {:<18} {} @[ IoU={:<9} | area={:>6s} | maxDets={:>3d} ' \
+                   'catIds={:>3s}] = {:0.3f}'
+
+        for key, value in self.results.items():
+            max_dets = self.params.max_dets
+            if 'AP' in key:
+                title = 'Average Precision'
+                _type = '(AP)'
+            else:
+                title = 'Average Recall'
+                _type = '(AR)'
+
+            if len(key) > 2 and key[2].isdigit():
+                iou_thr = (float(key[2:]) / 100)
+                iou = '{:0.2f}'.format(iou_thr)
+            else:
+                iou = '{:0.2f}:{:0.2f}'.format(self.params.iou_thrs[0],
+                                               self.params.iou_thrs[-1])
+
+            if len(key) > 2 and key[2] in ['r', 'c', 'f']:
+                cat_group_name = key[2]
+            else:
+                cat_group_name = 'all'
+
+            if len(key) > 2 and key[2] in ['s', 'm', 'l']:
+                area_rng = key[2]
+            else:
+                area_rng = 'all'
+
+            print(
+                template.format(title, _type, iou, area_rng, max_dets,
+                                cat_group_name, value))
+
+    def get_results(self):
+        return self.results
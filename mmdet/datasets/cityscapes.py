@@ -7,12 +7,14 @@ import os
 import os.path as osp
 import tempfile
 from collections import OrderedDict
+from collections.abc import Sequence
 
 import mmcv
 import numpy as np
 import pycocotools.mask as maskUtils
 from mmcv.utils import print_log
 
+from mmdet.core import compact2result, is_compact_result
 from .builder import DATASETS
 from .coco import CocoDataset
 
@@ -127,6 +129,10 @@ class CityscapesDataset(CocoDataset):
         except ImportError:
             raise ImportError('Please run "pip install citscapesscripts" to '
                               'install cityscapesscripts first.')
+        if is_compact_result(results[0]):
+            results = [
+                compact2result(result, len(self.CLASSES)) for result in results
+            ]
         result_files = []
         os.makedirs(outfile_prefix, exist_ok=True)
         prog_bar = mmcv.ProgressBar(len(self))
@@ -189,12 +195,12 @@ class CityscapesDataset(CocoDataset):
                 the json filepaths, tmp_dir is the temporal directory created \
                 for saving txt/png files when txtfile_prefix is not specified.
         """
-        assert isinstance(results, list), 'results must be a list'
+        assert isinstance(results, Sequence), 'results must be a sequence'
         assert len(results) == len(self), (
             'The length of results is not equal to the dataset len: {} != {}'.
             format(len(results), len(self)))
 
-        assert isinstance(results, list), 'results must be a list'
+        assert isinstance(results, Sequence), 'results must be a sequence'
         assert len(results) == len(self), (
             'The length of results is not equal to the dataset len: {} != {}'.
             format(len(results), len(self)))
@@ -7,14 +7,16 @@ import os.path as osp
 import tempfile
 import warnings
 from collections import OrderedDict
+from collections.abc import Sequence
 
 import mmcv
 import numpy as np
 from mmcv.utils import print_log
 from terminaltables import AsciiTable
 
-from mmdet.core import eval_recalls
-from .api_wrappers import COCO, COCOeval
+from mmdet.core import eval_recalls, is_compact_result
+from .api_wrappers import (COCO, COCOeval, ColumnarResultDumper,
+                           ColumnarResults, ResultsWithColumns)
 from .builder import DATASETS
 from .custom import CustomDataset
 
@@ -298,40 +300,205 @@ class CocoDataset(CustomDataset):
         predictions, and they have different data types. This method will
         automatically recognize the type, and dump them to json files.
 
+        The results are first written to the columnar format of
+        :meth:`results2columns` in a tmp dir, unless they come with the
+        columns written during testing, and the json files are dumped from
+        the columns detection by detection by :meth:`columns2json`.
+
         Args:
-            results (list[list | tuple | ndarray]): Testing results of the
-                dataset.
+            results (list[list | tuple | ndarray | dict]): Testing results of
+                the dataset, the compact results of :func:`result2compact`
+                and :class:`ResultsWithColumns` are also accepted.
             outfile_prefix (str): The filename prefix of the json files. If the
                 prefix is "somepath/xxx", the json files will be named
                 "somepath/xxx.bbox.json", "somepath/xxx.segm.json",
                 "somepath/xxx.proposal.json".
 
+        Returns:
+            dict[str: str]: Possible keys are "bbox", "segm", "proposal", and \
+                values are corresponding filenames.
+        """
+        if isinstance(results, ResultsWithColumns):
+            return self.columns2json(results.result_dirs, outfile_prefix)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            result_dirs = self.results2columns(results,
+                                               osp.join(tmp_dir, 'results'))
+            return self.columns2json(result_dirs, outfile_prefix)
+
+    def columns2json(self, result_dirs, outfile_prefix):
+        """Dump the columns of the detection results to COCO style json
+        files.
+
+        Args:
+            result_dirs (dict[str: str]): The columns of each metric, e.g.
+                the output of :meth:`results2columns`.
+            outfile_prefix (str): The filename prefix of the json files, see
+                :meth:`results2json`.
+
         Returns:
             dict[str: str]: Possible keys are "bbox", "segm", "proposal", and \
                 values are corresponding filenames.
         """
         result_files = dict()
+        for metric, result_dir in result_dirs.items():
+            # proposals share the json file of bboxes
+            if metric == 'proposal' and 'bbox' in result_dirs:
+                continue
+            result_files[metric] = f'{outfile_prefix}.{metric}.json'
+            ColumnarResults(result_dir).dump_json(result_files[metric])
+        if 'bbox' in result_files:
+            result_files['proposal'] = result_files['bbox']
+        return result_files
+
+    def _bboxes2arrays(self, bbox_results, img_ids, with_labels=True):
+        """Flatten per-image per-class bboxes to arrays of all detections."""
+        img_inds, labels, bboxes = [], [], []
+        for idx, result in enumerate(bbox_results):
+            result = result if with_labels else [result]
+            for label, _bboxes in enumerate(result):
+                img_inds.append(np.full(_bboxes.shape[0], idx))
+                labels.append(np.full(_bboxes.shape[0], label))
+                bboxes.append(_bboxes.reshape(-1, 5))
+        img_inds = np.concatenate(img_inds).astype(np.int64)
+        labels = np.concatenate(labels).astype(np.int64)
+        # the same float64 values as ``xyxy2xywh`` gives
+        bboxes = np.concatenate(bboxes).astype(np.float64)
+        bboxes[:, 2:4] -= bboxes[:, 0:2]
+        if with_labels:
+            category_ids = np.array(self.cat_ids, dtype=np.int64)[labels]
+        else:
+            category_ids = np.ones_like(labels)
+        return dict(
+            image_ids=np.array(img_ids, dtype=np.int64)[img_inds],
+            category_ids=category_ids,
+            bboxes=bboxes[:, :4],
+            scores=bboxes[:, 4])
+
+    def _compact2arrays(self, results, img_ids):
+        """Flatten compact results to arrays of all detections."""
+        img_inds = np.concatenate([
+            np.full(len(result['labels']), idx, dtype=np.int64)
+            for idx, result in enumerate(results)
+        ])
+        labels = np.concatenate([result['labels'] for result in results])
+        # the same float64 values as ``xyxy2xywh`` gives
+        bboxes = np.concatenate([
+            result['bboxes'].reshape(-1, 5) for result in results
+        ]).astype(np.float64)
+        bboxes[:, 2:4] -= bboxes[:, 0:2]
+        bbox_arrays = dict(
+            image_ids=np.array(img_ids, dtype=np.int64)[img_inds],
+            category_ids=np.array(self.cat_ids,
+                                  dtype=np.int64)[labels.astype(np.int64)],
+            bboxes=bboxes[:, :4],
+            scores=bboxes[:, 4])
+        result_arrays = dict(bbox=bbox_arrays, proposal=bbox_arrays)
+        if 'masks' in results[0]:
+            segm_arrays = bbox_arrays.copy()
+            # some detectors use different scores for bbox and mask
+            segm_arrays['scores'] = np.concatenate([
+                np.asarray(result['mask_scores']).reshape(-1)
+                if 'mask_scores' in result else result['bboxes'][:, 4]
+                for result in results
+            ]).astype(np.float64)
+            segm_arrays['segms'] = [
+                mask for result in results for mask in result['masks']
+            ]
+            result_arrays['segm'] = segm_arrays
+        return result_arrays
+
+    def _results2arrays(self, results, img_ids):
+        if is_compact_result(results[0]):
+            return self._compact2arrays(results, img_ids)
+        result_arrays = dict()
         if isinstance(results[0], list):
-            json_results = self._det2json(results)
-            result_files['bbox'] = f'{outfile_prefix}.bbox.json'
-            result_files['proposal'] = f'{outfile_prefix}.bbox.json'
-            mmcv.dump(json_results, result_files['bbox'])
+            result_arrays['bbox'] = self._bboxes2arrays(results, img_ids)
+            result_arrays['proposal'] = result_arrays['bbox']
         elif isinstance(results[0], tuple):
-            json_results = self._segm2json(results)
-            result_files['bbox'] = f'{outfile_prefix}.bbox.json'
-            result_files['proposal'] = f'{outfile_prefix}.bbox.json'
-            result_files['segm'] = f'{outfile_prefix}.segm.json'
-            mmcv.dump(json_results[0], result_files['bbox'])
-            mmcv.dump(json_results[1], result_files['segm'])
+            result_arrays['bbox'] = self._bboxes2arrays(
+                [det for det, _ in results], img_ids)
+            result_arrays['proposal'] = result_arrays['bbox']
+            segms, mask_scores = [], []
+            for det, seg in results:
+                for label in range(len(det)):
+                    # some detectors use different scores for bbox and mask
+                    if isinstance(seg, tuple):
+                        segms.extend(seg[0][label])
+                        mask_scores.append(
+                            np.asarray(seg[1][label]).reshape(-1))
+                    else:
+                        segms.extend(seg[label])
+                        mask_scores.append(det[label][:, 4])
+            segm_arrays = result_arrays['bbox'].copy()
+            segm_arrays['scores'] = np.concatenate(mask_scores).astype(
+                np.float64)
+            segm_arrays['segms'] = segms
+            result_arrays['segm'] = segm_arrays
         elif isinstance(results[0], np.ndarray):
-            json_results = self._proposal2json(results)
-            result_files['proposal'] = f'{outfile_prefix}.proposal.json'
-            mmcv.dump(json_results, result_files['proposal'])
+            result_arrays['proposal'] = self._bboxes2arrays(
+                results, img_ids, with_labels=False)
         else:
             raise TypeError('invalid type of results')
-        return result_files
+        return result_arrays
 
-    def fast_eval_recall(self, results, proposal_nums, iou_thrs, logger=None):
+    def results2arrays(self, results, img_inds=None):
+        """Convert the detection results to flat arrays.
+
+        This is the counterpart of :meth:`results2json` for evaluators that
+        work on arrays, like :class:`FastLVISEval`, and keeps the same ids,
+        ``xywh`` bboxes and scores of the json results.
+
+        Args:
+            results (list[list | tuple | ndarray]): Testing results of the
+                dataset.
+            img_inds (Sequence[int], optional): Indices of the images of
+                ``results``, e.g. those of a batch during testing. Default to
+                all the images of the dataset.
+
+        Returns:
+            dict[str: dict]: Possible keys are "bbox", "segm", "proposal", \
+                and values are dicts of "image_ids", "category_ids", \
+                "bboxes" and "scores" arrays, plus a "segms" list of RLEs \
+                for "segm".
+        """
+        if img_inds is None:
+            img_ids = self.img_ids
+        else:
+            img_ids = [self.img_ids[idx] for idx in img_inds]
+        return self._results2arrays(results, img_ids)
+
+    def results2columns(self, results, outfile_prefix):
+        """Dump the detection results to the columnar format.
+
+        Unlike the json results, results are written image by image
+        without building a dict for each detection, and can be loaded
+        memory-mapped by :class:`ColumnarResults`, which also converts them
+        to COCO style json files lazily. The test loops write the columns
+        batch by batch during testing in the same way with
+        :class:`ColumnarResultDumper` if ``columnar_prefix`` is given.
+
+        Args:
+            results (Iterable[list | tuple | ndarray]): Testing results of
+                the dataset, in the order of images.
+            outfile_prefix (str): The directory prefix of the columns. If the
+                prefix is "somepath/xxx", the columns will be saved in
+                "somepath/xxx.bbox", "somepath/xxx.segm" and
+                "somepath/xxx.proposal".
+
+        Returns:
+            dict[str: str]: Possible keys are "bbox", "segm", "proposal", and \
+                values are corresponding directories.
+        """
+        dumper = ColumnarResultDumper(outfile_prefix)
+        for idx, result in enumerate(results):
+            dumper.write(self.results2arrays([result], [idx]))
+        return dumper.close()
+
+    def _eval_cache_key(self):
+        return super()._eval_cache_key() + (self.coco, tuple(
+            self.img_ids), tuple(self.cat_ids))
+
+    def _get_recall_gt_bboxes(self):
         gt_bboxes = []
         for i in range(len(self.img_ids)):
             ann_ids = self.coco.get_ann_ids(img_ids=self.img_ids[i])
@@ -349,7 +516,11 @@ class CocoDataset(CustomDataset):
             if bboxes.shape[0] == 0:
                 bboxes = np.zeros((0, 4))
             gt_bboxes.append(bboxes)
+        return gt_bboxes
 
+    def fast_eval_recall(self, results, proposal_nums, iou_thrs, logger=None):
+        gt_bboxes = self.get_eval_cache('recall_gt_bboxes',
+                                        self._get_recall_gt_bboxes)
         recalls = eval_recalls(
             gt_bboxes, results, proposal_nums, iou_thrs, logger=logger)
         ar = recalls.mean(axis=1)
@@ -359,8 +530,8 @@ class CocoDataset(CustomDataset):
         """Format the results to json (standard format for COCO evaluation).
 
         Args:
-            results (list[tuple | numpy.ndarray]): Testing results of the
-                dataset.
+            results (list[tuple | numpy.ndarray] | :obj:`ResultsWithColumns`):
+                Testing results of the dataset.
             jsonfile_prefix (str | None): The prefix of json files. It includes
                 the file path and the prefix of filename, e.g., "a/b/prefix".
                 If not specified, a temp file will be created. Default: None.
@@ -370,7 +541,7 @@ class CocoDataset(CustomDataset):
                 the json filepaths, tmp_dir is the temporal directory created \
                 for saving json files when jsonfile_prefix is not specified.
         """
-        assert isinstance(results, list), 'results must be a list'
+        assert isinstance(results, Sequence), 'results must be a sequence'
         assert len(results) == len(self), (
             'The length of results is not equal to the dataset len: {} != {}'.
             format(len(results), len(self)))
@@ -480,7 +651,10 @@ class CocoDataset(CustomDataset):
                     level=logging.ERROR)
                 break
 
-            cocoEval = COCOeval(coco_gt, coco_det, iou_type)
+            # the prepared gts are reused by later evaluations of self.coco
+            gt_cache = self.get_eval_cache(
+                'cocoeval_gts', dict) if coco_gt is self.coco else None
+            cocoEval = COCOeval(coco_gt, coco_det, iou_type, gt_cache=gt_cache)
             cocoEval.params.catIds = self.cat_ids
             cocoEval.params.imgIds = self.img_ids
             cocoEval.params.maxDets = list(proposal_nums)
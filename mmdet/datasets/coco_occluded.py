@@ -8,6 +8,7 @@ from mmcv.utils import print_log
 from pycocotools import mask as coco_mask
 from terminaltables import AsciiTable
 
+from mmdet.core import compact2result, is_compact_result
 from .builder import DATASETS
 from .coco import CocoDataset
 
@@ -104,6 +105,10 @@ class OccludedSeparatedCocoDataset(CocoDataset):
         Returns:
             dict[str, float]: The recall of occluded and separated masks.
         """
+        if is_compact_result(results[0]):
+            results = [
+                compact2result(result, len(self.CLASSES)) for result in results
+            ]
         dict_det = {}
         print_log('processing detection results...')
         prog_bar = mmcv.ProgressBar(len(results))
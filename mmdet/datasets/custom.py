@@ -14,6 +14,14 @@ from .builder import DATASETS
 from .pipelines import Compose
 
 
+def _is_same_key(key1, key2):
+    """Compare cache keys, objects are compared by identity except ints,
+    strings and tuples."""
+    return len(key1) == len(key2) and all(
+        a is b or (isinstance(a, (int, str, tuple)) and a == b)
+        for a, b in zip(key1, key2))
+
+
 @DATASETS.register_module()
 class CustomDataset(Dataset):
     """Custom dataset for detection.
@@ -129,6 +137,8 @@ class CustomDataset(Dataset):
 
         # processing pipeline
         self.pipeline = Compose(pipeline)
+        # ground truths converted for evaluation, see `get_eval_cache`
+        self._eval_cache = dict()
 
     def __len__(self):
         """Total number of samples of data."""
@@ -309,6 +319,43 @@ class CustomDataset(Dataset):
     def format_results(self, results, **kwargs):
         """Place holder to format result to dataset specific output."""
 
+    def _eval_cache_key(self):
+        """Objects whose change invalidates the evaluation cache."""
+        return (self.data_infos, len(self.data_infos), self.CLASSES)
+
+    def get_eval_cache(self, name, build_fn):
+        """Get an item of the evaluation ground truth cache.
+
+        Ground truths converted for evaluation are the same in every
+        evaluation round, so they are built by ``build_fn`` once and reused
+        until the dataset changes, i.e., an object returned by
+        :meth:`_eval_cache_key` is replaced or the number of images changes.
+
+        Args:
+            name (str): Name of the item.
+            build_fn (callable): Function without arguments to build the
+                item.
+
+        Returns:
+            The cached item. It is shared by all evaluations and should not
+            be modified in place.
+        """
+        key = self._eval_cache_key()
+        if name not in self._eval_cache or not _is_same_key(
+                self._eval_cache[name][0], key):
+            self._eval_cache[name] = (key, build_fn())
+        return self._eval_cache[name][1]
+
+    def get_ann_infos(self):
+        """Get annotation info of all images, cached for evaluation.
+
+        Returns:
+            list[dict]: Annotation info of all images.
+        """
+        return self.get_eval_cache(
+            'ann_infos',
+            lambda: [self.get_ann_info(i) for i in range(len(self))])
+
     def evaluate(self,
                  results,
                  metric='mAP',
@@ -337,7 +384,7 @@ class CustomDataset(Dataset):
         allowed_metrics = ['mAP', 'recall']
         if metric not in allowed_metrics:
             raise KeyError(f'metric {metric} is not supported')
-        annotations = [self.get_ann_info(i) for i in range(len(self))]
+        annotations = self.get_ann_infos()
         eval_results = OrderedDict()
         iou_thrs = [iou_thr] if isinstance(iou_thr, float) else iou_thr
         if metric == 'mAP':
@@ -5,11 +5,13 @@ import os.path as osp
 import tempfile
 import warnings
 from collections import OrderedDict
+from collections.abc import Sequence
 
 import numpy as np
 from mmcv.utils import print_log
 from terminaltables import AsciiTable
 
+from .api_wrappers import ColumnarResults, FastLVISEval, ResultsWithColumns
 from .builder import DATASETS
 from .coco import CocoDataset
 
@@ -315,11 +317,13 @@ class LVISV05Dataset(CocoDataset):
                  jsonfile_prefix=None,
                  classwise=False,
                  proposal_nums=(100, 300, 1000),
-                 iou_thrs=np.arange(0.5, 0.96, 0.05)):
+                 iou_thrs=np.arange(0.5, 0.96, 0.05),
+                 use_fast_eval=False):
         """Evaluation in LVIS protocol.
 
         Args:
-            results (list[list | tuple]): Testing results of the dataset.
+            results (list[list | tuple] | :obj:`ResultsWithColumns`): Testing
+                results of the dataset.
             metric (str | list[str]): Metrics to be evaluated. Options are
                 'bbox', 'segm', 'proposal', 'proposal_fast'.
             logger (logging.Logger | str | None): Logger used for printing
@@ -332,6 +336,14 @@ class LVISV05Dataset(CocoDataset):
             iou_thrs (Sequence[float]): IoU threshold used for evaluating
                 recalls. If set to a list, the average recall of all IoUs will
                 also be computed. Default: 0.5.
+            use_fast_eval (bool): Whether to evaluate with the vectorized
+                :class:`FastLVISEval` on result arrays instead of
+                ``LVISEval``. The metrics are the same. If
+                ``jsonfile_prefix`` is given or the results come with the
+                columns written during testing, the columns of
+                :meth:`results2columns` are evaluated memory-mapped and
+                dumped to the json files detection by detection.
+                Default: False.
 
         Returns:
             dict[str, float]: LVIS style metrics.
@@ -348,7 +360,7 @@ class LVISV05Dataset(CocoDataset):
             raise ImportError(
                 'Package lvis is not installed. Please run "pip install git+https://github.com/lvis-dataset/lvis-api.git".'  # noqa: E501
             )
-        assert isinstance(results, list), 'results must be a list'
+        assert isinstance(results, Sequence), 'results must be a sequence'
         assert len(results) == len(self), (
             'The length of results is not equal to the dataset len: {} != {}'.
             format(len(results), len(self)))
@@ -359,12 +371,33 @@ class LVISV05Dataset(CocoDataset):
             if metric not in allowed_metrics:
                 raise KeyError('metric {} is not supported'.format(metric))
 
-        if jsonfile_prefix is None:
-            tmp_dir = tempfile.TemporaryDirectory()
-            jsonfile_prefix = osp.join(tmp_dir.name, 'results')
+        tmp_dir = None
+        if use_fast_eval:
+            if isinstance(results, ResultsWithColumns):
+                # the columns written during testing
+                result_dirs = results.result_dirs
+            elif jsonfile_prefix is not None:
+                tmp_dir = tempfile.TemporaryDirectory()
+                result_dirs = self.results2columns(
+                    results, osp.join(tmp_dir.name, 'results'))
+            else:
+                result_dirs = None
+            if result_dirs is None:
+                result_files = self.results2arrays(results)
+            else:
+                # evaluate the columns memory-mapped and convert them to the
+                # json files lazily
+                result_files = {
+                    metric: ColumnarResults(result_dir).to_arrays()
+                    for metric, result_dir in result_dirs.items()
+                }
+                if jsonfile_prefix is not None:
+                    self.columns2json(result_dirs, jsonfile_prefix)
         else:
-            tmp_dir = None
-        result_files = self.results2json(results, jsonfile_prefix)
+            if jsonfile_prefix is None:
+                tmp_dir = tempfile.TemporaryDirectory()
+                jsonfile_prefix = osp.join(tmp_dir.name, 'results')
+            result_files = self.results2json(results, jsonfile_prefix)
 
         eval_results = OrderedDict()
         # get original api
@@ -388,17 +421,26 @@ class LVISV05Dataset(CocoDataset):
 
             if metric not in result_files:
                 raise KeyError('{} is not in results'.format(metric))
-            try:
-                lvis_dt = LVISResults(lvis_gt, result_files[metric])
-            except IndexError:
-                print_log(
-                    'The testing results of the whole dataset is empty.',
-                    logger=logger,
-                    level=logging.ERROR)
-                break
-
             iou_type = 'bbox' if metric == 'proposal' else metric
-            lvis_eval = LVISEval(lvis_gt, lvis_dt, iou_type)
+            if use_fast_eval:
+                if len(result_files[metric]['scores']) == 0:
+                    print_log(
+                        'The testing results of the whole dataset is empty.',
+                        logger=logger,
+                        level=logging.ERROR)
+                    break
+                lvis_eval = FastLVISEval(lvis_gt, result_files[metric],
+                                         iou_type)
+            else:
+                try:
+                    lvis_dt = LVISResults(lvis_gt, result_files[metric])
+                except IndexError:
+                    print_log(
+                        'The testing results of the whole dataset is empty.',
+                        logger=logger,
+                        level=logging.ERROR)
+                    break
+                lvis_eval = LVISEval(lvis_gt, lvis_dt, iou_type)
             lvis_eval.params.imgIds = self.img_ids
             if metric == 'proposal':
                 lvis_eval.params.useCats = 0
@@ -12,7 +12,7 @@ import torch.distributed as dist
 from mmcv.runner import get_dist_info
 from mmcv.utils import print_log
 
-from mmdet.core import eval_map
+from mmdet.core import compact2result, eval_map, is_compact_result
 from .builder import DATASETS
 from .custom import CustomDataset
 
@@ -110,6 +110,12 @@ class OpenImagesDataset(CustomDataset):
             else:
                 self.class_label_tree = self.get_relation_matrix(
                     hierarchy_file)
+            self.ancestor_indptr, self.ancestor_indices = \
+                self.get_ancestor_index(self.class_label_tree)
+        else:
+            # every class is only the ancestor of itself
+            self.ancestor_indptr, self.ancestor_indices = \
+                self.get_ancestor_index(np.eye(len(self.CLASSES)))
         self.get_supercategory = get_supercategory
         self.get_metas = get_metas
         self.load_from_file = load_from_file
@@ -423,34 +429,59 @@ class OpenImagesDataset(CustomDataset):
 
         return class_label_tree
 
+    def get_ancestor_index(self, class_label_tree):
+        """Convert the dense relation matrix to a sparse ancestor index.
+
+        Args:
+            class_label_tree (ndarray): The matrix of the corresponding
+                relationship between the parent class and the child class,
+                of shape (class_num, class_num).
+
+        Returns:
+            tuple[ndarray]: (indptr, indices) in CSR layout. The ancestors of
+            class ``i`` (itself included, in ascending order) are
+            ``indices[indptr[i]:indptr[i + 1]]``.
+        """
+        rows, cols = np.nonzero(class_label_tree)
+        indptr = np.zeros(class_label_tree.shape[0] + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(rows, minlength=class_label_tree.shape[0]),
+            out=indptr[1:])
+        return indptr, cols.astype(np.int64)
+
+    def expand_to_ancestors(self, labels):
+        """Expand labels to all their ancestors with the ancestor index.
+
+        Args:
+            labels (ndarray): Labels of shape (n, ).
+
+        Returns:
+            tuple[ndarray]: (ancestors, inds), both of shape (m, ). The
+            ancestors of ``labels[i]`` are listed in ascending order and
+            ``inds`` maps each of them back to the index of its label.
+        """
+        labels = np.asarray(labels, dtype=np.int64)
+        starts = self.ancestor_indptr[labels]
+        counts = self.ancestor_indptr[labels + 1] - starts
+        inds = np.repeat(np.arange(labels.shape[0]), counts)
+        offsets = np.arange(inds.shape[0]) - np.repeat(
+            np.cumsum(counts) - counts, counts)
+        return self.ancestor_indices[starts[inds] + offsets], inds
+
     def add_supercategory_ann(self, annotations):
         """Add parent classes of the corresponding class of the ground truth
         bboxes."""
         for i, ann in enumerate(annotations):
             assert len(ann['labels']) == len(ann['bboxes']) == \
                    len(ann['gt_is_group_ofs'])
-            gt_bboxes = []
-            gt_is_group_ofs = []
-            gt_labels = []
-            for j in range(len(ann['labels'])):
-                label = ann['labels'][j]
-                bbox = ann['bboxes'][j]
-                is_group = ann['gt_is_group_ofs'][j]
-                label = np.where(self.class_label_tree[label])[0]
-                if len(label) > 1:
-                    for k in range(len(label)):
-                        gt_bboxes.append(bbox)
-                        gt_is_group_ofs.append(is_group)
-                        gt_labels.append(label[k])
-                else:
-                    gt_bboxes.append(bbox)
-                    gt_is_group_ofs.append(is_group)
-                    gt_labels.append(label[0])
+            gt_labels, inds = self.expand_to_ancestors(ann['labels'])
             annotations[i] = dict(
-                bboxes=np.array(gt_bboxes).astype(np.float32),
-                labels=np.array(gt_labels).astype(np.int64),
+                bboxes=np.asarray(ann['bboxes'],
+                                  dtype=np.float32).reshape(-1, 4)[inds],
+                labels=gt_labels,
                 bboxes_ignore=ann['bboxes_ignore'],
-                gt_is_group_ofs=np.array(gt_is_group_ofs).astype(bool))
+                gt_is_group_ofs=np.asarray(
+                    ann['gt_is_group_ofs']).astype(bool)[inds])
 
         return annotations
 
@@ -465,6 +496,12 @@ class OpenImagesDataset(CustomDataset):
         detection bboxes.
 
         2. Whether to ignore the classes that unannotated on that image.
+
+        The detections of an image are processed as a whole: every bbox is
+        paired with all the ancestors of its class, the pairs to keep are
+        selected with masks and then grouped back by class. ``det_results``
+        is not modified, so it can be any sequence, e.g. the read-only
+        results spilled to disk during testing.
         """
         if image_level_annotations is not None:
             assert len(annotations) == \
@@ -472,10 +509,9 @@ class OpenImagesDataset(CustomDataset):
                    len(det_results)
         else:
             assert len(annotations) == len(det_results)
-        for i in range(len(det_results)):
-            results = copy.deepcopy(det_results[i])
-            valid_classes = np.where(
-                np.array([[bbox.shape[0]] for bbox in det_results[i]]) != 0)[0]
+        processed_results = []
+        for i, det_result in enumerate(det_results):
+            num_classes = len(det_result)
             if image_level_annotations is not None:
                 labels = annotations[i]['labels']
                 image_level_labels = \
@@ -485,20 +521,39 @@ class OpenImagesDataset(CustomDataset):
             else:
                 allowed_labeles = np.unique(annotations[i]['labels'])
 
-            for valid_class in valid_classes:
-                det_cls = np.where(self.class_label_tree[valid_class])[0]
-                for index in det_cls:
-                    if index in allowed_labeles and \
-                            index != valid_class and \
-                            self.get_supercategory:
-                        det_results[i][index] = \
-                            np.concatenate((det_results[i][index],
-                                            results[valid_class]))
-                    elif index not in allowed_labeles and self.filter_labels:
-                        # Remove useless parts
-                        det_results[i][index] = np.empty(
-                            (0, 5)).astype(np.float32)
-        return det_results
+            num_dets = np.array([bbox.shape[0] for bbox in det_result])
+            bboxes = np.concatenate(det_result)
+            bbox_labels = np.repeat(np.arange(num_classes), num_dets)
+            ancestors, bbox_inds = self.expand_to_ancestors(bbox_labels)
+            is_self = ancestors == bbox_labels[bbox_inds]
+            is_allowed = np.isin(ancestors, allowed_labeles)
+            if self.filter_labels:
+                keep = is_self & is_allowed
+            else:
+                keep = is_self.copy()
+            if self.get_supercategory:
+                keep |= ~is_self & is_allowed
+            ancestors, bbox_inds, is_self = \
+                ancestors[keep], bbox_inds[keep], is_self[keep]
+            # bboxes of the class itself go first, then the ones of its
+            # children by the order of child class
+            order = np.lexsort((bbox_inds, ~is_self, ancestors))
+            cls_bboxes = np.split(
+                bboxes[bbox_inds[order]],
+                np.cumsum(np.bincount(ancestors, minlength=num_classes))[:-1])
+            det_result = [
+                cls_bboxes[j] if cls_bboxes[j].shape[0] > 0 else det_result[j]
+                for j in range(num_classes)
+            ]
+            if self.filter_labels:
+                # unannotated classes related to the detected bboxes are
+                # cleared
+                related_labels, _ = self.expand_to_ancestors(
+                    np.nonzero(num_dets)[0])
+                for j in np.setdiff1d(related_labels, allowed_labeles):
+                    det_result[j] = np.empty((0, 5)).astype(np.float32)
+            processed_results.append(det_result)
+        return processed_results
 
     def load_image_label_from_csv(self, image_level_ann_file):
         """Load image level annotations from csv style ann_file.
@@ -680,6 +735,10 @@ class OpenImagesDataset(CustomDataset):
         if self.get_supercategory:
             annotations = self.add_supercategory_ann(annotations)
 
+        if is_compact_result(results[0]):
+            results = [
+                compact2result(result, len(self.CLASSES)) for result in results
+            ]
         results = self.process_results(results, annotations,
                                        image_level_annotations)
         if use_group_of:
@@ -21,6 +21,8 @@ class ATSSHead(AnchorHead):
     https://arxiv.org/abs/1912.02424
     """
 
+    batched_post_process = True
+
     def __init__(self,
                  num_classes,
                  in_channels,
@@ -6,11 +6,29 @@ from mmcv.cnn.utils.weight_init import constant_init
 from mmcv.ops import batched_nms
 from mmcv.runner import BaseModule, force_fp32
 
+from mmdet.core.bbox.coder import (DeltaXYWHBBoxCoder, DistancePointBBoxCoder,
+                                   TBLRBBoxCoder)
 from mmdet.core.utils import filter_scores_and_topk, select_single_mlvl
 
 
 class BaseDenseHead(BaseModule, metaclass=ABCMeta):
-    """Base class for DenseHeads."""
+    """Base class for DenseHeads.
+
+    The heads which set ``batched_post_process`` to True post-process all
+    the images of a batch at once in :meth:`get_bboxes`, instead of calling
+    :meth:`_get_bboxes_single` on each image. They should either keep the
+    ``_get_bboxes_single`` and ``_bbox_post_process`` of this class, or
+    reproduce their changes in :meth:`_decode_batched`. The flag is
+    inherited, so the subclasses which change the post-processing, e.g.
+    :class:`PAAHead`, set it back to False. It can be disabled by
+    ``batched_post_process=False`` in the test config.
+    """
+
+    batched_post_process = False
+    # the coders which decode without clipping, then clip to the image
+    # as ``_get_bboxes_single`` does
+    _batched_bbox_coders = (DeltaXYWHBBoxCoder, DistancePointBBoxCoder,
+                            TBLRBBoxCoder)
 
     def __init__(self, init_cfg=None):
         super(BaseDenseHead, self).__init__(init_cfg)
@@ -88,6 +106,13 @@ class BaseDenseHead(BaseModule, metaclass=ABCMeta):
             dtype=cls_scores[0].dtype,
             device=cls_scores[0].device)
 
+        if self._with_batched_post_process(cfg):
+            if not with_score_factors:
+                score_factors = [None for _ in range(num_levels)]
+            return self._get_bboxes_batched(cls_scores, bbox_preds,
+                                            score_factors, mlvl_priors,
+                                            img_metas, cfg, rescale, with_nms)
+
         result_list = []
 
         for img_id in range(len(img_metas)):
@@ -300,6 +325,197 @@ class BaseDenseHead(BaseModule, metaclass=ABCMeta):
         else:
             return mlvl_bboxes, mlvl_scores, mlvl_labels
 
+    def _with_batched_post_process(self, cfg):
+        """Whether to post-process the images of a batch at once."""
+        cfg = self.test_cfg if cfg is None else cfg
+        return self.batched_post_process \
+            and cfg.get('batched_post_process', True) \
+            and isinstance(getattr(self, 'bbox_coder', None),
+                           self._batched_bbox_coders)
+
+    def _decode_batched(self, priors, bbox_pred, level_idx):
+        """Decode the bboxes of the top-k priors of a level.
+
+        Args:
+            priors (Tensor): The priors, has shape (num_bboxes, 4) or
+                (num_bboxes, 2).
+            bbox_pred (Tensor): The box energies / deltas of the priors,
+                has shape (num_bboxes, C).
+            level_idx (int): The index of the level.
+
+        Returns:
+            Tensor: The decoded bboxes, which are clipped to the image
+                afterwards, has shape (num_bboxes, 4).
+        """
+        return self.bbox_coder.decode(priors, bbox_pred)
+
+    def _get_bboxes_batched(self,
+                            cls_scores,
+                            bbox_preds,
+                            score_factors,
+                            mlvl_priors,
+                            img_metas,
+                            cfg,
+                            rescale=False,
+                            with_nms=True):
+        """Transform outputs of a batch into bbox predictions at once.
+
+        It is equivalent to :meth:`_get_bboxes_single` on each image, but
+        the top-k candidates of each level are selected, decoded and
+        filtered for all the images together, while the NMS still runs
+        image by image, see :meth:`_batched_bboxes_nms`.
+
+        Args:
+            cls_scores (list[Tensor]): Box scores of each level, each has
+                shape (batch_size, num_priors * num_classes, H, W).
+            bbox_preds (list[Tensor]): Box energies / deltas of each level,
+                each has shape (batch_size, num_priors * C, H, W).
+            score_factors (list[Tensor | None]): Score factors of each level,
+                each has shape (batch_size, num_priors * 1, H, W), or None.
+            mlvl_priors (list[Tensor]): The priors of each level.
+            img_metas (list[dict]): Meta info of each image.
+            cfg (mmcv.Config): Test / postprocessing configuration,
+                if None, test_cfg would be used.
+            rescale (bool): If True, return boxes in original image space.
+                Default: False.
+            with_nms (bool): If True, do nms before return boxes.
+                Default: True.
+
+        Returns:
+            list[tuple[Tensor]]: The results of each image, in the format of
+                :meth:`_get_bboxes_single`.
+        """
+        cfg = self.test_cfg if cfg is None else cfg
+        num_imgs = len(img_metas)
+        nms_pre = cfg.get('nms_pre', -1)
+
+        mlvl_bboxes = []
+        mlvl_scores = []
+        mlvl_labels = []
+        mlvl_valid_masks = []
+        mlvl_score_factors = []
+        for level_idx, (cls_score, bbox_pred, score_factor, priors) in \
+                enumerate(zip(cls_scores, bbox_preds, score_factors,
+                              mlvl_priors)):
+            assert cls_score.size()[-2:] == bbox_pred.size()[-2:]
+            num_priors = priors.size(0)
+
+            cls_score = cls_score.permute(0, 2, 3,
+                                          1).reshape(num_imgs, num_priors, -1)
+            if self.use_sigmoid_cls:
+                scores = cls_score.sigmoid()
+            else:
+                scores = cls_score.softmax(-1)[..., :-1]
+            num_classes = scores.size(-1)
+
+            # the candidates above the threshold are the first of the top-k
+            scores = scores.reshape(num_imgs, -1)
+            num_topk = scores.size(1) if nms_pre <= 0 else min(
+                nms_pre, scores.size(1))
+            scores, topk_idxs = scores.topk(num_topk, dim=1)
+            keep_idxs = torch.div(
+                topk_idxs, num_classes, rounding_mode='floor')
+            mlvl_scores.append(scores)
+            mlvl_labels.append(topk_idxs % num_classes)
+            mlvl_valid_masks.append(scores > cfg.score_thr)
+
+            bbox_pred = bbox_pred.permute(0, 2, 3,
+                                          1).reshape(num_imgs, num_priors, -1)
+            bbox_pred = bbox_pred.gather(
+                1, keep_idxs[..., None].expand(-1, -1, bbox_pred.size(-1)))
+            bboxes = self._decode_batched(
+                priors[keep_idxs.reshape(-1)],
+                bbox_pred.reshape(-1, bbox_pred.size(-1)), level_idx)
+            mlvl_bboxes.append(bboxes.reshape(num_imgs, num_topk, 4))
+
+            if score_factor is not None:
+                score_factor = score_factor.permute(0, 2, 3, 1).reshape(
+                    num_imgs, num_priors).sigmoid()
+                mlvl_score_factors.append(score_factor.gather(1, keep_idxs))
+
+        bboxes = torch.cat(mlvl_bboxes, dim=1)
+        scores = torch.cat(mlvl_scores, dim=1)
+        labels = torch.cat(mlvl_labels, dim=1)
+        valid_mask = torch.cat(mlvl_valid_masks, dim=1)
+
+        if self.bbox_coder.clip_border:
+            max_xy = bboxes.new_tensor(
+                [img_meta['img_shape'][1::-1] * 2 for img_meta in img_metas])
+            bboxes = torch.min(bboxes.clamp(min=0), max_xy[:, None])
+        if rescale:
+            scale_factors = torch.stack([
+                bboxes.new_tensor(img_meta['scale_factor']).expand(4)
+                for img_meta in img_metas
+            ])
+            bboxes = bboxes / scale_factors[:, None]
+        if mlvl_score_factors:
+            scores = scores * torch.cat(mlvl_score_factors, dim=1)
+
+        return self._batched_bboxes_nms(
+            bboxes,
+            scores,
+            labels,
+            valid_mask,
+            cfg.nms,
+            max_per_img=cfg.max_per_img,
+            with_nms=with_nms)
+
+    def _batched_bboxes_nms(self,
+                            bboxes,
+                            scores,
+                            labels,
+                            valid_mask,
+                            nms_cfg,
+                            max_per_img=None,
+                            with_nms=True):
+        """Do the NMS of the candidates of a batch of images.
+
+        The candidates of the batch are selected at once, but the NMS runs
+        on each image as :meth:`_bbox_post_process` does. A single
+        :func:`batched_nms` with a group id for each image and class would
+        offset the bboxes by up to ``batch_size * num_classes`` times the
+        max coordinate, which changes their IoUs in float32.
+
+        Args:
+            bboxes (Tensor): The candidate bboxes, has shape
+                (batch_size, num_bboxes, 4).
+            scores (Tensor): Their scores, has shape (batch_size, num_bboxes).
+            labels (Tensor): Their labels, has shape (batch_size, num_bboxes).
+            valid_mask (Tensor): Whether each candidate is kept, has shape
+                (batch_size, num_bboxes).
+            nms_cfg (dict): The config of :func:`batched_nms`.
+            max_per_img (int, optional): Maximum number of detections of each
+                image. Default: None.
+            with_nms (bool): If True, do nms before return boxes.
+                Default: True.
+
+        Returns:
+            list[tuple[Tensor]]: The ``(det_bboxes, det_labels)`` of each
+                image, or ``(bboxes, scores, labels)`` of the kept candidates
+                if ``with_nms`` is False.
+        """
+        img_ids, inds = valid_mask.nonzero(as_tuple=True)
+        # the candidates are sorted by image
+        num_dets = valid_mask.sum(1).tolist()
+        bboxes_list = bboxes[img_ids, inds].split(num_dets)
+        scores_list = scores[img_ids, inds].split(num_dets)
+        labels_list = labels[img_ids, inds].split(num_dets)
+        if not with_nms:
+            return list(zip(bboxes_list, scores_list, labels_list))
+
+        result_list = []
+        for bboxes, scores, labels in zip(bboxes_list, scores_list,
+                                          labels_list):
+            if bboxes.numel() == 0:
+                det_bboxes = torch.cat([bboxes, scores[:, None]], -1)
+            else:
+                det_bboxes, keep_idxs = batched_nms(bboxes, scores, labels,
+                                                    nms_cfg)
+                labels = labels[keep_idxs]
+            result_list.append(
+                (det_bboxes[:max_per_img], labels[:max_per_img]))
+        return result_list
+
     def forward_train(self,
                       x,
                       img_metas,
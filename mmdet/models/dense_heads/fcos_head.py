@@ -57,6 +57,8 @@ class FCOSHead(AnchorFreeHead):
         >>> assert len(cls_score) == len(self.scales)
     """  # noqa: E501
 
+    batched_post_process = True
+
     def __init__(self,
                  num_classes,
                  in_channels,
@@ -85,6 +85,8 @@ class GFLHead(AnchorHead):
         >>> assert len(cls_quality_score) == len(self.scales)
     """
 
+    batched_post_process = True
+
     def __init__(self,
                  num_classes,
                  in_channels,
@@ -377,6 +379,14 @@ class GFLHead(AnchorHead):
         return dict(
             loss_cls=losses_cls, loss_bbox=losses_bbox, loss_dfl=losses_dfl)
 
+    def _decode_batched(self, priors, bbox_pred, level_idx):
+        """Decode the bboxes of the top-k anchors of a level, as
+        :meth:`_get_bboxes_single` does."""
+        stride = self.prior_generator.strides[level_idx]
+        assert stride[0] == stride[1]
+        bbox_pred = self.integral(bbox_pred) * stride[0]
+        return self.bbox_coder.decode(self.anchor_center(priors), bbox_pred)
+
     def _get_bboxes_single(self,
                            cls_score_list,
                            bbox_pred_list,
@@ -71,6 +71,10 @@ class PAAHead(ATSSHead):
             cases, 'diag' should be a good choice.
     """
 
+    # the scores are ranked by sqrt(score * iou) and voted, see
+    # `_get_bboxes_single` and `_bbox_post_process`
+    batched_post_process = False
+
     def __init__(self,
                  *args,
                  topk=9,
@@ -26,6 +26,8 @@ class RetinaHead(AnchorHead):
         >>> assert box_per_anchor == 4
     """
 
+    batched_post_process = True
+
     def __init__(self,
                  num_classes,
                  in_channels,
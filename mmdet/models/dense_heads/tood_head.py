@@ -110,6 +110,9 @@ class TOODHead(ATSSHead):
         >>> assert len(cls_score) == len(self.scales)
     """
 
+    # the bboxes are decoded in the forward, see `_get_bboxes_single`
+    batched_post_process = False
+
     def __init__(self,
                  num_classes,
                  in_channels,
@@ -7,7 +7,6 @@ import torch.nn as nn
 import torch.nn.functional as F
 from mmcv.cnn import (ConvModule, DepthwiseSeparableConvModule,
                       bias_init_with_prob)
-from mmcv.ops.nms import batched_nms
 from mmcv.runner import force_fp32
 
 from mmdet.core import (MlvlPointGenerator, bbox_xyxy_to_cxcywh,
@@ -287,16 +286,12 @@ class YOLOXHead(BaseDenseHead, BBoxTestMixin):
             flatten_bboxes[..., :4] /= flatten_bboxes.new_tensor(
                 scale_factors).unsqueeze(1)
 
-        result_list = []
-        for img_id in range(len(img_metas)):
-            cls_scores = flatten_cls_scores[img_id]
-            score_factor = flatten_objectness[img_id]
-            bboxes = flatten_bboxes[img_id]
-
-            result_list.append(
-                self._bboxes_nms(cls_scores, bboxes, score_factor, cfg))
-
-        return result_list
+        # the nms of all the images is done at once
+        max_scores, labels = torch.max(flatten_cls_scores, 2)
+        scores = max_scores * flatten_objectness
+        valid_mask = scores >= cfg.score_thr
+        return self._batched_bboxes_nms(flatten_bboxes, scores, labels,
+                                        valid_mask, cfg.nms)
 
     def _bbox_decode(self, priors, bbox_preds):
         xys = (bbox_preds[..., :2] * priors[:, 2:]) + priors[:, :2]
@@ -310,20 +305,6 @@ class YOLOXHead(BaseDenseHead, BBoxTestMixin):
         decoded_bboxes = torch.stack([tl_x, tl_y, br_x, br_y], -1)
         return decoded_bboxes
 
-    def _bboxes_nms(self, cls_scores, bboxes, score_factor, cfg):
-        max_scores, labels = torch.max(cls_scores, 1)
-        valid_mask = score_factor * max_scores >= cfg.score_thr
-
-        bboxes = bboxes[valid_mask]
-        scores = max_scores[valid_mask] * score_factor[valid_mask]
-        labels = labels[valid_mask]
-
-        if labels.numel() == 0:
-            return bboxes, labels
-        else:
-            dets, keep = batched_nms(bboxes, scores, labels, cfg.nms)
-            return dets, labels[keep]
-
     @force_fp32(apply_to=('cls_scores', 'bbox_preds', 'objectnesses'))
     def loss(self,
              cls_scores,
@@ -371,9 +371,14 @@ class BBoxHead(BaseModule):
         if cfg is None:
             return bboxes, scores
         else:
-            det_bboxes, det_labels = multiclass_nms(bboxes, scores,
-                                                    cfg.score_thr, cfg.nms,
-                                                    cfg.max_per_img)
+            det_bboxes, det_labels = multiclass_nms(
+                bboxes,
+                scores,
+                cfg.score_thr,
+                cfg.nms,
+                cfg.max_per_img,
+                nms_pre=cfg.get('nms_pre', -1),
+                nms_pre_per_class=cfg.get('nms_pre_per_class', -1))
 
             return det_bboxes, det_labels
 
@@ -519,7 +519,9 @@ class SABLHead(BaseModule):
                 cfg.score_thr,
                 cfg.nms,
                 cfg.max_per_img,
-                score_factors=confidences)
+                score_factors=confidences,
+                nms_pre=cfg.get('nms_pre', -1),
+                nms_pre_per_class=cfg.get('nms_pre_per_class', -1))
 
             return det_bboxes, det_labels
 
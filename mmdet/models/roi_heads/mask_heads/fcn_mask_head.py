@@ -305,8 +305,13 @@ class FCNMaskHead(BaseModule):
 
             im_mask[(inds, ) + spatial_inds] = masks_chunk
 
-        for i in range(N):
-            cls_segms[labels[i]].append(im_mask[i].detach().cpu().numpy())
+        # copy all the masks to cpu at once, they are transposed on the
+        # device first to be column-major on cpu, which is the layout
+        # ``encode_mask_results`` encodes without transposition
+        im_mask = im_mask.transpose(1, 2).contiguous().detach().cpu().numpy()
+        im_mask = im_mask.transpose(0, 2, 1)
+        for i, label in enumerate(labels.tolist()):
+            cls_segms[label].append(im_mask[i])
         return cls_segms
 
     def onnx_export(self, mask_pred, det_bboxes, det_labels, rcnn_test_cfg,
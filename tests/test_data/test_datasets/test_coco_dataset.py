@@ -1,11 +1,19 @@
 # Copyright (c) OpenMMLab. All rights reserved.
+import copy
 import os.path as osp
+import pickle
 import tempfile
 
 import mmcv
+import numpy as np
+import pycocotools.mask as mask_util
 import pytest
 
+from mmdet.core import result2compact
 from mmdet.datasets import CocoDataset
+from mmdet.datasets.api_wrappers import (ColumnarResultDumper, ColumnarResults,
+                                         ResultsWithColumns,
+                                         merge_columnar_results)
 
 
 def _create_ids_error_coco_json(json_name):
@@ -56,3 +64,99 @@ def test_coco_annotation_ids_unique():
     # test annotation ids not unique error
     with pytest.raises(AssertionError):
         CocoDataset(ann_file=fake_json_file, classes=('car', ), pipeline=[])
+
+
+def test_coco_results2columns():
+    tmp_dir = tempfile.TemporaryDirectory()
+    fake_json_file = osp.join(tmp_dir.name, 'fake_data.json')
+    _create_ids_error_coco_json(fake_json_file)
+    # make the annotation ids unique
+    fake_json = mmcv.load(fake_json_file)
+    fake_json['annotations'][1]['id'] = 2
+    mmcv.dump(fake_json, fake_json_file)
+    dataset = CocoDataset(
+        ann_file=fake_json_file, classes=('car', ), pipeline=[])
+
+    rng = np.random.RandomState(0)
+    results = []
+    for num_dets in [3, 0]:
+        bboxes = rng.rand(num_dets, 5).astype(np.float32) * 100
+        bboxes[:, 2:4] += bboxes[:, :2]
+        masks = rng.rand(num_dets, 20, 20) > 0.5
+        segms = [
+            mask_util.encode(np.asfortranarray(mask.astype(np.uint8)))
+            for mask in masks
+        ]
+        mask_scores = rng.rand(num_dets).astype(np.float32)
+        results.append(([bboxes], ([segms], [mask_scores])))
+    # two images share the same gt image
+    dataset.img_ids = dataset.img_ids * 2
+
+    prefix = osp.join(tmp_dir.name, 'results')
+    result_dirs = dataset.results2columns(results, prefix)
+    assert result_dirs == dict(
+        bbox=f'{prefix}.bbox',
+        proposal=f'{prefix}.bbox',
+        segm=f'{prefix}.segm')
+    result_arrays = dataset.results2arrays(results)
+    result_files = dataset.results2json(results, prefix)
+    for metric in ['bbox', 'segm']:
+        columnar_results = ColumnarResults(result_dirs[metric])
+        assert len(columnar_results) == 3
+        arrays = columnar_results.to_arrays()
+        for key in ['image_ids', 'category_ids', 'bboxes', 'scores']:
+            assert np.array_equal(arrays[key], result_arrays[metric][key])
+        json_file = osp.join(tmp_dir.name, f'{metric}.json')
+        columnar_results.dump_json(json_file)
+        assert mmcv.load(json_file) == mmcv.load(result_files[metric])
+
+    # compact results are dumped to the same json files
+    compact_prefix = osp.join(tmp_dir.name, 'compact')
+    compact_files = dataset.results2json(
+        [result2compact(result) for result in results], compact_prefix)
+    for metric in ['bbox', 'segm']:
+        assert mmcv.load(compact_files[metric]) == mmcv.load(
+            result_files[metric])
+    # the json files streamed from the columns are the same as the json
+    # results built in memory
+    bbox_json, segm_json = dataset._segm2json(copy.deepcopy(results))
+    assert mmcv.load(result_files['bbox']) == bbox_json
+    assert mmcv.load(result_files['segm']) == segm_json
+
+    # the columns written by image in two parts and merged, like the ones
+    # written by two ranks during testing
+    part_prefixes = []
+    for idx, result in enumerate(results):
+        part_prefixes.append(osp.join(tmp_dir.name, f'part_{idx}'))
+        dumper = ColumnarResultDumper(part_prefixes[-1])
+        dumper.write(dataset.results2arrays([result], [idx]))
+        assert dumper.close() == dict(
+            bbox=f'{part_prefixes[-1]}.bbox',
+            proposal=f'{part_prefixes[-1]}.bbox',
+            segm=f'{part_prefixes[-1]}.segm')
+    merged_prefix = osp.join(tmp_dir.name, 'merged')
+    merged_dirs = merge_columnar_results(
+        part_prefixes, merged_prefix, chunk_size=2)
+    assert merged_dirs == dict(
+        bbox=f'{merged_prefix}.bbox',
+        segm=f'{merged_prefix}.segm',
+        proposal=f'{merged_prefix}.bbox')
+    for metric in ['bbox', 'segm']:
+        arrays = ColumnarResults(merged_dirs[metric]).to_arrays()
+        for key in ['image_ids', 'category_ids', 'bboxes', 'scores']:
+            assert np.array_equal(arrays[key], result_arrays[metric][key])
+
+    # the results with columns are dumped from the columns
+    results_with_columns = ResultsWithColumns(results, merged_dirs)
+    assert len(results_with_columns) == 2
+    assert results_with_columns[1] is results[1]
+    # pickling gives a plain list
+    loaded = pickle.loads(pickle.dumps(results_with_columns))
+    assert isinstance(loaded, list) and len(loaded) == 2
+    assert np.array_equal(loaded[0][0][0], results[0][0][0])
+    merged_files = dataset.results2json(results_with_columns,
+                                        osp.join(tmp_dir.name, 'merged'))
+    for metric in ['bbox', 'segm']:
+        assert mmcv.load(merged_files[metric]) == mmcv.load(
+            result_files[metric])
+    tmp_dir.cleanup()
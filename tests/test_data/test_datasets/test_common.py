@@ -216,6 +216,44 @@ def test_dataset_evaluation():
     tmp_dir.cleanup()
 
 
+def test_dataset_eval_cache():
+    tmp_dir = tempfile.TemporaryDirectory()
+    fake_pkl_file = osp.join(tmp_dir.name, 'fake_data.pkl')
+    _create_dummy_custom_pkl(fake_pkl_file)
+    custom_dataset = CustomDataset(
+        ann_file=fake_pkl_file, classes=('car', ), pipeline=[])
+    fake_results = _create_dummy_results()
+    with patch.object(
+            CustomDataset,
+            'get_ann_info',
+            side_effect=CustomDataset.get_ann_info,
+            autospec=True) as get_ann_info:
+        # gts are converted only once for all rounds and metrics
+        assert custom_dataset.evaluate(fake_results)['mAP'] == 1
+        assert custom_dataset.evaluate(fake_results)['mAP'] == 1
+        custom_dataset.evaluate(fake_results, metric='recall')
+        assert get_ann_info.call_count == 1
+        # the cache is invalidated when the dataset changes
+        custom_dataset.data_infos = list(custom_dataset.data_infos)
+        assert custom_dataset.evaluate(fake_results)['mAP'] == 1
+        assert get_ann_info.call_count == 2
+
+    fake_json_file = osp.join(tmp_dir.name, 'fake_data.json')
+    _create_dummy_coco_json(fake_json_file)
+    coco_dataset = CocoDataset(
+        ann_file=fake_json_file, classes=('car', ), pipeline=[])
+    fake_proposals = [result[0] for result in fake_results]
+    for _ in range(2):
+        eval_results = coco_dataset.evaluate(fake_results)
+        assert eval_results['bbox_mAP'] == 1
+        eval_results = coco_dataset.evaluate(
+            fake_proposals, metric='proposal_fast')
+        assert eval_results['AR@100'] == 1
+    assert set(
+        coco_dataset._eval_cache) == {'cocoeval_gts', 'recall_gt_bboxes'}
+    tmp_dir.cleanup()
+
+
 @patch('mmdet.apis.single_gpu_test', MagicMock)
 @patch('mmdet.apis.multi_gpu_test', MagicMock)
 @pytest.mark.parametrize('EvalHookParam', (EvalHook, DistEvalHook))
@@ -0,0 +1,179 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import os.path as osp
+import tempfile
+
+import mmcv
+import numpy as np
+import pycocotools.mask as mask_util
+import pytest
+
+from mmdet.datasets import LVISV05Dataset
+from mmdet.datasets.api_wrappers import FastLVISEval, ResultsWithColumns
+
+
+def _create_lvis_json(json_name, rng):
+    num_imgs, num_cats = 6, 5
+    categories = [
+        dict(id=cat_id, name=f'cat{cat_id}', frequency='rcf'[cat_id % 3])
+        for cat_id in range(1, num_cats + 1)
+    ]
+    images, annotations = [], []
+    for img_id in range(1, num_imgs + 1):
+        pos_cat_ids = rng.choice(num_cats, 2, replace=False) + 1
+        neg_cat_ids = [
+            cat_id for cat_id in range(1, num_cats + 1)
+            if cat_id not in pos_cat_ids
+        ][:2]
+        images.append(
+            dict(
+                id=img_id,
+                file_name=f'{img_id}.jpg',
+                height=200,
+                width=200,
+                neg_category_ids=neg_cat_ids,
+                not_exhaustive_category_ids=pos_cat_ids[:1].tolist()))
+        for cat_id in pos_cat_ids:
+            for _ in range(rng.randint(1, 5)):
+                x, y = rng.randint(0, 100, 2)
+                w, h = rng.randint(5, 100, 2)
+                annotations.append(
+                    dict(
+                        id=len(annotations) + 1,
+                        image_id=img_id,
+                        category_id=int(cat_id),
+                        bbox=[x, y, w, h],
+                        area=int(w * h),
+                        segmentation=[[x, y, x + w, y, x + w, y + h, x,
+                                       y + h]]))
+    annotations[0]['ignore'] = 1
+    mmcv.dump(
+        dict(images=images, annotations=annotations, categories=categories),
+        json_name)
+    return annotations
+
+
+def _create_dets(annotations, rng, num_cats=5, num_imgs=6):
+    image_ids, category_ids, bboxes = [], [], []
+    # jittered gts and random detections of all categories
+    for ann in annotations:
+        for _ in range(2):
+            image_ids.append(ann['image_id'])
+            category_ids.append(ann['category_id'])
+            bboxes.append(np.array(ann['bbox']) + rng.randint(-8, 9, 4))
+    for _ in range(100):
+        image_ids.append(rng.randint(1, num_imgs + 1))
+        category_ids.append(rng.randint(1, num_cats + 1))
+        bboxes.append(
+            np.concatenate([rng.randint(0, 150, 2),
+                            rng.randint(1, 60, 2)]))
+    bboxes = np.maximum(np.array(bboxes, dtype=np.float64), 1)
+    # round scores to create ties
+    scores = np.round(rng.rand(len(image_ids)), 1)
+    segms = []
+    for x, y, w, h in bboxes.astype(np.int64):
+        mask = np.zeros((200, 200), dtype=np.uint8, order='F')
+        mask[y:y + h, x:x + w] = 1
+        segms.append(mask_util.encode(mask))
+    return dict(
+        image_ids=np.array(image_ids),
+        category_ids=np.array(category_ids),
+        bboxes=bboxes,
+        scores=scores,
+        segms=segms)
+
+
+@pytest.mark.parametrize('iou_type', ['bbox', 'segm'])
+@pytest.mark.parametrize('max_dets', [300, 4])
+def test_fast_lvis_eval(iou_type, max_dets, monkeypatch):
+    lvis = pytest.importorskip('lvis')
+    # lvis-api still uses the removed ``np.float``
+    monkeypatch.setattr(np, 'float', float, raising=False)
+
+    rng = np.random.RandomState(0)
+    tmp_dir = tempfile.TemporaryDirectory()
+    json_name = osp.join(tmp_dir.name, 'fake_lvis.json')
+    annotations = _create_lvis_json(json_name, rng)
+    dets = _create_dets(annotations, rng)
+    lvis_gt = lvis.LVIS(json_name)
+
+    json_results = []
+    for i in range(len(dets['scores'])):
+        data = dict(
+            image_id=int(dets['image_ids'][i]),
+            category_id=int(dets['category_ids'][i]),
+            bbox=dets['bboxes'][i].tolist(),
+            score=float(dets['scores'][i]))
+        if iou_type == 'segm':
+            segm = dets['segms'][i].copy()
+            segm['counts'] = segm['counts'].decode()
+            data['segmentation'] = segm
+        json_results.append(data)
+    lvis_dt = lvis.LVISResults(lvis_gt, json_results, max_dets=max_dets)
+    lvis_eval = lvis.LVISEval(lvis_gt, lvis_dt, iou_type)
+    lvis_eval.run()
+
+    fast_eval = FastLVISEval(lvis_gt, dets, iou_type, max_dets=max_dets)
+    fast_eval.run()
+    assert np.allclose(fast_eval.eval['precision'],
+                       lvis_eval.eval['precision'])
+    assert np.allclose(fast_eval.eval['recall'], lvis_eval.eval['recall'])
+    expected = lvis_eval.get_results()
+    results = fast_eval.get_results()
+    assert list(results.keys()) == list(expected.keys())
+    for key in expected:
+        assert np.isclose(results[key], expected[key])
+    tmp_dir.cleanup()
+
+
+def test_lvis_evaluate_fast_eval(monkeypatch):
+    pytest.importorskip('lvis')
+    monkeypatch.setattr(np, 'float', float, raising=False)
+
+    rng = np.random.RandomState(0)
+    tmp_dir = tempfile.TemporaryDirectory()
+    json_name = osp.join(tmp_dir.name, 'fake_lvis.json')
+    annotations = _create_lvis_json(json_name, rng)
+    dets = _create_dets(annotations, rng)
+    dataset = LVISV05Dataset(
+        ann_file=json_name,
+        classes=[f'cat{cat_id}' for cat_id in range(1, 6)],
+        pipeline=[])
+
+    results = []
+    for img_id in dataset.img_ids:
+        img_result = []
+        for cat_id in dataset.cat_ids:
+            inds = np.where((dets['image_ids'] == img_id)
+                            & (dets['category_ids'] == cat_id))[0]
+            bboxes = dets['bboxes'][inds].copy()
+            bboxes[:, 2:] += bboxes[:, :2]
+            scores = dets['scores'][inds, None]
+            img_result.append(np.hstack([bboxes, scores]).astype(np.float32))
+        results.append(img_result)
+
+    expected = dataset.evaluate(results, metric='bbox')
+    eval_results = dataset.evaluate(results, metric='bbox', use_fast_eval=True)
+    assert eval_results == expected
+
+    # the json files are still dumped if jsonfile_prefix is given
+    prefix = osp.join(tmp_dir.name, 'results')
+    eval_results = dataset.evaluate(
+        results, metric='bbox', jsonfile_prefix=prefix, use_fast_eval=True)
+    assert eval_results == expected
+    assert not osp.exists(f'{prefix}.bbox')
+    bbox_json = dataset._det2json(results)
+    assert mmcv.load(f'{prefix}.bbox.json') == bbox_json
+
+    # the columns written during testing are evaluated memory-mapped
+    result_dirs = dataset.results2columns(results,
+                                          osp.join(tmp_dir.name, 'columns'))
+    results_with_columns = ResultsWithColumns(results, result_dirs)
+    for use_fast_eval in [True, False]:
+        eval_results = dataset.evaluate(
+            results_with_columns,
+            metric='bbox',
+            jsonfile_prefix=prefix,
+            use_fast_eval=use_fast_eval)
+        assert eval_results == expected
+        assert mmcv.load(f'{prefix}.bbox.json') == bbox_json
+    tmp_dir.cleanup()
@@ -1,3 +1,4 @@
+import copy
 import csv
 import os.path as osp
 import tempfile
@@ -6,6 +7,7 @@ import mmcv
 import numpy as np
 import pytest
 
+from mmdet.apis.test import ResultSpillWriter, SpilledResults
 from mmdet.datasets import OpenImagesChallengeDataset, OpenImagesDataset
 
 
@@ -272,6 +274,14 @@ def test_openimages_dataset():
                              [1, 0, 0, 1]])
     assert np.equal(hierarchy, hierarchy_gt).all()
 
+    # test sparse ancestor index of the hierarchy
+    indptr, indices = dataset.get_ancestor_index(hierarchy)
+    assert indptr.tolist() == [0, 1, 3, 6, 8]
+    assert indices.tolist() == [0, 0, 1, 0, 1, 2, 0, 3]
+    labels, inds = dataset.expand_to_ancestors(np.array([2, 3, 0]))
+    assert labels.tolist() == [0, 1, 2, 0, 3, 0]
+    assert inds.tolist() == [0, 0, 0, 1, 1, 2]
+
     # test evaluation
     # create fake metas
     meta_file = osp.join(tmp_dir.name, 'meta.pkl')
@@ -317,6 +327,98 @@ def test_openimages_dataset():
     tmp_dir.cleanup()
 
 
+def _process_results_by_loop(dataset, det_results, annotations):
+    # the results are processed class by class as before the vectorization
+    # without the hierarchy, every class is only the ancestor of itself
+    class_label_tree = getattr(dataset, 'class_label_tree',
+                               np.eye(len(dataset.CLASSES)))
+    for i in range(len(det_results)):
+        results = copy.deepcopy(det_results[i])
+        valid_classes = np.where(
+            np.array([[bbox.shape[0]] for bbox in det_results[i]]) != 0)[0]
+        allowed_labeles = np.unique(annotations[i]['labels'])
+        for valid_class in valid_classes:
+            det_cls = np.where(class_label_tree[valid_class])[0]
+            for index in det_cls:
+                if index in allowed_labeles and index != valid_class and \
+                        dataset.get_supercategory:
+                    det_results[i][index] = np.concatenate(
+                        (det_results[i][index], results[valid_class]))
+                elif index not in allowed_labeles and dataset.filter_labels:
+                    det_results[i][index] = np.empty((0, 5)).astype(np.float32)
+    return det_results
+
+
+@pytest.mark.parametrize('get_supercategory', [True, False])
+@pytest.mark.parametrize('filter_labels', [True, False])
+def test_openimages_process_results(get_supercategory, filter_labels,
+                                    tmp_path):
+    tmp_dir = tempfile.TemporaryDirectory()
+    label_file = osp.join(tmp_dir.name, 'label_file.csv')
+    ann_file = osp.join(tmp_dir.name, 'ann_file.csv')
+    label_level_file = osp.join(tmp_dir.name, 'label_level_file.csv')
+    _create_oid_style_ann(label_file, ann_file, label_level_file)
+    hierarchy_json = osp.join(tmp_dir.name, 'hierarchy.json')
+    _create_hierarchy_json(hierarchy_json)
+    dataset = OpenImagesDataset(
+        ann_file=ann_file,
+        label_file=label_file,
+        image_level_ann_file=label_level_file,
+        hierarchy_file=hierarchy_json,
+        get_supercategory=get_supercategory,
+        filter_labels=filter_labels,
+        pipeline=[])
+    tmp_dir.cleanup()
+    if get_supercategory:
+        # a child class before its parent, i.e. 0 is a child of 3
+        dataset.class_label_tree = np.array([[1, 0, 0, 1], [1, 1, 0, 1],
+                                             [0, 0, 1, 0], [0, 0, 0, 1]])
+        dataset.ancestor_indptr, dataset.ancestor_indices = \
+            dataset.get_ancestor_index(dataset.class_label_tree)
+
+    rng = np.random.RandomState(0)
+    det_results = []
+    for _ in range(8):
+        det_result = []
+        for _ in range(len(dataset.CLASSES)):
+            bboxes = rng.rand(rng.randint(3), 5).astype(np.float32)
+            det_result.append(bboxes[np.argsort(-bboxes[:, 4])])
+        det_results.append(det_result)
+    # the own bboxes of a class go before those of its children
+    det_results[0] = [
+        np.array([[0, 0, 1, 1, 0.1]], dtype=np.float32),
+        np.zeros((0, 5), dtype=np.float32),
+        np.zeros((0, 5), dtype=np.float32),
+        np.array([[0, 0, 2, 2, 0.2]], dtype=np.float32)
+    ]
+    annotations = [
+        dict(labels=rng.choice(len(dataset.CLASSES), 2, replace=False))
+        for _ in range(len(det_results))
+    ]
+    annotations[0]['labels'] = np.array([0, 3])
+
+    expected_results = _process_results_by_loop(dataset,
+                                                copy.deepcopy(det_results),
+                                                annotations)
+    results = dataset.process_results(det_results, annotations, None)
+    for result, expected_result in zip(results, expected_results):
+        for bboxes, expected_bboxes in zip(result, expected_result):
+            assert np.array_equal(bboxes, expected_bboxes)
+    # the results are not modified
+    assert det_results[0][0].shape == (1, 5)
+
+    # the read-only results spilled during testing
+    writer = ResultSpillWriter(str(tmp_path / 'part_0.pkl'), chunk_size=3)
+    writer.extend(det_results)
+    writer.close()
+    spilled_results = SpilledResults(str(tmp_path), len(det_results), 1)
+    results = dataset.process_results(spilled_results, annotations, None)
+    for result, expected_result in zip(results, expected_results):
+        for bboxes, expected_bboxes in zip(result, expected_result):
+            assert np.array_equal(bboxes, expected_bboxes)
+    spilled_results.cleanup()
+
+
 def test_openimages_challenge_dataset():
     # create fake ann files
     tmp_dir = tempfile.TemporaryDirectory()
@@ -132,3 +132,43 @@ def test_voc_recall_overlaps():
     ious = recall_overlaps(bboxes1, bboxes2, 'iou', use_legacy_coordinate=True)
     assert ious.shape == (num_bbox, num_bbox)
     assert np.all(ious >= -1) and np.all(ious <= 1)
+
+
+def test_chunked_recall_overlaps():
+    from mmdet.core.evaluation.bbox_overlaps import (chunked_bbox_overlaps,
+                                                     max_bbox_overlaps)
+
+    rng = np.random.RandomState(0)
+    x1y1 = rng.rand(50, 2) * 100
+    bboxes1 = np.hstack([x1y1, x1y1 + rng.rand(50, 2) * 50 + 1])
+    x1y1 = rng.rand(30, 2) * 100
+    bboxes2 = np.hstack([x1y1, x1y1 + rng.rand(30, 2) * 50 + 1])
+    for mode in ['iou', 'iof']:
+        for use_legacy_coordinate in [False, True]:
+            ious = recall_overlaps(
+                bboxes1,
+                bboxes2,
+                mode,
+                use_legacy_coordinate=use_legacy_coordinate)
+            chunked_ious = chunked_bbox_overlaps(
+                bboxes1,
+                bboxes2,
+                mode,
+                use_legacy_coordinate=use_legacy_coordinate,
+                chunk_size=7)
+            assert chunked_ious.dtype == np.float32
+            assert np.array_equal(chunked_ious, ious)
+
+            ious_max, ious_argmax = max_bbox_overlaps(
+                bboxes1,
+                bboxes2,
+                mode,
+                use_legacy_coordinate=use_legacy_coordinate,
+                chunk_size=7)
+            assert np.array_equal(ious_max, ious.max(axis=1))
+            assert np.array_equal(ious_argmax, ious.argmax(axis=1))
+
+    ious = chunked_bbox_overlaps(bboxes1, bboxes2, dtype=np.float64)
+    assert ious.dtype == np.float64
+    assert np.allclose(ious, recall_overlaps(bboxes1, bboxes2), atol=1e-6)
+    assert chunked_bbox_overlaps(bboxes1, bboxes2[:0]).shape == (50, 0)
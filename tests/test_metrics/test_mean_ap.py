@@ -1,5 +1,6 @@
 import numpy as np
 
+from mmdet.core.bbox import result2compact
 from mmdet.core.evaluation.mean_ap import (eval_map, tpfp_default,
                                            tpfp_imagenet, tpfp_openimages)
 
@@ -107,6 +108,23 @@ def test_eval_map():
         det_results, annotations, use_legacy_coordinate=False)
     assert 0.291 < mean_ap < 0.293
 
+    # compact results take the number of classes from the dataset
+    scored_bboxes = np.concatenate(
+        [det_bboxes, np.array([[0.9], [0.8], [0.7]])], axis=1)
+    det_results = [[scored_bboxes, scored_bboxes]]
+    mean_ap, eval_results = eval_map(
+        det_results, annotations, use_legacy_coordinate=False)
+    compact_results = [result2compact(result) for result in det_results]
+    compact_mean_ap, compact_eval_results = eval_map(
+        compact_results,
+        annotations,
+        dataset=['a', 'b'],
+        use_legacy_coordinate=False)
+    assert compact_mean_ap == mean_ap
+    for compact_eval_result, eval_result in zip(compact_eval_results,
+                                                eval_results):
+        assert compact_eval_result['ap'] == eval_result['ap']
+
 
 def test_tpfp_openimages():
 
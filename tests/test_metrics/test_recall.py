@@ -44,3 +44,31 @@ def test_eval_recalls():
         use_legacy_coordinate=True)
     assert recall.shape == (1, 2)
     assert recall[0][1] <= recall[0][0]
+
+
+def test_eval_recalls_batched_matching():
+    from mmdet.core.evaluation.bbox_overlaps import bbox_overlaps
+    from mmdet.core.evaluation.recall import _recalls
+
+    rng = np.random.RandomState(0)
+    gts, proposals = [], []
+    for _ in range(10):
+        xy = rng.rand(rng.randint(1, 8), 2) * 50
+        gts.append(np.hstack([xy, xy + rng.rand(xy.shape[0], 2) * 30 + 1]))
+        xy = rng.rand(40, 2) * 50
+        # round the proposals to create tied IoUs
+        bboxes = np.round(np.hstack([xy, xy + rng.rand(40, 2) * 30 + 1]))
+        proposals.append(np.hstack([bboxes, rng.rand(40, 1)]))
+    proposal_nums = np.array([5, 10, 40])
+    iou_thrs = np.array([0.1, 0.5, 0.7])
+
+    all_ious = np.empty(len(gts), dtype=object)
+    for i, (gt, proposal) in enumerate(zip(gts, proposals)):
+        proposal = proposal[np.argsort(proposal[:, 4])[::-1]]
+        all_ious[i] = bbox_overlaps(gt, proposal[:, :4])
+    expected = _recalls(all_ious, proposal_nums, iou_thrs)
+
+    recall = eval_recalls(gts, proposals, proposal_nums, iou_thrs)
+    assert np.allclose(recall, expected)
+    recall = eval_recalls(gts, proposals, proposal_nums, iou_thrs, nproc=4)
+    assert np.allclose(recall, expected)
@@ -0,0 +1,287 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import mmcv
+import pytest
+import torch
+from mmcv.ops import batched_nms
+
+from mmdet.models.builder import build_head
+
+HEAD_CFGS = [
+    dict(type='RetinaHead', stacked_convs=1, feat_channels=4),
+    dict(
+        type='RetinaHead',
+        stacked_convs=1,
+        feat_channels=4,
+        loss_cls=dict(
+            type='CrossEntropyLoss', use_sigmoid=False, loss_weight=1.0)),
+    dict(type='FCOSHead', stacked_convs=1, feat_channels=32),
+    dict(
+        type='ATSSHead',
+        stacked_convs=1,
+        feat_channels=32,
+        anchor_generator=dict(
+            type='AnchorGenerator',
+            ratios=[1.0],
+            octave_base_scale=8,
+            scales_per_octave=1,
+            strides=[8, 16, 32, 64, 128])),
+    dict(
+        type='GFLHead',
+        stacked_convs=1,
+        feat_channels=32,
+        anchor_generator=dict(
+            type='AnchorGenerator',
+            ratios=[1.0],
+            octave_base_scale=8,
+            scales_per_octave=1,
+            strides=[8, 16, 32, 64, 128]),
+        loss_cls=dict(
+            type='QualityFocalLoss',
+            use_sigmoid=True,
+            beta=2.0,
+            loss_weight=1.0)),
+    dict(
+        type='FSAFHead',
+        stacked_convs=1,
+        feat_channels=4,
+        reg_decoded_bbox=True,
+        anchor_generator=dict(
+            type='AnchorGenerator',
+            octave_base_scale=1,
+            scales_per_octave=1,
+            ratios=[1.0],
+            strides=[8, 16, 32, 64, 128]),
+        bbox_coder=dict(type='TBLRBBoxCoder', normalizer=4.0))
+]
+
+
+def _get_img_metas(s):
+    # the images of a batch have different shapes and scale factors
+    return [{
+        'img_shape': (s, s - 40, 3),
+        'scale_factor': [2., 1.5, 2., 1.5],
+        'pad_shape': (s, s, 3)
+    }, {
+        'img_shape': (s - 64, s, 3),
+        'scale_factor': [0.5, 0.5, 0.5, 0.5],
+        'pad_shape': (s, s, 3)
+    }, {
+        'img_shape': (s, s, 3),
+        'scale_factor': [1., 1., 1., 1.],
+        'pad_shape': (s, s, 3)
+    }]
+
+
+def _distinct_scores_like(cls_scores):
+    # random scores without ties, which may be ordered in any way
+    sizes = [cls_score.numel() for cls_score in cls_scores]
+    scores = torch.randperm(sum(sizes)).float() / sum(sizes) * 8 - 4
+    return [
+        level_scores.view_as(cls_score)
+        for level_scores, cls_score in zip(scores.split(sizes), cls_scores)
+    ]
+
+
+def _sort_candidates(bboxes, scores, labels):
+    # the ties of the scores, e.g. of softmax, are sorted by the bboxes
+    inds = bboxes.sum(dim=1).argsort()
+    inds = inds[scores[inds].sort(descending=True, stable=True)[1]]
+    return bboxes[inds], scores[inds], labels[inds]
+
+
+@pytest.mark.parametrize('head_cfg', HEAD_CFGS)
+def test_batched_get_bboxes(head_cfg):
+    """Tests the batched post-processing of the dense heads is equivalent to
+    the post-processing of each image."""
+    s = 256
+    img_metas = _get_img_metas(s)
+    test_cfg = mmcv.Config(
+        dict(
+            nms_pre=200,
+            min_bbox_size=0,
+            score_thr=0.3,
+            nms=dict(type='nms', iou_threshold=0.6),
+            max_per_img=50))
+    self = build_head(
+        dict(head_cfg, num_classes=4, in_channels=1, test_cfg=test_cfg))
+    assert self.batched_post_process
+    feat = [
+        torch.rand(len(img_metas), 1, s // stride[1], s // stride[0])
+        for stride in self.prior_generator.strides
+    ]
+    outs = list(self.forward(feat))
+    # random scores, so that many candidates are above the threshold
+    outs[0] = _distinct_scores_like(outs[0])
+
+    assert self._with_batched_post_process(test_cfg)
+    results = self.get_bboxes(*outs, img_metas=img_metas, rescale=True)
+    raw_results = self.get_bboxes(
+        *outs, img_metas=img_metas, rescale=True, with_nms=False)
+
+    test_cfg.batched_post_process = False
+    assert not self._with_batched_post_process(test_cfg)
+    expected_results = self.get_bboxes(
+        *outs, img_metas=img_metas, rescale=True)
+    expected_raw_results = self.get_bboxes(
+        *outs, img_metas=img_metas, rescale=True, with_nms=False)
+
+    assert len(results) == len(expected_results) == len(img_metas)
+    for result, expected_result in zip(results, expected_results):
+        det_bboxes, det_labels = result
+        expected_bboxes, expected_labels = expected_result
+        assert len(det_bboxes) > 0
+        assert torch.allclose(det_bboxes, expected_bboxes, atol=1e-4)
+        assert torch.equal(det_labels, expected_labels)
+    # the candidates are in the order of the top-k of each level
+    for raw_result, expected_raw_result in zip(raw_results,
+                                               expected_raw_results):
+        bboxes, scores, labels = _sort_candidates(*raw_result)
+        expected_bboxes, expected_scores, expected_labels = _sort_candidates(
+            *expected_raw_result)
+        assert torch.allclose(bboxes, expected_bboxes, atol=1e-4)
+        assert torch.allclose(scores, expected_scores)
+        assert torch.equal(labels, expected_labels)
+
+
+def test_paa_get_bboxes():
+    """Tests PAA head keeps its own post-processing of each image, which
+    ranks the candidates by sqrt(score * iou) and votes the scores."""
+    s = 256
+    img_metas = _get_img_metas(s)
+    test_cfg = mmcv.Config(
+        dict(
+            nms_pre=200,
+            min_bbox_size=0,
+            score_thr=0.3,
+            nms=dict(type='nms', iou_threshold=0.6),
+            max_per_img=50))
+    self = build_head(
+        dict(
+            type='PAAHead',
+            num_classes=4,
+            in_channels=1,
+            stacked_convs=1,
+            feat_channels=32,
+            reg_decoded_bbox=True,
+            score_voting=True,
+            anchor_generator=dict(
+                type='AnchorGenerator',
+                ratios=[1.0],
+                octave_base_scale=8,
+                scales_per_octave=1,
+                strides=[8, 16, 32, 64, 128]),
+            test_cfg=test_cfg))
+    assert not self._with_batched_post_process(test_cfg)
+    feat = [
+        torch.rand(len(img_metas), 1, s // stride[1], s // stride[0])
+        for stride in self.prior_generator.strides
+    ]
+    cls_scores, bbox_preds, iou_preds = self.forward(feat)
+    cls_scores = _distinct_scores_like(cls_scores)
+    results = self.get_bboxes(
+        cls_scores, bbox_preds, iou_preds, img_metas=img_metas, rescale=True)
+
+    featmap_sizes = [cls_score.shape[-2:] for cls_score in cls_scores]
+    mlvl_priors = self.prior_generator.grid_priors(featmap_sizes, device='cpu')
+    for img_id, (det_bboxes, det_labels) in enumerate(results):
+        expected_bboxes, expected_labels = self._get_bboxes_single(
+            [cls_score[img_id] for cls_score in cls_scores],
+            [bbox_pred[img_id] for bbox_pred in bbox_preds],
+            [iou_pred[img_id] for iou_pred in iou_preds],
+            mlvl_priors,
+            img_metas[img_id],
+            test_cfg,
+            rescale=True)
+        assert len(det_bboxes) > 0
+        # the voting of the random candidates may be nan
+        assert torch.allclose(det_bboxes, expected_bboxes, equal_nan=True)
+        assert torch.equal(det_labels, expected_labels)
+
+
+def test_batched_get_bboxes_empty():
+    """Tests the batched post-processing when no candidate is left."""
+    s = 256
+    img_metas = _get_img_metas(s)
+    test_cfg = mmcv.Config(
+        dict(
+            nms_pre=200,
+            min_bbox_size=0,
+            score_thr=1.,
+            nms=dict(type='nms', iou_threshold=0.6),
+            max_per_img=50))
+    self = build_head(
+        dict(HEAD_CFGS[0], num_classes=4, in_channels=1, test_cfg=test_cfg))
+    feat = [
+        torch.rand(len(img_metas), 1, s // stride[1], s // stride[0])
+        for stride in self.prior_generator.strides
+    ]
+    results = self.get_bboxes(*self.forward(feat), img_metas=img_metas)
+    for det_bboxes, det_labels in results:
+        assert det_bboxes.shape == (0, 5)
+        assert det_labels.shape == (0, )
+
+
+def test_batched_bboxes_nms():
+    """Tests the NMS of a batch of images with many classes is that of each
+    image, for the small bboxes whose IoUs are close to the threshold."""
+    num_imgs, num_classes, num_bboxes = 8, 80, 2000
+    self = build_head(
+        dict(HEAD_CFGS[0], num_classes=num_classes, in_channels=1))
+    rng = torch.Generator().manual_seed(0)
+    xy = torch.rand(num_imgs, num_bboxes, 2, generator=rng) * 1300
+    wh = torch.rand(num_imgs, num_bboxes, 2, generator=rng) * 8 + 2
+    bboxes = torch.cat([xy, xy + wh], -1)
+    # the neighbours overlap by about the IoU threshold
+    bboxes[:, 1::2] = bboxes[:, ::2] + wh[:, ::2].repeat(1, 1, 2) * 0.25
+    scores = torch.rand(num_imgs, num_bboxes, generator=rng)
+    labels = torch.randint(num_classes, (num_imgs, num_bboxes), generator=rng)
+    labels[:, 1::2] = labels[:, ::2]
+    valid_mask = scores > 0.1
+    nms_cfg = dict(type='nms', iou_threshold=0.4)
+
+    results = self._batched_bboxes_nms(bboxes, scores, labels, valid_mask,
+                                       nms_cfg, 100)
+    for img_id, (det_bboxes, det_labels) in enumerate(results):
+        mask = valid_mask[img_id]
+        expected_bboxes, keep = batched_nms(bboxes[img_id][mask],
+                                            scores[img_id][mask],
+                                            labels[img_id][mask], nms_cfg)
+        assert torch.equal(det_bboxes, expected_bboxes[:100])
+        assert torch.equal(det_labels, labels[img_id][mask][keep][:100])
+
+
+def test_yolox_batched_get_bboxes():
+    """Tests the NMS of a batch of images in YOLOX head is equivalent to the
+    NMS of each image."""
+    s = 256
+    img_metas = _get_img_metas(s)
+    test_cfg = mmcv.Config(
+        dict(score_thr=0.1, nms=dict(type='nms', iou_threshold=0.65)))
+    self = build_head(
+        dict(
+            type='YOLOXHead',
+            num_classes=4,
+            in_channels=1,
+            feat_channels=4,
+            stacked_convs=1,
+            test_cfg=test_cfg))
+    feat = [
+        torch.rand(len(img_metas), 1, s // stride[1], s // stride[0])
+        for stride in self.prior_generator.strides
+    ]
+    cls_scores, bbox_preds, objectnesses = self.forward(feat)
+    cls_scores = _distinct_scores_like(cls_scores)
+    objectnesses = [
+        torch.randn_like(objectness) for objectness in objectnesses
+    ]
+    results = self.get_bboxes(
+        cls_scores, bbox_preds, objectnesses, img_metas=img_metas)
+    for img_id, (det_bboxes, det_labels) in enumerate(results):
+        (expected_bboxes, expected_labels), = self.get_bboxes(
+            [cls_score[img_id:img_id + 1] for cls_score in cls_scores],
+            [bbox_pred[img_id:img_id + 1] for bbox_pred in bbox_preds],
+            [objectness[img_id:img_id + 1] for objectness in objectnesses],
+            img_metas=img_metas[img_id:img_id + 1])
+        assert len(det_bboxes) > 0
+        assert torch.allclose(det_bboxes, expected_bboxes, atol=1e-4)
+        assert torch.equal(det_labels, expected_labels)
@@ -1,6 +1,8 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 """pytest tests/test_forward.py."""
 import copy
+import multiprocessing
+import os
 from os.path import dirname, exists, join
 
 import numpy as np
@@ -618,7 +620,8 @@ def test_detr_forward():
 def test_inference_detector():
     from mmcv import ConfigDict
 
-    from mmdet.apis import inference_detector
+    from mmdet.apis import (EnsembleInference, Predictor, ResultCache,
+                            inference_detector)
     from mmdet.models import build_detector
 
     # small RetinaNet
@@ -672,6 +675,179 @@ def test_inference_detector():
     result = inference_detector(model, [img1, img2])
     assert len(result) == 2 and len(result[0]) == num_class
 
+    # test Predictor gives the same results
+    for num_workers in (0, 2):
+        predictor = Predictor(model, num_workers=num_workers)
+        pred_result = predictor.predict(img1)
+        assert len(pred_result) == num_class
+        pred_result = predictor.predict([img1, img2])
+        assert len(pred_result) == 2
+        for res, pred_res in zip(result, pred_result):
+            for cls_res, cls_pred_res in zip(res, pred_res):
+                assert np.allclose(cls_res, cls_pred_res)
+        predictor.close()
+
+    # an ensemble of the same detector gives its results
+    model.CLASSES = ('a', 'b', 'c')
+    ensemble = EnsembleInference([model, copy.deepcopy(model)],
+                                 concurrent=True)
+    ensemble_result = ensemble.predict([img1, img2])
+    for res, ensemble_res in zip(result, ensemble_result):
+        for cls_res, cls_ensemble_res in zip(res, ensemble_res):
+            assert np.allclose(cls_res, cls_ensemble_res, atol=1e-4)
+    stats = ensemble.stats()
+    assert stats['num_batches'] == 1 and stats['num_pipelines'] == 1
+    assert len(stats['model_latencies']) == 2
+    ensemble_result = EnsembleInference([model, model],
+                                        merge='nms',
+                                        max_per_img=5).predict(img1)
+    assert len(ensemble_result) == num_class
+    assert sum(len(bboxes) for bboxes in ensemble_result) <= 5
+    # the scores of the most weighted detector are kept
+    ensemble_result = EnsembleInference([model, model],
+                                        weights=[2, 1],
+                                        merge='nms').predict(img1)
+    for cls_res, cls_ensemble_res in zip(result[0], ensemble_result):
+        assert np.allclose(cls_res, cls_ensemble_res, atol=1e-4)
+    ensemble.close()
+
+    # the repeated images are forwarded once with a cache
+    cache = ResultCache(max_size=2)
+    predictor = Predictor(model, cache=cache)
+    pred_result = predictor.predict([img1, img2, img1])
+    assert pred_result[0] is pred_result[2]
+    for res, pred_res in zip(result, pred_result):
+        for cls_res, cls_pred_res in zip(res, pred_res):
+            assert np.allclose(cls_res, cls_pred_res)
+    assert predictor.predict(img1.copy()) is pred_result[0]
+    stats = cache.stats()
+    assert stats['num_hits'] == 1 and stats['num_misses'] == 3
+    assert stats['size'] == 2
+
+    # another model does not get the cached results, even if the shared
+    # cache is empty when the predictors are built
+    other_model = copy.deepcopy(model)
+    other_model.bbox_head.retina_cls.bias.data += 1
+    cache = ResultCache(max_size=1)
+    predictor = Predictor(model, cache=cache)
+    other_predictor = Predictor(other_model, cache=cache)
+    assert predictor.fingerprint != other_predictor.fingerprint
+    pred_result = predictor.predict(img1)
+    other_result = other_predictor.predict(img1)
+    assert other_result is not pred_result
+    stats = cache.stats()
+    assert stats['num_hits'] == 0 and stats['num_misses'] == 2
+    assert stats['num_evicted'] == 1
+
+
+def test_optimize_for_cpu():
+    from mmcv.ops import RoIAlign
+
+    from mmdet.apis import Predictor, init_detector, optimize_for_cpu
+
+    config = _get_config_module('faster_rcnn/faster_rcnn_r50_fpn_1x_coco.py')
+    config.model = _replace_r50_with_r18(config.model)
+    config.model.backbone.init_cfg = None
+    config.model.roi_head.bbox_roi_extractor.roi_layer = dict(
+        type='RoIPool', output_size=7)
+    with pytest.raises(AssertionError):
+        init_detector(
+            copy.deepcopy(config), device='cuda:0', cpu_optimize=True)
+
+    # RoIPool is replaced as it has no CPU kernel
+    with pytest.warns(UserWarning):
+        model = init_detector(config, device='cpu', cpu_optimize=True)
+    roi_layer = model.roi_head.bbox_roi_extractor.roi_layers[0]
+    assert isinstance(roi_layer, RoIAlign) and roi_layer.pool_mode == 'max'
+    assert model.use_inference_mode and model.use_channels_last
+    assert not any(
+        isinstance(m, torch.nn.BatchNorm2d) for m in model.modules())
+
+    # the optimized features are the same
+    model = init_detector(config, device='cpu')
+    img = torch.rand(2, 3, 64, 96)
+    with torch.no_grad():
+        feats = model.extract_feat(img)
+    optimized = optimize_for_cpu(
+        copy.deepcopy(model), num_threads=2, trace_shape=(1, 3, 64, 64))
+    assert isinstance(optimized.backbone, torch.jit.ScriptModule)
+    assert isinstance(optimized.neck, torch.jit.ScriptModule)
+    with torch.no_grad():
+        optimized_feats = optimized.extract_feat(img)
+    for feat, optimized_feat in zip(feats, optimized_feats):
+        assert torch.allclose(feat, optimized_feat, atol=1e-5)
+
+    rng = np.random.RandomState(0)
+    img = rng.rand(100, 100, 3)
+    result = Predictor(optimized).predict(img)
+    assert len(result) == config.model.roi_head.bbox_head.num_classes
+
+
+def test_cpu_inference_pool(tmp_path):
+    from mmdet.apis import CPUInferencePool, Predictor, init_detector
+
+    config = _get_config_module('retinanet/retinanet_r50_fpn_1x_coco.py')
+    config.model = _replace_r50_with_r18(config.model)
+    config.model.backbone.init_cfg = None
+    # the replicas load the same weights
+    checkpoint = str(tmp_path / 'model.pth')
+    model = init_detector(copy.deepcopy(config), device='cpu')
+    torch.save(dict(state_dict=model.state_dict()), checkpoint)
+    model = init_detector(copy.deepcopy(config), checkpoint, device='cpu')
+    rng = np.random.RandomState(0)
+    imgs = [(rng.rand(64, 64, 3) * 255).astype(np.uint8) for _ in range(4)]
+    expected = Predictor(model).predict(imgs)
+
+    for dispatch, max_batch_size in [('least_loaded', 1), ('round_robin', 2)]:
+        with CPUInferencePool(
+                config,
+                checkpoint,
+                num_replicas=2,
+                threads_per_replica=1,
+                dispatch=dispatch,
+                max_batch_size=max_batch_size) as pool:
+            results = pool.predict(imgs)
+            assert len(results) == 4
+            for result, expected_result in zip(results, expected):
+                for bboxes, expected_bboxes in zip(result, expected_result):
+                    assert np.allclose(bboxes, expected_bboxes, atol=1e-4)
+            result = pool.predict(imgs[0])
+            assert len(result) == config.model.bbox_head.num_classes
+            # the errors of the replicas are raised
+            with pytest.raises(FileNotFoundError):
+                pool.predict(str(tmp_path / 'not_exist.jpg'))
+
+    # the requests are dispatched to the alive replicas only
+    for dispatch in ['least_loaded', 'round_robin']:
+        with CPUInferencePool(
+                config,
+                checkpoint,
+                num_replicas=2,
+                threads_per_replica=1,
+                dispatch=dispatch) as pool:
+            pool._workers[0].kill()
+            pool._workers[0].join()
+            results = pool.predict(imgs)
+            assert len(results) == 4
+            pool._workers[1].kill()
+            pool._workers[1].join()
+            with pytest.raises(RuntimeError):
+                pool.predict(imgs[0])
+
+    with pytest.raises(AssertionError):
+        CPUInferencePool(config, dispatch='random')
+
+    # a replica killed before it is ready does not block the startup
+    pool = CPUInferencePool.__new__(CPUInferencePool)
+    ctx = multiprocessing.get_context('spawn')
+    pool.num_replicas = 1
+    pool._result_queue = ctx.Queue()
+    pool._request_queues = [ctx.Queue()]
+    pool._workers = [ctx.Process(target=os._exit, args=(1, ))]
+    pool._workers[0].start()
+    with pytest.raises(RuntimeError):
+        pool._wait_ready()
+
 
 def test_yolox_random_size():
     from mmdet.models import build_detector
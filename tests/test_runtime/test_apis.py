@@ -1,9 +1,22 @@
 import os
+import pickle
+import time
 from pathlib import Path
 
+import mmcv
+import numpy as np
+import pycocotools.mask as mask_util
 import pytest
+import torch
+import torch.distributed as dist
 
-from mmdet.apis import init_detector
+from mmdet.apis import (ResultCache, SlicedInference, VideoInference,
+                        init_detector, multi_gpu_test, single_gpu_test)
+from mmdet.apis.cache import hash_image
+from mmdet.apis.sliced import get_slices, weighted_merge
+from mmdet.apis.test import (ResultSpillWriter, SpilledResults,
+                             collect_results_gloo)
+from mmdet.datasets.api_wrappers import ColumnarResults, ResultsWithColumns
 
 
 def test_init_detector():
@@ -30,3 +43,343 @@ def test_init_detector():
     with pytest.raises(TypeError):
         config_list = [config_file]
         model = init_detector(config_list)  # noqa: F841
+
+
+def test_spilled_results(tmp_path):
+    # 10 samples are padded to 12 and split to 3 ranks in an interleaved way
+    size, world_size = 10, 3
+    for rank in range(world_size):
+        writer = ResultSpillWriter(
+            str(tmp_path / f'part_{rank}.pkl'), chunk_size=3)
+        inds = list(range(rank, 12, world_size))
+        for i in range(0, len(inds), 2):
+            writer.extend([dict(idx=idx % size) for idx in inds[i:i + 2]])
+        writer.close()
+        assert writer.offsets[0] == 0 and len(writer.offsets) == 2
+
+    results = SpilledResults(str(tmp_path), size, world_size)
+    assert len(results) == size
+    assert [res['idx'] for res in results] == list(range(size))
+    assert results[-1]['idx'] == size - 1
+    assert [res['idx'] for res in results[2:7:2]] == [2, 4, 6]
+    with pytest.raises(IndexError):
+        results[size]
+    # pickling gives a plain list
+    loaded = pickle.loads(pickle.dumps(results))
+    assert isinstance(loaded, list) and loaded == list(results)
+
+    results.cleanup()
+    assert not tmp_path.exists()
+
+
+def _collect_results_worker(rank, world_size, init_file, out_file):
+    dist.init_process_group(
+        'gloo',
+        init_method=f'file://{init_file}',
+        rank=rank,
+        world_size=world_size)
+    # 7 samples are padded to 9 and split to 3 ranks in an interleaved way
+    result_part = [
+        dict(idx=idx % 7, bboxes=np.full((idx + 1, 5), idx))
+        for idx in range(rank, 9, world_size)
+    ]
+    results = collect_results_gloo(result_part, 7, chunk_size=64)
+    if rank == 0:
+        mmcv.dump(results, out_file)
+    else:
+        assert results is None
+    dist.destroy_process_group()
+
+
+@pytest.mark.skipif(
+    not dist.is_available() or not dist.is_gloo_available(),
+    reason='requires gloo backend')
+def test_collect_results_gloo(tmp_path):
+    out_file = str(tmp_path / 'results.pkl')
+    torch.multiprocessing.spawn(
+        _collect_results_worker,
+        args=(3, str(tmp_path / 'init'), out_file),
+        nprocs=3)
+    results = mmcv.load(out_file)
+    assert [res['idx'] for res in results] == list(range(7))
+    for res in results:
+        assert res['bboxes'].shape == (res['idx'] + 1, 5)
+        assert (res['bboxes'] == res['idx']).all()
+
+
+class _ToyMaskModel(torch.nn.Module):
+
+    def forward(self, return_loss, rescale, img, img_metas):
+        return [([np.zeros((1, 5))], [[mask]]) for mask in img]
+
+
+class _ToyDataLoader(list):
+
+    def __init__(self, data, dataset):
+        super().__init__(data)
+        self.dataset = dataset
+
+
+def test_single_gpu_test_post_workers():
+    masks = np.random.rand(20, 8, 8) > 0.5
+    data_loader = _ToyDataLoader(
+        [dict(img=masks[i:i + 2], img_metas=None) for i in range(0, 20, 2)],
+        dataset=masks)
+    model = _ToyMaskModel()
+    for post_workers in [0, 1, 3]:
+        results = single_gpu_test(
+            model, data_loader, post_workers=post_workers)
+        # results are encoded and kept in order
+        assert len(results) == 20
+        for mask, (_, segms) in zip(masks, results):
+            assert (mask_util.decode(segms[0][0]) == mask).all()
+    with pytest.raises(AssertionError):
+        single_gpu_test(model, data_loader, show=True, post_workers=1)
+
+
+class _ToyColumnarDataset(list):
+
+    def results2arrays(self, results, img_inds):
+        # a detection of each image with its index as the image id
+        assert len(results) == len(img_inds)
+        img_inds = np.array(img_inds, dtype=np.int64)
+        arrays = dict(
+            image_ids=img_inds,
+            category_ids=np.ones_like(img_inds),
+            bboxes=np.zeros((len(img_inds), 4)),
+            scores=np.ones(len(img_inds)))
+        return dict(bbox=arrays, proposal=arrays)
+
+
+def test_single_gpu_test_columnar_prefix(tmp_path):
+    masks = np.random.rand(6, 8, 8) > 0.5
+    data_loader = _ToyDataLoader(
+        [dict(img=masks[i:i + 2], img_metas=None) for i in range(0, 6, 2)],
+        dataset=_ToyColumnarDataset(masks))
+    prefix = str(tmp_path / 'results')
+    results = single_gpu_test(
+        _ToyMaskModel(), data_loader, post_workers=1, columnar_prefix=prefix)
+    assert isinstance(results, ResultsWithColumns) and len(results) == 6
+    assert results.result_dirs == dict(
+        bbox=f'{prefix}.bbox', proposal=f'{prefix}.bbox')
+    columns = ColumnarResults(results.result_dirs['bbox'])
+    assert columns.columns['image_ids'].tolist() == list(range(6))
+
+
+def _multi_gpu_test_worker(rank, world_size, init_file, tmpdir, prefix,
+                           out_file):
+    dist.init_process_group(
+        'gloo',
+        init_method=f'file://{init_file}',
+        rank=rank,
+        world_size=world_size)
+    # 5 samples are padded to 6 and split to 2 ranks in an interleaved way
+    masks = np.random.RandomState(0).rand(5, 8, 8) > 0.5
+    inds = [idx % 5 for idx in range(rank, 6, world_size)]
+    data = [
+        dict(img=masks[inds[i:i + 2]], img_metas=None)
+        for i in range(0, len(inds), 2)
+    ]
+    data_loader = _ToyDataLoader(data, dataset=_ToyColumnarDataset(masks))
+    results = multi_gpu_test(
+        _ToyMaskModel(), data_loader, tmpdir, columnar_prefix=prefix)
+    if rank == 0:
+        assert isinstance(results, ResultsWithColumns) and len(results) == 5
+        columns = ColumnarResults(results.result_dirs['bbox'])
+        mmcv.dump(columns.columns['image_ids'].tolist(), out_file)
+    else:
+        assert results is None
+    dist.destroy_process_group()
+
+
+@pytest.mark.skipif(
+    not dist.is_available() or not dist.is_gloo_available(),
+    reason='requires gloo backend')
+def test_multi_gpu_test_columnar_prefix(tmp_path):
+    prefix = str(tmp_path / 'results')
+    out_file = str(tmp_path / 'image_ids.pkl')
+    torch.multiprocessing.spawn(
+        _multi_gpu_test_worker,
+        args=(2, str(tmp_path / 'init'), str(tmp_path / 'tmp'), prefix,
+              out_file),
+        nprocs=2)
+    # the columns of the ranks are merged rank by rank without the padded
+    # samples, and the parts are removed
+    assert mmcv.load(out_file) == [0, 2, 4, 1, 3]
+    assert not os.path.exists(f'{prefix}.parts')
+
+
+class _ToyVideoPredictor:
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def predict(self, frames):
+        self.batch_sizes.append(len(frames))
+        return [int(frame.sum()) for frame in frames]
+
+
+def test_video_inference():
+    frames = [np.full((2, 2), i) for i in range(10)]
+    predictor = _ToyVideoPredictor()
+    written = []
+    video_inference = VideoInference(predictor, batch_size=4, queue_size=4)
+    stats = video_inference.run(
+        frames, lambda frame, result: written.append((frame, result)))
+    assert predictor.batch_sizes == [4, 4, 2]
+    assert [result for _, result in written] == [i * 4 for i in range(10)]
+    assert all(frame is frames[i] for i, (frame, _) in enumerate(written))
+    assert stats['num_frames'] == 10
+    for key in ['fps', 'decode_fps', 'inference_fps', 'write_fps']:
+        assert stats[key] > 0
+
+    # the errors of the stages are raised
+    def bad_frames():
+        yield frames[0]
+        raise ValueError('bad frame')
+
+    with pytest.raises(ValueError):
+        video_inference.run(bad_frames(), lambda frame, result: None)
+
+    def bad_sink(frame, result):
+        raise KeyError(result)
+
+    with pytest.raises(KeyError):
+        video_inference.run(frames * 10, bad_sink)
+
+    with pytest.raises(AssertionError):
+        VideoInference(predictor, batch_size=4, queue_size=2)
+
+
+def test_get_slices():
+    windows = get_slices(100, 100, 60, overlap_ratio=0.5)
+    starts = [0, 30, 40]
+    assert windows.tolist() == [[x, y, x + 60, y + 60] for y in starts
+                                for x in starts]
+    # the image is smaller than a tile
+    assert get_slices(50, 80, (60, 100)).tolist() == [[0, 0, 80, 50]]
+    windows = get_slices(100, 200, (100, 60), overlap_ratio=0.)
+    assert windows[:, 0].tolist() == [0, 60, 120, 140]
+    assert windows[:, 1].tolist() == [0, 0, 0, 0]
+
+
+def test_weighted_merge():
+    bboxes = np.array([[0, 0, 10, 10, 0.9], [1, 1, 11, 11, 0.3],
+                       [0, 0, 10, 10, 0.8], [50, 50, 60, 60, 0.5]],
+                      dtype=np.float32)
+    labels = np.array([0, 0, 1, 0])
+    merged, merged_labels = weighted_merge(bboxes, labels, iou_threshold=0.5)
+    assert merged_labels.tolist() == [0, 1, 0]
+    assert np.allclose(merged[0], [0.25, 0.25, 10.25, 10.25, 0.9])
+    assert np.allclose(merged[1], bboxes[2])
+    assert np.allclose(merged[2], bboxes[3])
+
+    # the scores are averaged over the models of an ensemble
+    merged, merged_labels = weighted_merge(
+        bboxes, labels, iou_threshold=0.5, score_norm=2)
+    assert merged_labels.tolist() == [0, 1, 0]
+    assert np.allclose(merged[:, 4], [0.6, 0.4, 0.25])
+
+
+class _ToyTilePredictor:
+    """Detect the pixels of value 1 and 2 as objects of class 0 and 1."""
+
+    def __init__(self):
+        self.model = mmcv.ConfigDict(CLASSES=('a', 'b'))
+        self.img_shapes = []
+
+    def predict(self, imgs):
+        self.img_shapes.append([img.shape for img in imgs])
+        results = []
+        for img in imgs:
+            result = []
+            for value, score in [(1, 0.9), (2, 0.8)]:
+                ys, xs = np.nonzero(img == value)
+                bboxes = np.zeros((0, 5), dtype=np.float32)
+                if len(xs) > 0:
+                    x1, y1 = xs.min(), ys.min()
+                    x2, y2 = xs.max() + 1, ys.max() + 1
+                    bboxes = np.array([[x1, y1, x2, y2, score]],
+                                      dtype=np.float32)
+                result.append(bboxes)
+            results.append(result)
+        return results
+
+
+@pytest.mark.parametrize('merge', ['nms', 'weighted'])
+def test_sliced_inference(merge):
+    img = np.zeros((100, 100), dtype=np.uint8)
+    # in all the tiles
+    img[45:55, 45:55] = 1
+    # only in the first tile
+    img[5:15, 5:15] = 2
+    predictor = _ToyTilePredictor()
+    sliced_inference = SlicedInference(
+        predictor, slice_size=60, overlap_ratio=0.5, batch_size=4, merge=merge)
+    result = sliced_inference.predict(img)
+    assert [len(img_shapes)
+            for img_shapes in predictor.img_shapes] == [4, 4, 1]
+    assert all(shape == (60, 60) for img_shapes in predictor.img_shapes
+               for shape in img_shapes)
+    assert len(result) == 2
+    assert np.allclose(result[0], [[45, 45, 55, 55, 0.9]])
+    assert np.allclose(result[1], [[5, 5, 15, 15, 0.8]])
+
+    # the downsized image is also forwarded
+    predictor = _ToyTilePredictor()
+    sliced_inference = SlicedInference(
+        predictor,
+        slice_size=60,
+        overlap_ratio=0.5,
+        merge=merge,
+        full_image_size=50,
+        max_per_img=1)
+    result = sliced_inference.predict(img)
+    assert predictor.img_shapes[-1] == [(50, 50)]
+    assert [len(bboxes) for bboxes in result] == [1, 0]
+
+    with pytest.raises(AssertionError):
+        SlicedInference(predictor, merge='wbf')
+
+
+def test_result_cache(tmp_path):
+    cache = ResultCache(max_size=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    # 'b' is the least recently used
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert len(cache) == 2
+    stats = cache.stats()
+    assert stats['num_hits'] == 3 and stats['num_misses'] == 1
+    assert stats['hit_rate'] == 0.75 and stats['num_evicted'] == 1
+    cache.reset_stats()
+    cache.clear()
+    assert cache.stats() == dict(
+        num_hits=0,
+        num_misses=0,
+        hit_rate=0.,
+        num_evicted=0,
+        num_expired=0,
+        size=0)
+
+    cache = ResultCache(ttl=0.01)
+    cache.put('a', 1)
+    time.sleep(0.02)
+    assert cache.get('a') is None
+    assert cache.stats()['num_expired'] == 1 and len(cache) == 0
+
+    with pytest.raises(AssertionError):
+        ResultCache(max_size=0)
+
+    img = np.random.randint(0, 255, (4, 6, 3), dtype=np.uint8)
+    assert hash_image(img) == hash_image(img.copy())
+    # not contiguous
+    assert hash_image(img[:, ::2]) == hash_image(img[:, ::2].copy())
+    assert hash_image(img) != hash_image(img.reshape(6, 4, 3))
+    assert hash_image(img) != hash_image(img.astype(np.float32))
+    img_file = tmp_path / 'img.bin'
+    img_file.write_bytes(img.tobytes())
+    assert hash_image(str(img_file)) == hash_image(str(img_file))
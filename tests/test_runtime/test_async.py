@@ -81,3 +81,54 @@ class AsyncInferenceTestCase(AsyncTestCase):
             # asy inference detector will hack grad_enabled,
             # so restore here to avoid it to influence other tests
             torch.set_grad_enabled(ori_grad_enabled)
+
+
+class _DummyPredictor:
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def predict(self, imgs):
+        self.batch_sizes.append(len(imgs))
+        if any(img < 0 for img in imgs):
+            raise ValueError('negative image')
+        return [img * 2 for img in imgs]
+
+
+def test_micro_batch_scheduler():
+    from mmdet.apis import MicroBatchScheduler
+
+    async def run():
+        predictor = _DummyPredictor()
+        async with MicroBatchScheduler(
+                predictor, max_batch_size=4, max_wait_time=0.1) as scheduler:
+            results = await asyncio.gather(
+                *[scheduler.submit(i) for i in range(5)])
+            assert results == [0, 2, 4, 6, 8]
+            assert predictor.batch_sizes == [4, 1]
+
+            stats = scheduler.stats()
+            assert stats['num_requests'] == 5
+            assert stats['num_batches'] == 2
+            assert stats['mean_batch_size'] == 2.5
+            assert stats['max_queue_depth'] == 5
+            assert stats['queue_depth'] == 0
+            assert stats['throughput'] > 0
+            assert 0 < stats['latency_p50'] <= stats['latency_p95']
+
+            # the error of a batch is raised for all its requests
+            scheduler.reset_stats()
+            results = await asyncio.gather(
+                scheduler.submit(1),
+                scheduler.submit(-1),
+                return_exceptions=True)
+            assert all(isinstance(res, ValueError) for res in results)
+            assert scheduler.stats()['num_failed'] == 2
+            assert scheduler.stats()['num_requests'] == 0
+
+            # queued requests are run before stopping
+            task = asyncio.ensure_future(scheduler.submit(3))
+            await asyncio.sleep(0)
+        assert task.result() == 6
+
+    asyncio.run(run())
@@ -767,3 +767,90 @@ def test_guided_anchor():
     anchors = ga_retina_head.square_anchor_generator.grid_anchors(
         featmap_sizes, device)
     assert len(anchors) == 5
+
+
+@pytest.mark.parametrize('prior_generator_cfg', [
+    dict(
+        type='AnchorGenerator',
+        scales=[8],
+        ratios=[0.5, 1.0, 2.0],
+        strides=[8, 16]),
+    dict(
+        type='SSDAnchorGenerator',
+        scale_major=False,
+        input_size=300,
+        basesize_ratio_range=(0.15, 0.9),
+        strides=[8, 16, 32, 64, 100, 300],
+        ratios=[[2], [2, 3], [2, 3], [2, 3], [2], [2]]),
+    dict(
+        type='YOLOAnchorGenerator',
+        strides=[32, 16],
+        base_sizes=[[(116, 90), (156, 198)], [(30, 61), (62, 45)]]),
+    dict(type='MlvlPointGenerator', strides=[8, 16])
+])
+def test_prior_cache(prior_generator_cfg):
+    from mmdet.core.anchor import build_prior_generator
+    prior_generator = build_prior_generator(prior_generator_cfg)
+    cache = prior_generator.prior_cache
+    num_levels = prior_generator.num_levels
+    featmap_sizes = [(16 // 2**i, 20 // 2**i) for i in range(num_levels)]
+
+    priors = prior_generator.grid_priors(featmap_sizes, device='cpu')
+    assert cache.stats() == dict(num_hits=0, num_misses=1, size=1)
+    # the cached priors are returned for the same sizes
+    cached_priors = prior_generator.grid_priors(
+        [torch.Size(size) for size in featmap_sizes], device='cpu')
+    assert cache.stats() == dict(num_hits=1, num_misses=1, size=1)
+    assert cached_priors is not priors
+    for prior, cached_prior in zip(priors, cached_priors):
+        assert cached_prior is prior
+
+    # the dtype is part of the key
+    half_priors = prior_generator.grid_priors(
+        featmap_sizes, dtype=torch.float16, device='cpu')
+    assert half_priors[0].dtype == torch.float16
+    assert cache.stats() == dict(num_hits=1, num_misses=2, size=2)
+
+    flags = prior_generator.valid_flags(featmap_sizes, (100, 120, 3), 'cpu')
+    cached_flags = prior_generator.valid_flags(featmap_sizes, (100, 120),
+                                               'cpu')
+    assert cache.stats() == dict(num_hits=2, num_misses=3, size=3)
+    for flag, cached_flag in zip(flags, cached_flags):
+        assert cached_flag is flag
+    # the cached results are those generated without the cache
+    prior_generator.prior_cache.max_size = 0
+    expected_priors = prior_generator.grid_priors(featmap_sizes, device='cpu')
+    expected_flags = prior_generator.valid_flags(featmap_sizes, (100, 120),
+                                                 'cpu')
+    assert cache.stats() == dict(num_hits=2, num_misses=3, size=3)
+    for prior, expected_prior in zip(priors, expected_priors):
+        assert torch.equal(prior, expected_prior)
+    for flag, expected_flag in zip(flags, expected_flags):
+        assert torch.equal(flag, expected_flag)
+
+    cache.clear()
+    assert cache.stats() == dict(num_hits=0, num_misses=0, size=0)
+
+
+def test_prior_cache_eviction():
+    from mmdet.core.anchor import MlvlPointGenerator, PriorCache
+    cache = PriorCache(max_size=2)
+    cache.get(('a', ), lambda: [torch.zeros(1)])
+    cache.get(('b', ), lambda: [torch.zeros(1)])
+    # 'a' is the most recently used
+    cache.get(('a', ), lambda: [torch.ones(1)])
+    cache.get(('c', ), lambda: [torch.zeros(1)])
+    assert len(cache) == 2
+    assert cache.stats() == dict(num_hits=1, num_misses=3, size=2)
+    # 'b' is evicted
+    assert cache.get(('b', ), lambda: [torch.ones(1)])[0].item() == 1
+    assert cache.get(('c', ), lambda: [torch.ones(1)])[0].item() == 0
+
+    prior_generator = MlvlPointGenerator([8], cache_size=0)
+    prior_generator.grid_priors([(2, 2)], device='cpu')
+    prior_generator.grid_priors([(2, 2)], device='cpu')
+    assert prior_generator.prior_cache.stats() == dict(
+        num_hits=0, num_misses=0, size=0)
+
+    with pytest.raises(AssertionError):
+        PriorCache(max_size=-1)
@@ -1,9 +1,11 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import numpy as np
+import pycocotools.mask as mask_util
 import pytest
 import torch
 
-from mmdet.core import BitmapMasks, PolygonMasks, mask2bbox
+from mmdet.core import (BitmapMasks, PolygonMasks, encode_mask_results,
+                        encode_masks, mask2bbox)
 
 
 def dummy_raw_bitmap_masks(size):
@@ -711,3 +713,37 @@ def test_mask2bbox():
     masks[0, 5, 2:7] = True
     bboxes = mask2bbox(masks)
     assert torch.allclose(bboxes_gt, bboxes)
+
+
+def test_encode_masks():
+    masks = np.random.rand(5, 20, 15) > 0.5
+    expected = [
+        mask_util.encode(np.array(mask[:, :, None], order='F',
+                                  dtype='uint8'))[0] for mask in masks
+    ]
+    assert encode_masks(masks) == expected
+    assert encode_masks(list(masks)) == expected
+    assert encode_masks(torch.from_numpy(masks)) == expected
+    # column-major masks are encoded without copy
+    masks_t = np.ascontiguousarray(masks.transpose(0, 2, 1)).transpose(0, 2, 1)
+    assert encode_masks(masks_t) == expected
+    assert encode_masks(list(masks_t)) == expected
+    assert encode_masks([]) == []
+
+    # masks of all classes are encoded together and split back
+    cls_segms = [list(masks[:2]), [], list(masks[2:])]
+    cls_expected = [expected[:2], [], expected[2:]]
+    assert encode_mask_results(cls_segms) == cls_expected
+    # mask scoring
+    cls_scores = [[0.1, 0.2], [], [0.3, 0.4, 0.5]]
+    assert encode_mask_results(
+        (cls_segms, cls_scores)) == (cls_expected, cls_scores)
+    # all classes are empty
+    assert encode_mask_results([[], []]) == [[], []]
+
+    # uint8 masks for visualization
+    masks = (masks * np.random.randint(1, 256, masks.shape)).astype(np.uint8)
+    assert encode_masks(masks) == [
+        mask_util.encode(np.array(mask[:, :, None], order='F'))[0]
+        for mask in masks
+    ]
@@ -6,7 +6,8 @@ import numpy as np
 import pytest
 import torch
 
-from mmdet.core.bbox import distance2bbox
+from mmdet.core.bbox import (compact2result, distance2bbox, is_compact_result,
+                             result2compact)
 from mmdet.core.mask.structures import BitmapMasks, PolygonMasks
 from mmdet.core.utils import (center_of_mass, filter_scores_and_topk,
                               flip_tensor, mask2ndarray, select_single_mlvl)
@@ -98,6 +99,56 @@ def test_distance2bbox():
     assert rois.shape == out.shape
 
 
+def test_compact_result():
+    rng = np.random.RandomState(0)
+    bbox_result = [
+        rng.rand(num_dets, 5).astype(np.float32) for num_dets in [2, 0, 3]
+    ]
+    segm_result = [[rng.rand(4, 4) > 0.5 for _ in range(len(bboxes))]
+                   for bboxes in bbox_result]
+    mask_scores = [rng.rand(len(bboxes)) for bboxes in bbox_result]
+
+    compact = result2compact(bbox_result)
+    assert is_compact_result(compact)
+    assert not is_compact_result(bbox_result)
+    assert compact['bboxes'].shape == (5, 5)
+    assert compact['labels'].tolist() == [0, 0, 2, 2, 2]
+    assert 'masks' not in compact
+    result = compact2result(compact, 3)
+    assert len(result) == 3
+    for bboxes, expected_bboxes in zip(result, bbox_result):
+        assert np.array_equal(bboxes, expected_bboxes)
+
+    # the detections can be in any order of classes
+    order = rng.permutation(5)
+    shuffled = dict(
+        bboxes=compact['bboxes'][order], labels=compact['labels'][order])
+    for bboxes, expected_bboxes in zip(
+            compact2result(shuffled, 3), bbox_result):
+        assert np.array_equal(
+            np.sort(bboxes, axis=0), np.sort(expected_bboxes, axis=0))
+
+    compact = result2compact((bbox_result, segm_result))
+    assert len(compact['masks']) == 5
+    result_bboxes, result_masks = compact2result(compact, 3)
+    assert [len(masks) for masks in result_masks] == [2, 0, 3]
+    for masks, expected_masks in zip(result_masks, segm_result):
+        for mask, expected_mask in zip(masks, expected_masks):
+            assert mask is expected_mask
+
+    compact = result2compact((bbox_result, (segm_result, mask_scores)))
+    assert compact['mask_scores'].shape == (5, )
+    _, (result_masks, result_scores) = compact2result(compact, 3)
+    for scores, expected_scores in zip(result_scores, mask_scores):
+        assert np.array_equal(scores, expected_scores)
+
+    # no detections
+    compact = result2compact([np.zeros((0, 5), dtype=np.float32)] * 2)
+    assert compact['bboxes'].shape == (0, 5)
+    result = compact2result(compact, 2)
+    assert [bboxes.shape for bboxes in result] == [(0, 5), (0, 5)]
+
+
 @pytest.mark.parametrize('mask', [
     torch.ones((28, 28)),
     torch.zeros((28, 28)),
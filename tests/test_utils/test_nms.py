@@ -1,7 +1,7 @@
 import pytest
 import torch
 
-from mmdet.core.post_processing import mask_matrix_nms
+from mmdet.core.post_processing import mask_matrix_nms, multiclass_nms
 
 
 def _create_mask(N, h, w):
@@ -73,3 +73,80 @@ def test_nms_input_errors():
                         filter_thr=0.5)
     assert len(score) == 1
     assert score[0] == 1
+
+
+def test_multiclass_nms():
+    num_bboxes, num_classes = 200, 30
+    xy = torch.rand(num_bboxes, num_classes, 2) * 100
+    wh = torch.rand(num_bboxes, num_classes, 2) * 50 + 1
+    multi_bboxes = torch.cat([xy, xy + wh], dim=-1).view(num_bboxes, -1)
+    multi_scores = torch.rand(num_bboxes, num_classes + 1)
+    score_factors = torch.rand(num_bboxes)
+    nms_cfg = dict(type='nms', iou_threshold=0.5)
+
+    for bboxes in [multi_bboxes, multi_bboxes[:, :4]]:
+        dets, labels, inds = multiclass_nms(
+            bboxes,
+            multi_scores,
+            0.5,
+            nms_cfg,
+            score_factors=score_factors,
+            return_inds=True)
+        assert dets.shape == (len(labels), 5)
+        assert (dets[:, 4] > 0).all()
+        # the indices are in the flattened (n, #class) candidates
+        rows = torch.div(inds, num_classes, rounding_mode='floor')
+        assert torch.equal(labels, inds % num_classes)
+        scores = multi_scores[rows, labels] * score_factors[rows]
+        assert torch.allclose(dets[:, 4], scores)
+        class_bboxes = bboxes.view(num_bboxes, -1, 4)
+        if class_bboxes.size(1) == 1:
+            labels = torch.zeros_like(labels)
+        assert torch.allclose(dets[:, :4], class_bboxes[rows, labels])
+
+        # a top-k larger than the candidates changes nothing
+        dets_, labels_ = multiclass_nms(
+            bboxes,
+            multi_scores,
+            0.5,
+            nms_cfg,
+            score_factors=score_factors,
+            nms_pre=num_bboxes * num_classes,
+            nms_pre_per_class=num_bboxes)
+        assert torch.equal(dets_, dets)
+        assert torch.equal(labels_, inds % num_classes)
+
+    # the top-k of all the classes
+    dets, labels, inds = multiclass_nms(
+        multi_bboxes,
+        multi_scores,
+        0.,
+        nms_cfg,
+        max_num=50,
+        return_inds=True,
+        nms_pre=100)
+    topk_scores = multi_scores[:, :-1].reshape(-1).topk(101)[0]
+    assert len(dets) == 50
+    assert (dets[:, 4] >= topk_scores[99]).all()
+    # the same as a threshold which keeps the top-k only
+    score_thr = topk_scores[100].item()
+    expected_dets, expected_labels = multiclass_nms(multi_bboxes, multi_scores,
+                                                    score_thr, nms_cfg, 50)
+    assert torch.equal(dets, expected_dets)
+    assert torch.equal(labels, expected_labels)
+
+    # the top-k of each class
+    dets, labels = multiclass_nms(
+        multi_bboxes, multi_scores, 0., nms_cfg, nms_pre_per_class=5)
+    assert len(dets) <= 5 * num_classes
+    for label in range(num_classes):
+        class_dets = dets[labels == label]
+        assert len(class_dets) <= 5
+        class_scores = multi_scores[:, label]
+        assert (class_dets[:, 4] >= class_scores.topk(5)[0][-1]).all()
+
+    # no candidate
+    dets, labels = multiclass_nms(
+        multi_bboxes, multi_scores, 1., nms_cfg, nms_pre=100)
+    assert dets.shape == (0, 5)
+    assert labels.shape == (0, )
@@ -1,22 +1,80 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import argparse
 import os.path as osp
-from multiprocessing import Pool
 
 import mmcv
 import numpy as np
 from mmcv import Config, DictAction
 
-from mmdet.core.evaluation import eval_map
+from mmdet.core.evaluation.bbox_overlaps import max_bbox_overlaps
+from mmdet.core.evaluation.mean_ap import average_precision, get_cls_results
 from mmdet.core.visualization import imshow_gt_det_bboxes
 from mmdet.datasets import build_dataset, get_loading_pipeline
 from mmdet.datasets.api_wrappers import pq_compute_single_core
 from mmdet.utils import replace_cfg_vals, update_data_root
 
 
+def tpfp_multi_thrs(det_bboxes, gt_bboxes, gt_bboxes_ignore, iou_thrs):
+    """Check if detected bboxes are true positive or false positive under
+    several IoU thresholds at once.
+
+    The matching is the same as :func:`tpfp_default` without area ranges,
+    but the IoUs are computed only once and all the thresholds are matched
+    in a single vectorized pass.
+
+    Args:
+        det_bboxes (ndarray): Detected bboxes of this image, of shape (m, 5).
+        gt_bboxes (ndarray): GT bboxes of this image, of shape (n, 4).
+        gt_bboxes_ignore (ndarray): Ignored gt bboxes of this image,
+            of shape (k, 4).
+        iou_thrs (ndarray): IoU thresholds, of shape (t, ).
+
+    Returns:
+        tuple[np.ndarray]: (tp, fp) whose elements are 0 and 1. The shape of
+        each array is (t, m) and the dets are sorted by scores in
+        descending order.
+    """
+    # an indicator of ignored gts
+    gt_ignore_inds = np.concatenate(
+        (np.zeros(gt_bboxes.shape[0],
+                  dtype=bool), np.ones(gt_bboxes_ignore.shape[0], dtype=bool)))
+    # stack gt_bboxes and gt_bboxes_ignore for convenience
+    gt_bboxes = np.vstack((gt_bboxes, gt_bboxes_ignore))
+
+    num_thrs = len(iou_thrs)
+    num_dets = det_bboxes.shape[0]
+    num_gts = gt_bboxes.shape[0]
+    if num_gts == 0:
+        tp = np.zeros((num_thrs, num_dets), dtype=np.float32)
+        fp = np.ones((num_thrs, num_dets), dtype=np.float32)
+        return tp, fp
+
+    ious_max, ious_argmax = max_bbox_overlaps(det_bboxes, gt_bboxes)
+    sort_inds = np.argsort(-det_bboxes[:, -1])
+    ious_max = ious_max[sort_inds]
+    ious_argmax = ious_argmax[sort_inds]
+    # (t, m), whether each det overlaps enough with its best gt
+    matched = ious_max[None] >= iou_thrs[:, None]
+    # a gt is covered by the first det matched to it under each threshold,
+    # the following dets matched to it are false positives
+    thr_inds, det_inds = np.nonzero(matched)
+    _, first_inds = np.unique(
+        thr_inds * num_gts + ious_argmax[det_inds], return_index=True)
+    covering = np.zeros_like(matched)
+    covering[thr_inds[first_inds], det_inds[first_inds]] = True
+    # dets matched to ignored gts are neither tp nor fp
+    ignored = gt_ignore_inds[ious_argmax][None]
+    tp = (covering & ~ignored).astype(np.float32)
+    fp = (~matched | (matched & ~covering & ~ignored)).astype(np.float32)
+    return tp, fp
+
+
 def bbox_map_eval(det_result, annotation, nproc=4):
     """Evaluate mAP of single image det result.
 
+    The mAP is averaged over IoU thresholds [0.5:0.05:0.95] and equals to
+    the mean of :func:`eval_map` under each threshold.
+
     Args:
         det_result (list[list]): [[cls1_det, cls2_det, ...], ...].
             The outer list indicates images, and the inner list indicates
@@ -29,7 +87,8 @@ def bbox_map_eval(det_result, annotation, nproc=4):
             - bboxes_ignore (optional): numpy array of shape (k, 4)
             - labels_ignore (optional): numpy array of shape (k, )
 
-        nproc (int): Processes used for computing mAP.
+        nproc (int): Not used anymore since all the IoU thresholds are
+            evaluated in one pass. Kept for backward compatibility.
             Default: 4.
 
     Returns:
@@ -38,31 +97,65 @@ def bbox_map_eval(det_result, annotation, nproc=4):
 
     # use only bbox det result
     if isinstance(det_result, tuple):
-        bbox_det_result = [det_result[0]]
-    else:
-        bbox_det_result = [det_result]
+        det_result = det_result[0]
     # mAP
     iou_thrs = np.linspace(
         .5, 0.95, int(np.round((0.95 - .5) / .05)) + 1, endpoint=True)
 
-    processes = []
-    workers = Pool(processes=nproc)
-    for thr in iou_thrs:
-        p = workers.apply_async(eval_map, (bbox_det_result, [annotation]), {
-            'iou_thr': thr,
-            'logger': 'silent',
-            'nproc': 1
-        })
-        processes.append(p)
+    aps = []
+    for i in range(len(det_result)):
+        cls_dets, cls_gts, cls_gts_ignore = get_cls_results([det_result],
+                                                            [annotation], i)
+        # classes without gts are not counted in mAP
+        num_gts = np.array([cls_gts[0].shape[0]])
+        if num_gts[0] == 0:
+            continue
+        tp, fp = tpfp_multi_thrs(cls_dets[0], cls_gts[0], cls_gts_ignore[0],
+                                 iou_thrs)
+        # calculate recall and precision with tp and fp
+        tp = np.cumsum(tp, axis=1)
+        fp = np.cumsum(fp, axis=1)
+        eps = np.finfo(np.float32).eps
+        recalls = tp / np.maximum(num_gts[:, np.newaxis], eps)
+        precisions = tp / np.maximum((tp + fp), eps)
+        aps.append(average_precision(recalls, precisions))
+
+    if not aps:
+        return 0.0
+    # shape (num_thrs, num_classes)
+    mean_aps = np.stack(aps, axis=1).mean(axis=1).tolist()
+    return sum(mean_aps) / len(mean_aps)
 
-    workers.close()
-    workers.join()
 
-    mean_aps = []
-    for p in processes:
-        mean_aps.append(p.get()[0])
+def _bbox_map_eval_task(task):
+    return bbox_map_eval(*task)
 
-    return sum(mean_aps) / len(mean_aps)
+
+def batch_bbox_map_eval(det_results, annotations, nproc=4):
+    """Evaluate mAP of each image in a batch.
+
+    Images are split into chunks and evaluated by a shared process pool,
+    instead of creating a pool for each image.
+
+    Args:
+        det_results (list): Det results of all images, see
+            :func:`bbox_map_eval`.
+        annotations (list[dict]): Ground truth annotations of all images.
+        nproc (int): Processes used for computing mAP. Default: 4.
+
+    Returns:
+        list[float]: mAP of each image.
+    """
+    assert len(det_results) == len(annotations)
+    tasks = list(zip(det_results, annotations))
+    if nproc > 1:
+        return mmcv.track_parallel_progress(
+            _bbox_map_eval_task,
+            tasks,
+            nproc,
+            chunksize=max(1,
+                          len(tasks) // (nproc * 16)))
+    return mmcv.track_progress(_bbox_map_eval_task, tasks)
 
 
 class ResultVisualizer:
@@ -143,7 +236,8 @@ class ResultVisualizer:
                           dataset,
                           results,
                           topk=20,
-                          show_dir='work_dir'):
+                          show_dir='work_dir',
+                          nproc=4):
         """Evaluate and show results.
 
         Args:
@@ -154,7 +248,8 @@ class ResultVisualizer:
                 lowest topk after evaluation index sorting. Default: 20.
             show_dir (str, optional): The filename to write the image.
                 Default: 'work_dir'
-            eval_fn (callable, optional): Eval function, Default: None.
+            nproc (int): Processes used for computing the mAP of object
+                detection results. Default: 4.
         """
 
         assert topk > 0
@@ -166,11 +261,11 @@ class ResultVisualizer:
                 dataset, results, topk=topk)
         elif isinstance(results[0], list):
             good_samples, bad_samples = self.detection_evaluate(
-                dataset, results, topk=topk)
+                dataset, results, topk=topk, nproc=nproc)
         elif isinstance(results[0], tuple):
             results_ = [result[0] for result in results]
             good_samples, bad_samples = self.detection_evaluate(
-                dataset, results_, topk=topk)
+                dataset, results_, topk=topk, nproc=nproc)
         else:
             raise 'The format of result is not supported yet. ' \
                 'Current dict for panoptic segmentation and list ' \
@@ -181,7 +276,12 @@ class ResultVisualizer:
         self._save_image_gts_results(dataset, results, good_samples, good_dir)
         self._save_image_gts_results(dataset, results, bad_samples, bad_dir)
 
-    def detection_evaluate(self, dataset, results, topk=20, eval_fn=None):
+    def detection_evaluate(self,
+                           dataset,
+                           results,
+                           topk=20,
+                           eval_fn=None,
+                           nproc=4):
         """Evaluation for object detection.
 
         Args:
@@ -191,6 +291,8 @@ class ResultVisualizer:
             topk (int): Number of the highest topk and
                 lowest topk after evaluation index sorting. Default: 20.
             eval_fn (callable, optional): Eval function, Default: None.
+            nproc (int): Processes used for computing mAP when ``eval_fn``
+                is None. Default: 4.
 
         Returns:
             tuple: A tuple contains good samples and bad samples.
@@ -201,20 +303,17 @@ class ResultVisualizer:
                     samples's indices in dataset and model's
                     performance on them.
         """
+        annotations = [dataset.get_ann_info(i) for i in range(len(results))]
         if eval_fn is None:
-            eval_fn = bbox_map_eval
+            mAPs = batch_bbox_map_eval(results, annotations, nproc=nproc)
         else:
             assert callable(eval_fn)
-
-        prog_bar = mmcv.ProgressBar(len(results))
-        _mAPs = {}
-        for i, (result, ) in enumerate(zip(results)):
-            # self.dataset[i] should not call directly
-            # because there is a risk of mismatch
-            data_info = dataset.prepare_train_img(i)
-            mAP = eval_fn(result, data_info['ann_info'])
-            _mAPs[i] = mAP
-            prog_bar.update()
+            prog_bar = mmcv.ProgressBar(len(results))
+            mAPs = []
+            for result, ann_info in zip(results, annotations):
+                mAPs.append(eval_fn(result, ann_info))
+                prog_bar.update()
+        _mAPs = dict(enumerate(mAPs))
         # descending select topk image
         _mAPs = list(sorted(_mAPs.items(), key=lambda kv: kv[1]))
         good_mAPs = _mAPs[-topk:]
@@ -316,6 +415,11 @@ def parse_args():
         'image which will be concatenated in vertical direction.'
         'The image above is drawn with gt, and the image below is'
         'drawn with the prediction result.')
+    parser.add_argument(
+        '--nproc',
+        type=int,
+        default=4,
+        help='number of processes to compute the mAP of each image')
     parser.add_argument(
         '--cfg-options',
         nargs='+',
@@ -362,7 +466,11 @@ def main():
                                          args.show_score_thr,
                                          args.overlay_gt_pred)
     result_visualizer.evaluate_and_show(
-        dataset, outputs, topk=args.topk, show_dir=args.show_dir)
+        dataset,
+        outputs,
+        topk=args.topk,
+        show_dir=args.show_dir,
+        nproc=args.nproc)
 
 
 if __name__ == '__main__':
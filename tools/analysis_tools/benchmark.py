@@ -7,9 +7,10 @@ import time
 import torch
 from mmcv import Config, DictAction
 from mmcv.cnn import fuse_conv_bn
-from mmcv.parallel import MMDistributedDataParallel
+from mmcv.parallel import MMDistributedDataParallel, scatter
 from mmcv.runner import init_dist, load_checkpoint, wrap_fp16_model
 
+from mmdet.apis import init_detector
 from mmdet.datasets import (build_dataloader, build_dataset,
                             replace_ImageToTensor)
 from mmdet.models import build_detector
@@ -34,6 +35,22 @@ def parse_args():
         action='store_true',
         help='Whether to fuse conv and bn, this will slightly increase'
         'the inference speed')
+    parser.add_argument(
+        '--device',
+        choices=['cuda', 'cpu'],
+        default='cuda',
+        help='device used for inference, the cpu benchmark runs in a single '
+        'process without launcher')
+    parser.add_argument(
+        '--cpu-optimize',
+        action='store_true',
+        help='whether to fuse conv and bn, use the channels last memory '
+        'format and inference mode for the cpu benchmark')
+    parser.add_argument(
+        '--num-threads',
+        type=int,
+        default=None,
+        help='number of intra-op threads for the cpu benchmark')
     parser.add_argument(
         '--cfg-options',
         nargs='+',
@@ -56,8 +73,13 @@ def parse_args():
     return args
 
 
-def measure_inference_speed(cfg, checkpoint, max_iter, log_interval,
-                            is_fuse_conv_bn):
+def measure_inference_speed(cfg,
+                            checkpoint,
+                            max_iter,
+                            log_interval,
+                            is_fuse_conv_bn,
+                            device='cuda',
+                            cpu_optimize=None):
     # set cudnn_benchmark
     if cfg.get('cudnn_benchmark', False):
         torch.backends.cudnn.benchmark = True
@@ -77,24 +99,34 @@ def measure_inference_speed(cfg, checkpoint, max_iter, log_interval,
         # FPS statistics will be more unstable when workers_per_gpu is not 0.
         # It is reasonable to set workers_per_gpu to 0.
         workers_per_gpu=0,
-        dist=True,
+        dist=device == 'cuda',
         shuffle=False)
 
     # build the model and load checkpoint
-    cfg.model.train_cfg = None
-    model = build_detector(cfg.model, test_cfg=cfg.get('test_cfg'))
-    fp16_cfg = cfg.get('fp16', None)
-    if fp16_cfg is not None:
-        wrap_fp16_model(model)
-    load_checkpoint(model, checkpoint, map_location='cpu')
-    if is_fuse_conv_bn:
-        model = fuse_conv_bn(model)
-
-    model = MMDistributedDataParallel(
-        model.cuda(),
-        device_ids=[torch.cuda.current_device()],
-        broadcast_buffers=False)
+    if device == 'cpu':
+        model = init_detector(
+            cfg, checkpoint, device='cpu', cpu_optimize=cpu_optimize or False)
+        if is_fuse_conv_bn and not cpu_optimize:
+            model = fuse_conv_bn(model)
+    else:
+        cfg.model.train_cfg = None
+        model = build_detector(cfg.model, test_cfg=cfg.get('test_cfg'))
+        fp16_cfg = cfg.get('fp16', None)
+        if fp16_cfg is not None:
+            wrap_fp16_model(model)
+        load_checkpoint(model, checkpoint, map_location='cpu')
+        if is_fuse_conv_bn:
+            model = fuse_conv_bn(model)
+
+        model = MMDistributedDataParallel(
+            model.cuda(),
+            device_ids=[torch.cuda.current_device()],
+            broadcast_buffers=False)
     model.eval()
+    if getattr(model, 'use_inference_mode', False):
+        no_grad = torch.inference_mode
+    else:
+        no_grad = torch.no_grad
 
     # the first several iterations may be very slow so skip them
     num_warmup = 5
@@ -103,14 +135,23 @@ def measure_inference_speed(cfg, checkpoint, max_iter, log_interval,
 
     # benchmark with 2000 image and take the average
     for i, data in enumerate(data_loader):
-
-        torch.cuda.synchronize()
+        if device == 'cpu':
+            # unpack the DataContainers as done by MMDataParallel on cpu
+            data = scatter(data, [-1])[0]
+            if getattr(model, 'use_channels_last', False):
+                data['img'] = [
+                    img.contiguous(memory_format=torch.channels_last)
+                    for img in data['img']
+                ]
+        else:
+            torch.cuda.synchronize()
         start_time = time.perf_counter()
 
-        with torch.no_grad():
+        with no_grad():
             model(return_loss=False, rescale=True, **data)
 
-        torch.cuda.synchronize()
+        if device == 'cuda':
+            torch.cuda.synchronize()
         elapsed = time.perf_counter() - start_time
 
         if i >= num_warmup:
@@ -138,7 +179,9 @@ def repeat_measure_inference_speed(cfg,
                                    max_iter,
                                    log_interval,
                                    is_fuse_conv_bn,
-                                   repeat_num=1):
+                                   repeat_num=1,
+                                   device='cuda',
+                                   cpu_optimize=None):
     assert repeat_num >= 1
 
     fps_list = []
@@ -149,7 +192,7 @@ def repeat_measure_inference_speed(cfg,
 
         fps_list.append(
             measure_inference_speed(cp_cfg, checkpoint, max_iter, log_interval,
-                                    is_fuse_conv_bn))
+                                    is_fuse_conv_bn, device, cpu_optimize))
 
     if repeat_num > 1:
         fps_list_ = [round(fps, 1) for fps in fps_list]
@@ -181,14 +224,20 @@ def main():
     if args.cfg_options is not None:
         cfg.merge_from_dict(args.cfg_options)
 
-    if args.launcher == 'none':
+    cpu_optimize = None
+    if args.device == 'cpu':
+        if args.cpu_optimize:
+            cpu_optimize = dict(num_threads=args.num_threads)
+        elif args.num_threads is not None:
+            torch.set_num_threads(args.num_threads)
+    elif args.launcher == 'none':
         raise NotImplementedError('Only supports distributed mode')
     else:
         init_dist(args.launcher, **cfg.dist_params)
 
     repeat_measure_inference_speed(cfg, args.checkpoint, args.max_iter,
                                    args.log_interval, args.fuse_conv_bn,
-                                   args.repeat_num)
+                                   args.repeat_num, args.device, cpu_optimize)
 
 
 if __name__ == '__main__':
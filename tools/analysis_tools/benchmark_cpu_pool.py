@@ -0,0 +1,123 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import argparse
+import os
+import threading
+import time
+from functools import partial
+
+import mmcv
+import numpy as np
+from terminaltables import AsciiTable
+
+from mmdet.apis import CPUInferencePool
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the throughput of CPU inference pools')
+    parser.add_argument('config', help='test config file path')
+    parser.add_argument('checkpoint', help='checkpoint file')
+    parser.add_argument(
+        '--img', default='demo/demo.jpg', help='image used for inference')
+    parser.add_argument(
+        '--layouts',
+        nargs='+',
+        default=None,
+        help='pool layouts to benchmark, in REPLICASxTHREADS format, e.g. '
+        '1x16 2x8 4x4, default to all the layouts using the available cores '
+        'with a power of 2 replicas')
+    parser.add_argument(
+        '--num-images',
+        type=int,
+        default=64,
+        help='number of images submitted at once to each pool')
+    parser.add_argument(
+        '--max-batch-size',
+        type=int,
+        default=1,
+        help='maximum number of queued images a replica forwards in a batch')
+    parser.add_argument(
+        '--dispatch',
+        choices=['least_loaded', 'round_robin'],
+        default='least_loaded',
+        help='how the images are assigned to the replicas')
+    parser.add_argument(
+        '--cpu-optimize',
+        action='store_true',
+        help='whether to optimize the replicas for cpu inference')
+    args = parser.parse_args()
+    return args
+
+
+def default_layouts():
+    num_cores = len(os.sched_getaffinity(0)) if hasattr(
+        os, 'sched_getaffinity') else os.cpu_count()
+    layouts = []
+    num_replicas = 1
+    while num_replicas <= num_cores:
+        layouts.append((num_replicas, num_cores // num_replicas))
+        num_replicas *= 2
+    return layouts
+
+
+def record_latency(latencies, done, submit_time, future):
+    latencies.append(time.perf_counter() - submit_time)
+    # the callbacks run after the waiters of the future are woken up
+    done.release()
+
+
+def benchmark(pool, img, num_images):
+    # warm up every replica
+    pool.predict([img] * pool.num_replicas * 2)
+
+    latencies = []
+    done = threading.Semaphore(0)
+    start = time.perf_counter()
+    for _ in range(num_images):
+        submit_time = time.perf_counter()
+        future = pool.submit(img)
+        future.add_done_callback(
+            partial(record_latency, latencies, done, submit_time))
+    for _ in range(num_images):
+        done.acquire()
+    elapsed = time.perf_counter() - start
+    return num_images / elapsed, np.array(latencies)
+
+
+def main():
+    args = parse_args()
+    img = mmcv.imread(args.img)
+    if args.layouts is None:
+        layouts = default_layouts()
+    else:
+        layouts = [
+            tuple(int(x) for x in layout.split('x')) for layout in args.layouts
+        ]
+
+    table_data = [[
+        'replicas', 'threads', 'throughput (img/s)', 'latency mean (ms)',
+        'latency p95 (ms)'
+    ]]
+    for num_replicas, num_threads in layouts:
+        with CPUInferencePool(
+                args.config,
+                args.checkpoint,
+                num_replicas=num_replicas,
+                threads_per_replica=num_threads,
+                dispatch=args.dispatch,
+                max_batch_size=args.max_batch_size,
+                cpu_optimize=args.cpu_optimize) as pool:
+            throughput, latencies = benchmark(pool, img, args.num_images)
+        table_data.append([
+            num_replicas, num_threads, f'{throughput:.2f}',
+            f'{latencies.mean() * 1000:.1f}',
+            f'{np.percentile(latencies, 95) * 1000:.1f}'
+        ])
+        print(
+            f'{num_replicas} x {num_threads}: {throughput:.2f} img/s',
+            flush=True)
+    print(AsciiTable(table_data).table)
+
+
+if __name__ == '__main__':
+    main()
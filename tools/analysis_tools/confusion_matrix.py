@@ -1,5 +1,6 @@
 import argparse
 import os
+from functools import partial
 
 import matplotlib.pyplot as plt
 import mmcv
@@ -43,6 +44,11 @@ def parse_args():
         default=None,
         help='nms IoU threshold, only applied when users want to change the'
         'nms IoU threshold.')
+    parser.add_argument(
+        '--nproc',
+        type=int,
+        default=4,
+        help='number of processes to analyze the images')
     parser.add_argument(
         '--cfg-options',
         nargs='+',
@@ -61,7 +67,8 @@ def calculate_confusion_matrix(dataset,
                                results,
                                score_thr=0,
                                nms_iou_thr=None,
-                               tp_iou_thr=0.5):
+                               tp_iou_thr=0.5,
+                               nproc=1):
     """Calculate the confusion matrix.
 
     Args:
@@ -74,23 +81,142 @@ def calculate_confusion_matrix(dataset,
             change the nms IoU threshold. Default: None.
         tp_iou_thr (float|optional): IoU threshold to be considered as matched.
             Default: 0.5.
+        nproc (int): Processes used for analyzing images. Default: 1.
+    """
+    per_img_confusions = calculate_per_img_confusions(dataset, results,
+                                                      score_thr, nms_iou_thr,
+                                                      tp_iou_thr, nproc)
+    return sum_confusion_matrix(per_img_confusions, len(dataset.CLASSES))
+
+
+def calculate_per_img_confusions(dataset,
+                                 results,
+                                 score_thr=0,
+                                 nms_iou_thr=None,
+                                 tp_iou_thr=0.5,
+                                 nproc=1):
+    """Calculate the confusion matrix of each image.
+
+    The confusion matrices of images are kept sparse, and the confusion
+    matrix of any subset of images can be summed by
+    :func:`sum_confusion_matrix` without analyzing the images again.
+
+    Args:
+        dataset, results, score_thr, nms_iou_thr, tp_iou_thr, nproc: See
+            :func:`calculate_confusion_matrix`.
+
+    Returns:
+        list[tuple[ndarray]]: Flattened indices of the non-zero elements in
+            the confusion matrix of each image, and their values.
     """
-    num_classes = len(dataset.CLASSES)
-    confusion_matrix = np.zeros(shape=[num_classes + 1, num_classes + 1])
     assert len(dataset) == len(results)
-    prog_bar = mmcv.ProgressBar(len(results))
+    tasks = []
     for idx, per_img_res in enumerate(results):
         if isinstance(per_img_res, tuple):
             res_bboxes, _ = per_img_res
         else:
             res_bboxes = per_img_res
         ann = dataset.get_ann_info(idx)
-        gt_bboxes = ann['bboxes']
-        labels = ann['labels']
-        analyze_per_img_dets(confusion_matrix, gt_bboxes, labels, res_bboxes,
-                             score_thr, tp_iou_thr, nms_iou_thr)
-        prog_bar.update()
-    return confusion_matrix
+        tasks.append((ann['bboxes'], ann['labels'], res_bboxes))
+    analyze_func = partial(
+        _analyze_per_img_task,
+        score_thr=score_thr,
+        tp_iou_thr=tp_iou_thr,
+        nms_iou_thr=nms_iou_thr)
+    if nproc > 1:
+        # images are sent to the workers in chunks to amortize the overhead
+        return mmcv.track_parallel_progress(
+            analyze_func,
+            tasks,
+            nproc,
+            chunksize=max(1,
+                          len(tasks) // (nproc * 16)))
+    return mmcv.track_progress(analyze_func, tasks)
+
+
+def sum_confusion_matrix(per_img_confusions, num_classes, img_inds=None):
+    """Sum the confusion matrices of images.
+
+    Args:
+        per_img_confusions (list[tuple[ndarray]]): Confusion matrices of all
+            images, the output of :func:`calculate_per_img_confusions`.
+        num_classes (int): Number of classes.
+        img_inds (Sequence[int], optional): Indices of the images to sum.
+            If not specified, all images are summed. Default: None.
+
+    Returns:
+        ndarray: The confusion matrix, has shape
+            (num_classes + 1, num_classes + 1).
+    """
+    if img_inds is None:
+        img_inds = range(len(per_img_confusions))
+    inds = [np.zeros(0, dtype=np.int64)]
+    counts = [np.zeros(0)]
+    for idx in img_inds:
+        inds.append(per_img_confusions[idx][0])
+        counts.append(per_img_confusions[idx][1])
+    confusion_matrix = np.bincount(
+        np.concatenate(inds),
+        weights=np.concatenate(counts),
+        minlength=(num_classes + 1)**2)
+    return confusion_matrix.reshape(num_classes + 1, num_classes + 1)
+
+
+def _analyze_per_img_task(task, **kwargs):
+    return get_per_img_confusion(*task, **kwargs)
+
+
+def get_per_img_confusion(gt_bboxes,
+                          gt_labels,
+                          result,
+                          score_thr=0,
+                          tp_iou_thr=0.5,
+                          nms_iou_thr=None):
+    """Get the sparse confusion matrix of an image.
+
+    Args:
+        gt_bboxes, gt_labels, result, score_thr, tp_iou_thr, nms_iou_thr:
+            See :func:`analyze_per_img_dets`.
+
+    Returns:
+        tuple[ndarray]: Flattened indices of the non-zero elements in the
+            confusion matrix, and their values.
+    """
+    num_classes = len(result)
+    det_bboxes = []
+    det_labels = []
+    for det_label, bboxes in enumerate(result):
+        if nms_iou_thr:
+            bboxes, _ = nms(
+                bboxes[:, :4],
+                bboxes[:, -1],
+                nms_iou_thr,
+                score_threshold=score_thr)
+        det_bboxes.append(bboxes.reshape(-1, 5))
+        det_labels.append(np.full(bboxes.shape[0], det_label))
+    det_bboxes = np.concatenate(det_bboxes)
+    det_labels = np.concatenate(det_labels).astype(np.int64)
+    valid = det_bboxes[:, 4] >= score_thr
+    det_bboxes, det_labels = det_bboxes[valid], det_labels[valid]
+    gt_labels = np.asarray(gt_labels, dtype=np.int64)
+
+    matched = bbox_overlaps(det_bboxes[:, :4], gt_bboxes) >= tp_iou_thr
+    det_inds, gt_inds = np.nonzero(matched)
+    # every match of a detection with a gt counts
+    rows = [gt_labels[gt_inds]]
+    cols = [det_labels[det_inds]]
+    # BG FP
+    det_unmatched = ~matched.any(axis=1)
+    rows.append(np.full(np.count_nonzero(det_unmatched), num_classes))
+    cols.append(det_labels[det_unmatched])
+    # FN
+    is_tp = gt_labels[gt_inds] == det_labels[det_inds]
+    gt_unmatched = np.ones(len(gt_labels), dtype=bool)
+    gt_unmatched[gt_inds[is_tp]] = False
+    rows.append(gt_labels[gt_unmatched])
+    cols.append(np.full(np.count_nonzero(gt_unmatched), num_classes))
+    inds = np.concatenate(rows) * (num_classes + 1) + np.concatenate(cols)
+    return np.unique(inds, return_counts=True)
 
 
 def analyze_per_img_dets(confusion_matrix,
@@ -117,30 +243,9 @@ def analyze_per_img_dets(confusion_matrix,
             have done nms in the detector, only applied when users want to
             change the nms IoU threshold. Default: None.
     """
-    true_positives = np.zeros_like(gt_labels)
-    for det_label, det_bboxes in enumerate(result):
-        if nms_iou_thr:
-            det_bboxes, _ = nms(
-                det_bboxes[:, :4],
-                det_bboxes[:, -1],
-                nms_iou_thr,
-                score_threshold=score_thr)
-        ious = bbox_overlaps(det_bboxes[:, :4], gt_bboxes)
-        for i, det_bbox in enumerate(det_bboxes):
-            score = det_bbox[4]
-            det_match = 0
-            if score >= score_thr:
-                for j, gt_label in enumerate(gt_labels):
-                    if ious[i, j] >= tp_iou_thr:
-                        det_match += 1
-                        if gt_label == det_label:
-                            true_positives[j] += 1  # TP
-                        confusion_matrix[gt_label, det_label] += 1
-                if det_match == 0:  # BG FP
-                    confusion_matrix[-1, det_label] += 1
-    for num_tp, gt_label in zip(true_positives, gt_labels):
-        if num_tp == 0:  # FN
-            confusion_matrix[gt_label, -1] += 1
+    inds, counts = get_per_img_confusion(gt_bboxes, gt_labels, result,
+                                         score_thr, tp_iou_thr, nms_iou_thr)
+    confusion_matrix.reshape(-1)[inds] += counts
 
 
 def plot_confusion_matrix(confusion_matrix,
@@ -260,7 +365,7 @@ def main():
     confusion_matrix = calculate_confusion_matrix(dataset, results,
                                                   args.score_thr,
                                                   args.nms_iou_thr,
-                                                  args.tp_iou_thr)
+                                                  args.tp_iou_thr, args.nproc)
     plot_confusion_matrix(
         confusion_matrix,
         dataset.CLASSES + ('background', ),
@@ -1,16 +1,35 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import base64
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 import mmcv
+import numpy as np
 import torch
 from ts.torch_handler.base_handler import BaseHandler
 
-from mmdet.apis import inference_detector, init_detector
+from mmdet.apis import Predictor, init_detector
 
 
 class MMdetHandler(BaseHandler):
+    """TorchServe handler of MMDetection detectors.
+
+    The images of a request batch are decoded in a thread pool and run in
+    one batched forward, then the score threshold is applied with numpy.
+
+    The output of each request is chosen by its ``format`` field:
+
+    - ``json`` (default): a list of dicts with ``class_name``, ``bbox``
+      and ``score`` of each detection.
+    - ``array``: a dict of the ``class_names``, ``bboxes`` and ``scores``
+      lists, which is much smaller for many detections.
+    - ``binary``: the raw bytes of a numpy array with :attr:`record_dtype`,
+      read with ``np.frombuffer(content, MMdetHandler.record_dtype)``.
+    """
     threshold = 0.5
+    num_decode_workers = 4
+    record_dtype = np.dtype([('bbox', '<f4', (4, )), ('score', '<f4'),
+                             ('label', '<i4')])
 
     def initialize(self, context):
         properties = context.system_properties
@@ -26,29 +45,45 @@ class MMdetHandler(BaseHandler):
         self.config_file = os.path.join(model_dir, 'config.py')
 
         self.model = init_detector(self.config_file, checkpoint, self.device)
+        self.predictor = Predictor(self.model)
+        self.class_names = np.array(self.model.CLASSES)
+        self.executor = ThreadPoolExecutor(self.num_decode_workers)
         self.initialized = True
 
     def preprocess(self, data):
-        images = []
-
-        for row in data:
-            image = row.get('data') or row.get('body')
-            if isinstance(image, str):
-                image = base64.b64decode(image)
-            image = mmcv.imfrombytes(image)
-            images.append(image)
+        rows = [row.get('data') or row.get('body') for row in data]
+        self.formats = [self._get_format(row) for row in data]
+        if len(rows) > 1:
+            # cv2 releases the GIL, so the images are decoded in parallel
+            images = list(self.executor.map(self._decode, rows))
+        else:
+            images = [self._decode(image) for image in rows]
 
         return images
 
+    @staticmethod
+    def _decode(image):
+        if isinstance(image, str):
+            image = base64.b64decode(image)
+        return mmcv.imfrombytes(image)
+
+    @staticmethod
+    def _get_format(row):
+        output_format = row.get('format') or 'json'
+        if isinstance(output_format, (bytes, bytearray)):
+            output_format = output_format.decode()
+        assert output_format in ('json', 'array', 'binary'), \
+            f'unsupported output format {output_format}'
+        return output_format
+
     def inference(self, data, *args, **kwargs):
-        results = inference_detector(self.model, data)
+        results = self.predictor.predict(data)
         return results
 
     def postprocess(self, data):
         # Format output following the example ObjectDetectionHandler format
         output = []
         for image_index, image_result in enumerate(data):
-            output.append([])
             if isinstance(image_result, tuple):
                 bbox_result, segm_result = image_result
                 if isinstance(segm_result, tuple):
@@ -56,16 +91,33 @@ class MMdetHandler(BaseHandler):
             else:
                 bbox_result, segm_result = image_result, None
 
-            for class_index, class_result in enumerate(bbox_result):
-                class_name = self.model.CLASSES[class_index]
-                for bbox in class_result:
-                    bbox_coords = bbox[:-1].tolist()
-                    score = float(bbox[-1])
-                    if score >= self.threshold:
-                        output[image_index].append({
-                            'class_name': class_name,
-                            'bbox': bbox_coords,
-                            'score': score
-                        })
+            bboxes = np.concatenate(bbox_result).reshape(-1, 5)
+            labels = np.repeat(
+                np.arange(len(bbox_result)),
+                [len(class_result) for class_result in bbox_result])
+            valid = bboxes[:, -1] >= self.threshold
+            bboxes = bboxes[valid]
+            labels = labels[valid]
+
+            output_format = self.formats[image_index]
+            if output_format == 'json':
+                output.append([{
+                    'class_name': self.model.CLASSES[label],
+                    'bbox': bbox,
+                    'score': score
+                } for label, bbox, score in zip(labels.tolist(
+                ), bboxes[:, :-1].tolist(), bboxes[:, -1].tolist())])
+            elif output_format == 'array':
+                output.append({
+                    'class_names': self.class_names[labels].tolist(),
+                    'bboxes': bboxes[:, :-1].tolist(),
+                    'scores': bboxes[:, -1].tolist()
+                })
+            else:
+                records = np.empty(len(bboxes), dtype=self.record_dtype)
+                records['bbox'] = bboxes[:, :-1]
+                records['score'] = bboxes[:, -1]
+                records['label'] = labels
+                output.append(records.tobytes())
 
         return output
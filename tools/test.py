@@ -67,14 +67,39 @@ def parse_args():
         type=float,
         default=0.3,
         help='score threshold (default: 0.3)')
+    parser.add_argument(
+        '--post-workers',
+        type=int,
+        default=0,
+        help='number of background threads to encode masks and save painted '
+        'images while testing on a single gpu, not available with --show')
     parser.add_argument(
         '--gpu-collect',
         action='store_true',
-        help='whether to use gpu to collect results.')
+        help='whether to use gpu to collect results, cpu tensors are '
+        'used instead if the distributed backend is gloo.')
     parser.add_argument(
         '--tmpdir',
         help='tmp directory used for collecting results from multiple '
         'workers, available when gpu-collect is not specified')
+    parser.add_argument(
+        '--spill-chunk-size',
+        type=int,
+        help='if specified, results are spilled to tmpdir every '
+        'spill-chunk-size samples during testing and loaded lazily by rank '
+        '0, available when gpu-collect is not specified')
+    parser.add_argument(
+        '--compact-results',
+        action='store_true',
+        help='whether to keep the detections of each image in one array with '
+        'labels instead of one array per class, which is faster to collect '
+        'and evaluate for datasets with many classes')
+    parser.add_argument(
+        '--columnar-prefix',
+        help='if specified, the detections are also written to the columnar '
+        'format with this prefix during testing, e.g. "xxx.bbox" and '
+        '"xxx.segm" for "xxx", and the evaluation and the json files of '
+        'coco style datasets are done from the columns')
     parser.add_argument(
         '--cfg-options',
         nargs='+',
@@ -240,7 +265,8 @@ def main():
     if not distributed:
         model = build_dp(model, cfg.device, device_ids=cfg.gpu_ids)
         outputs = single_gpu_test(model, data_loader, args.show, args.show_dir,
-                                  args.show_score_thr)
+                                  args.show_score_thr, args.post_workers,
+                                  args.compact_results, args.columnar_prefix)
     else:
         model = build_ddp(
             model,
@@ -255,8 +281,13 @@ def main():
             args.tmpdir = './npu_tmpdir'
 
         outputs = multi_gpu_test(
-            model, data_loader, args.tmpdir, args.gpu_collect
-            or cfg.evaluation.get('gpu_collect', False))
+            model,
+            data_loader,
+            args.tmpdir,
+            args.gpu_collect or cfg.evaluation.get('gpu_collect', False),
+            spill_chunk_size=args.spill_chunk_size,
+            compact_results=args.compact_results,
+            columnar_prefix=args.columnar_prefix)
 
     rank, _ = get_dist_info()
     if rank == 0: